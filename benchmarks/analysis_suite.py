@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+    Benchmark suite for every analysis offered in the Control Engineering app.
+
+    Each operation behind the GUI buttons (stability margins, open and closed
+    loop Bode, Nyquist, step and ramp responses, root locus, zero-order hold
+    discretisation and the poles/zeros Bode plot) is timed on a graded set of
+    plants from 2nd to 30th order, in well damped, stiff (poles spread over
+    many decades) and lightly damped (resonant) forms. Latency percentiles come
+    from repeated runs, and the peak memory allocated during one further run is
+    measured separately with tracemalloc, which would otherwise slow the timed
+    runs. Results can be saved as JSON and compared against an earlier run.
+
+    Usage: python benchmarks/analysis_suite.py [--repeat N] [--orders 2 5 10]
+               [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import control_engine as engine
+from control_engine import analysis, expressions, sampling
+
+ORDERS = (2, 5, 10, 20, 30)
+KINDS = ("damped", "stiff", "resonant")
+
+
+def plant_roots(order, kind):
+    """ Poles of a graded test plant - all real and well damped, real and spread
+        across six decades (stiff), or lightly damped complex pairs with a
+        damping ratio of 0.02 (resonant, with a real pole for odd orders).
+    """
+    if kind == "damped":
+        return -np.linspace(1.0, 10.0, order)
+    if kind == "stiff":
+        return -np.geomspace(1e-2, 1e4, order)
+    natural = np.geomspace(1.0, 100.0, order//2) if order//2 else np.array([])
+    damping = 0.02
+    pairs = natural*(-damping + 1j*math.sqrt(1 - damping**2))
+    roots = np.concatenate((pairs, pairs.conj()))
+    return np.concatenate((roots, [-1.0])) if order % 2 else roots
+
+
+def plant_expression(order, kind):
+    """ Plant G(s) as the expression text a user would enter in the app,
+        with a unit steady-state gain and an integrator for type-1 behaviour.
+    """
+    factors = ["s"]
+    roots = plant_roots(order - 1, kind)
+    for root in roots[roots.imag >= 0]:
+        if root.imag:
+            factors.append("(s**2+{0!r}*s+{1!r})".format(float(-2*root.real), float(abs(root)**2)))
+        else:
+            factors.append("(s+{0!r})".format(float(-root.real)))
+    gain = float(np.prod(np.abs(roots)))
+    return "{0!r}/({1})".format(gain, "*".join(factors))
+
+
+def operations(order, kind):
+    """ (name, setup, run) for each benchmarked operation on one test plant.
+        setup() builds the inputs outside the timed region, and also clears
+        the engine's in-memory caches so each run does the full computation.
+    """
+    expression = plant_expression(order, kind)
+    roots = plant_roots(order, kind)
+    sampling_time = 0.1/float(np.max(np.abs(roots)))
+
+    def text():
+        expressions.clear_cache()
+        analysis._cached_system.cache_clear()
+        return expression
+
+    def system():
+        sampling.clear_cache()
+        return engine.build_system(text())
+
+    return [
+        ("build system", text, engine.build_system),
+        ("margins", system, engine.stability_margins),
+        ("open-loop bode", system, engine.bode_response),
+        ("closed-loop bode", system, lambda sys_tf: engine.bode_response(sys_tf, closed_loop=True)),
+        ("nyquist", system, engine.nyquist_response),
+        ("step response", system, engine.time_response),
+        ("ramp response", system, lambda sys_tf: engine.time_response(sys_tf, ramp=True)),
+        ("root locus", system, engine.root_locus),
+        ("zoh discretisation", system, lambda sys_tf: engine.discretize(sys_tf, sampling_time)),
+        ("poles/zeros bode", lambda: (list(roots), [-0.5], 1.0),
+         lambda args: engine.poles_zeros_bode(*args)),
+    ]
+
+
+def measure(setup, run, repeat):
+    """ Latencies (s) of repeated runs, and the peak bytes allocated by one run """
+    latencies = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        latencies.append(time.perf_counter() - start)
+
+    argument = setup()
+    tracemalloc.start()
+    try:
+        run(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return latencies, peak
+
+
+def run_suite(orders=ORDERS, kinds=KINDS, repeat=20, report=print):
+    """ Benchmark records (one dict per operation and plant) for the graded systems """
+    records = []
+    for order in orders:
+        for kind in kinds:
+            for name, setup, run in operations(order, kind):
+                record = {"operation": name, "order": order, "kind": kind}
+                try:
+                    latencies, peak = measure(setup, run, repeat)
+                except Exception as error:
+                    record["error"] = "{0}: {1}".format(type(error).__name__, error)
+                else:
+                    latencies = np.asarray(latencies)*1000
+                    record.update(p50_ms=float(np.percentile(latencies, 50)),
+                                  p90_ms=float(np.percentile(latencies, 90)),
+                                  p99_ms=float(np.percentile(latencies, 99)),
+                                  max_ms=float(latencies.max()),
+                                  peak_kib=peak/1024.0)
+                records.append(record)
+                report(format_record(record))
+    return records
+
+
+def format_record(record):
+    """ One table row for a benchmark record """
+    label = "{0:<20}{1:>6}  {2:<10}".format(record["operation"], record["order"], record["kind"])
+    if "error" in record:
+        return label + record["error"]
+    return label + "{0:>10.2f}{1:>10.2f}{2:>10.2f}{3:>10.2f}{4:>12.1f}".format(
+        record["p50_ms"], record["p90_ms"], record["p99_ms"], record["max_ms"], record["peak_kib"])
+
+
+def compare(records, baseline, tolerance):
+    """ Rows whose median latency or peak memory grew by more than the
+        tolerance (a fraction) over a baseline run of the suite.
+    """
+    previous = dict(((item["operation"], item["order"], item["kind"]), item)
+                    for item in baseline["records"] if "error" not in item)
+    regressions = []
+    for record in records:
+        old = previous.get((record["operation"], record["order"], record["kind"]))
+        if old is None or "error" in record:
+            continue
+        for field in ("p50_ms", "peak_kib"):
+            if record[field] > old[field]*(1 + tolerance):
+                regressions.append("{0} ({1}, order {2}): {3} {4:.2f} -> {5:.2f}".format(
+                    record["operation"], record["kind"], record["order"], field,
+                    old[field], record[field]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of each operation")
+    parser.add_argument("--orders", type=int, nargs="+", default=list(ORDERS),
+                        help="plant orders to benchmark")
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS,
+                        help="plant kinds to benchmark")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fractional slow-down or memory growth reported as a regression")
+    args = parser.parse_args()
+
+    # overflow warnings from ill-conditioned 30th-order plants would break up the table
+    warnings.simplefilter("ignore", RuntimeWarning)
+    print("{0:<20}{1:>6}  {2:<10}{3:>10}{4:>10}{5:>10}{6:>10}{7:>12}".format(
+          "operation", "order", "kind", "p50 (ms)", "p90 (ms)", "p99 (ms)", "max (ms)", "peak (KiB)"))
+    records = run_suite(args.orders, args.kinds, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "numpy": np.__version__, "repeat": args.repeat, "records": records},
+                      stream, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            regressions = compare(records, json.load(stream), args.tolerance)
+        print("\n{0} regression(s) beyond {1:.0%}".format(len(regressions), args.tolerance))
+        for line in regressions:
+            print("  " + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+    Cold-start latency benchmark for the Control Engineering tool.
+
+    Each scenario is run in a fresh Python process several times, so nothing is
+    left cached in memory between runs, and the wall-clock time of the whole
+    process (interpreter start-up included) is reported alongside the time
+    spent inside the scenario itself.
+
+    Usage: python benchmarks/startup.py [--repeat N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ("engine import", "import control_engine"),
+    ("engine first analysis",
+     "import control_engine as engine\n"
+     "engine.stability_margins(engine.build_system('1/(s*(s+1))'))"),
+    ("app import", "import control_engineering_app"),
+    ("app window shown",
+     "import control_engineering_app\n"
+     "app = control_engineering_app.ControlSystemApp()\n"
+     "app.update()\n"
+     "app.destroy()"),
+]
+
+# scenarios needing a display to create the tkinter window
+NEEDS_DISPLAY = {"app window shown"}
+
+TIMED = ("import time\n"
+         "_start = time.perf_counter()\n"
+         "{0}\n"
+         "print(time.perf_counter() - _start)\n")
+
+
+def run_once(code):
+    """ (inner, total) seconds for one run of the scenario in a new process """
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, "-c", TIMED.format(code)], cwd=ROOT,
+                                     stderr=subprocess.DEVNULL)
+    total = time.perf_counter() - start
+    return float(output.decode().split()[-1]), total
+
+
+def has_display():
+    """ Whether a tkinter window can be created in this environment """
+    try:
+        subprocess.check_call([sys.executable, "-c", "import tkinter; tkinter.Tk().destroy()"],
+                              stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each scenario")
+    args = parser.parse_args()
+
+    display = has_display()
+    print("{0:<24}{1:>12}{2:>12}{3:>12}{4:>14}".format("scenario", "min (ms)", "median (ms)",
+                                                      "max (ms)", "process (ms)"))
+    for name, code in SCENARIOS:
+        if name in NEEDS_DISPLAY and not display:
+            print("{0:<24}{1:>12}".format(name, "skipped - no display"))
+            continue
+        runs = [run_once(code) for _ in range(args.repeat)]
+        inner = [run[0]*1000 for run in runs]
+        total = [run[1]*1000 for run in runs]
+        print("{0:<24}{1:>12.1f}{2:>12.1f}{3:>12.1f}{4:>14.1f}".format(
+              name, min(inner), statistics.median(inner), max(inner), statistics.median(total)))
+
+
+if __name__ == "__main__":
+    main()
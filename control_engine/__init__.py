@@ -0,0 +1,72 @@
+"""
+    Control Engineering analysis engine.
+
+    A headless (display-free) interface to the numeric analyses offered by the
+    Control Engineering app. Everything here returns arrays and values rather
+    than plotting, so analyses can be scripted and batch-run without a display.
+
+    Importing the package is cheap: each name below is only imported from its
+    submodule (pulling in numpy, scipy and python-control) on first use.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "analysis": ["s", "Margins", "BodeResponse", "NyquistResponse", "TimeResponse",
+                 "RootLocus", "build_system", "build_factored_system", "build_discrete_system",
+                 "tf_coefficients", "stability_margins", "default_frequency_range", "bode_response",
+                 "discrete_bode_response", "nyquist_response", "closed_loop_stability",
+                 "time_response", "discrete_time_response", "PerformanceMetrics",
+                 "performance_metrics", "root_locus", "poles_zeros_bode"],
+    "expressions": ["CompiledTF", "CompiledZPK", "compile_expression", "compile_factored",
+                    "normalise_expression", "parameterise_expression", "substitute_parameters",
+                    "cache_info", "clear_cache"],
+    "sweep": ["MarginSurface", "margin_sweep"],
+    "tuning": ["TuningResult", "LoopTuner"],
+    "optimise": ["DesignTargets", "CompensatorDesign", "OptimisationResult", "DEFAULT_TARGETS",
+                 "STRUCTURES", "compensator_template", "optimise_compensator", "pareto_front"],
+    "freqresp": ["BatchResponse", "pad_coefficients", "pad_roots", "evaluation_points",
+                 "batch_evaluate", "batch_frequency_response", "batch_zpk_response",
+                 "zpk_evaluate"],
+    "sampling": ["discretize", "discretize_many", "discretize_factored"],
+    "comparison": ["SamplingComparison", "COMPARISON_COLUMNS", "compare_sampling_times",
+                   "comparison_rows", "comparison_table"],
+    "metrics": ["StepMetrics", "RampMetrics", "ErrorConstants", "LoopMetrics", "step_metrics",
+                "ramp_metrics", "error_integrals", "error_constants", "step_error_ise", "loop_metrics"],
+    "zpk_sets": ["ZPKSet", "parse_roots", "zpk_set", "load_zpk_set", "save_zpk_set", "zpk_set_response",
+                 "export_response"],
+    "decimate": ["minmax_decimate", "thin_path", "visible_range"],
+    "frequency_grid": ["FrequencyGrid", "frequency_range", "zpk_frequency_range",
+                       "adaptive_frequency_grid", "adaptive_zpk_grid"],
+    "factored": ["FactoredTF", "factored_margins", "margins_on_grid"],
+    "nyquist": ["NyquistContour", "NyquistStability", "encirclements", "nyquist_contour",
+                "nyquist_stability"],
+    "simulate": ["LTISimulator", "default_time_step", "iter_chunks", "simulate_chunks"],
+    "rlocus": ["RootLocusTrace", "trace_root_locus", "fixed_gain_locus", "asymptotes",
+               "stability_crossings", "breakaway_points"],
+    "result_cache": ["ResultCache", "default_cache", "cached_analysis", "system_key"],
+    "results_store": ["ResultsStore", "default_store", "select_band"],
+    "batch": ["BatchStats", "read_jobs", "run_job", "run_batch"],
+    "instrument": ["StageStats", "stage", "timed"],
+}
+
+_SOURCES = dict((name, module) for module, names in _EXPORTS.items() for name in names)
+
+__all__ = sorted(_SOURCES)
+
+
+def __getattr__(name):
+    """ Import a public name (or a whole submodule, such as instrument) from
+        its submodule the first time it is used
+    """
+    if name in _EXPORTS:
+        return importlib.import_module("." + name, __name__)
+    if name not in _SOURCES:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + _SOURCES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
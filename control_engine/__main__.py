@@ -0,0 +1,8 @@
+""" Batch runner entry point: python -m control_engine jobs.csv -o results.jsonl """
+
+import sys
+
+from .batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+    Display-free analysis routines used by the Control Engineering app.
+
+    Each function performs the numeric work previously carried out inside the
+    tkinter page handlers, and returns plain numpy arrays (or small named
+    tuples) rather than drawing anything. This allows the same analyses to be
+    batch-run on headless machines, with the GUI simply plotting the results.
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import control
+
+from .factored import FactoredTF, factored_margins
+from .freqresp import batch_evaluate, batch_zpk_response, evaluation_points
+from .frequency_grid import (adaptive_frequency_grid, adaptive_zpk_grid, frequency_range,
+                             zpk_frequency_range)
+from .metrics import loop_metrics
+from .nyquist import nyquist_stability
+from .simulate import LTISimulator
+from .rlocus import fixed_gain_locus, trace_root_locus
+from .expressions import CACHE_SIZE, compile_expression, compile_factored, normalise_expression
+from .instrument import count, stage
+
+# basic definition for s-domain 's' operator
+s = control.tf([1, 0], 1)
+
+Margins = namedtuple("Margins", ["gain_margin", "gain_margin_db", "phase_margin",
+                                 "wcg", "wcp"])
+BodeResponse = namedtuple("BodeResponse", ["mag_db", "phase_deg", "omega"])
+NyquistResponse = namedtuple("NyquistResponse", ["real", "imag", "omega"])
+TimeResponse = namedtuple("TimeResponse", ["time", "response"])
+RootLocus = namedtuple("RootLocus", ["roots", "gains"])
+PerformanceMetrics = namedtuple("PerformanceMetrics", ["rise_time", "overshoot", "peak_time",
+                                                       "settling_time", "final_value",
+                                                       "steady_state_error", "ramp_error", "iae",
+                                                       "ise", "itae", "system_type", "kp", "kv", "ka"])
+
+
+def build_system(oltf, compensator="1"):
+    """ Form the open-loop s-domain transfer function G(s)*F(s) from the
+        algebraic plant and compensator expressions entered by the user.
+    """
+    return _cached_system(normalise_expression(oltf), normalise_expression(compensator))
+
+
+def build_factored_system(oltf, compensator="1"):
+    """ Form the open-loop system G(s)*F(s) in factored zero/pole/gain form,
+        without expanding it into coefficients. Analyses of high-order loops
+        built this way are faster and more accurate than from build_system.
+    """
+    return _cached_factored_system(normalise_expression(oltf), normalise_expression(compensator))
+
+
+def build_discrete_system(oltf, dig_compensator, sampling_time):
+    """ Form the open-loop discrete transfer function from the s-domain plant,
+        discretised using a zero-order hold, and the z-domain digital compensator.
+    """
+    from .sampling import discretize
+
+    sampling_time = float(sampling_time)
+    sys_tf = build_system(oltf)
+    discrete_sys_tf = discretize(sys_tf, sampling_time, method='zoh')
+
+    with stage("parse"):
+        num, den = compile_expression(dig_compensator, variable="z")
+    return discrete_sys_tf*control.tf(num, den, sampling_time)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_system(oltf, compensator):
+    """ Open-loop transfer function for normalised plant and compensator text,
+        cached so repeat analyses reuse the same polynomial product.
+    """
+    with stage("parse"):
+        plant_num, plant_den = compile_expression(oltf)
+        comp_num, comp_den = compile_expression(compensator)
+    return control.tf(np.polymul(plant_num, comp_num), np.polymul(plant_den, comp_den))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_factored_system(oltf, compensator):
+    """ Factored open-loop system for normalised plant and compensator text """
+    with stage("parse"):
+        plant = compile_factored(oltf)
+        comp = compile_factored(compensator)
+    return FactoredTF(plant.zeros, plant.poles, plant.gain)*FactoredTF(comp.zeros, comp.poles, comp.gain)
+
+
+def tf_coefficients(sys_tf):
+    """ Return the (numerator, denominator) coefficient arrays of a SISO
+        transfer function, highest power first. Factored systems are expanded
+        into coefficients here, on demand.
+    """
+    if isinstance(sys_tf, FactoredTF):
+        return sys_tf.coefficients()
+    num = np.atleast_1d(np.asarray(sys_tf.num[0][0], dtype=float))
+    den = np.atleast_1d(np.asarray(sys_tf.den[0][0], dtype=float))
+    return num, den
+
+
+def stability_margins(sys_tf):
+    """ Open-loop gain margin (absolute and dB), phase margin (deg), and the
+        associated crossover frequencies (rad/s) for the given system. wcg is
+        the frequency at which the gain margin is measured (phase crossover),
+        and wcp the frequency at which the phase margin is measured.
+    """
+    with stage("margins"):
+        if isinstance(sys_tf, FactoredTF):
+            gain_m, pm, wcg, wcp = factored_margins(sys_tf)
+        else:
+            gain_m, pm, wcg, wcp = control.margin(sys_tf)
+
+    # convert gain margin to dB
+    gm = 20*math.log10(gain_m) if gain_m else 0
+    return Margins(gain_m, gm, pm, wcg, wcp)
+
+
+def default_frequency_range(sys_tf, points=1000):
+    """ Logarithmically spaced frequency vector (rad/s) spanning a decade
+        either side of the system's pole and zero break frequencies.
+    """
+    if isinstance(sys_tf, FactoredTF):
+        lower, upper = zpk_frequency_range(sys_tf.zeros_, sys_tf.poles_, sys_tf.dt)
+    else:
+        num, den = tf_coefficients(sys_tf)
+        lower, upper = frequency_range(num, den, _sampling_period(sys_tf))
+    return np.geomspace(lower, upper, points)
+
+
+def bode_response(sys_tf, omega=None, closed_loop=False, points=500):
+    """ Gain (dB) and phase (deg) response of the continuous system, or of its
+        unity negative feedback closed-loop form if closed_loop is set. Unless
+        omega is given, the response is evaluated on an adaptive grid of at
+        most the given number of points.
+    """
+    if closed_loop:
+        sys_tf = _closed_loop(sys_tf)
+    omega, response = _frequency_response(sys_tf, omega, points)
+    return _bode_arrays(response, omega)
+
+
+def discrete_bode_response(discrete_sys_tf, sampling_time, closed_loop=False, omega=None, points=500):
+    """ Gain (dB) and phase (deg) response of a discrete-time system up to the
+        Nyquist frequency pi/Ts, where Ts is sampling_time, which must match
+        the system's sampling period. Unless omega is given, the response is
+        evaluated on an adaptive grid of at most the given number of points.
+    """
+    sampling_time = _check_sampling_time(discrete_sys_tf, sampling_time)
+    if closed_loop:
+        with stage("feedback"):
+            discrete_sys_tf = control.feedback(control.tf(discrete_sys_tf), 1)
+    omega, response = _frequency_response(discrete_sys_tf, omega, points, sampling_time)
+    return _bode_arrays(response, omega)
+
+
+def _closed_loop(sys_tf):
+    """ Unity negative feedback closed loop, kept in factored form if given so """
+    with stage("feedback"):
+        if isinstance(sys_tf, FactoredTF):
+            return sys_tf.feedback()
+        return control.feedback(sys_tf, 1)
+
+
+def _sampling_period(sys_tf):
+    """ Sampling period of a discrete system, or None for a continuous one """
+    return sys_tf.dt if sys_tf.isdtime(strict=True) else None
+
+
+def _check_sampling_time(sys_tf, sampling_time):
+    """ Sampling time (s) given for a discrete system, as a float, checked
+        against the system's own sampling period
+    """
+    sampling_time = float(sampling_time)
+    dt = _sampling_period(sys_tf)
+    if dt is None:
+        raise ValueError("Expected a discrete-time system sampled every {0} s, got a continuous one".format(
+            sampling_time))
+    # dt is True for a discrete system with an unspecified sampling period
+    if dt is not True and not math.isclose(dt, sampling_time, rel_tol=1e-9):
+        raise ValueError("The system is sampled every {0} s, not every {1} s".format(dt, sampling_time))
+    return sampling_time
+
+
+def _frequency_response(sys_tf, omega, points, dt=None):
+    """ Frequency vector and complex response, on an adaptive grid if no
+        frequencies are specified.
+    """
+    dt = dt or _sampling_period(sys_tf)
+    with stage("frequency response"):
+        if isinstance(sys_tf, FactoredTF):
+            if omega is None:
+                return adaptive_zpk_grid(sys_tf.zeros_, sys_tf.poles_, sys_tf.gain, dt, points=points)
+            omega = np.asarray(omega, dtype=float)
+            return omega, sys_tf.frequency_response(omega)
+
+        num, den = tf_coefficients(sys_tf)
+        if omega is None:
+            return adaptive_frequency_grid(num, den, dt, points=points)
+        omega = np.asarray(omega, dtype=float)
+        return omega, batch_evaluate(num[np.newaxis, :], den[np.newaxis, :],
+                                     evaluation_points(omega, dt))[0]
+
+
+def _bode_arrays(response, omega):
+    """ Split a complex frequency response into dB magnitude and unwrapped phase """
+    with np.errstate(divide='ignore'):
+        mag_db = 20*np.log10(np.abs(response))
+    phase_deg = np.degrees(np.unwrap(np.angle(response)))
+    return BodeResponse(mag_db, phase_deg, np.asarray(omega, dtype=float))
+
+
+def nyquist_response(sys_tf, omega=None, points=1000):
+    """ Real and imaginary parts of the open-loop frequency response, for
+        positive frequencies only (the negative branch is its mirror image).
+        Unless omega is given, an adaptive grid of at most the given number of
+        points is used.
+    """
+    omega, response = _frequency_response(sys_tf, omega, points)
+    return NyquistResponse(response.real, response.imag, omega)
+
+
+def closed_loop_stability(sys_tf, points=200):
+    """ Stability of the unity negative feedback loop around the continuous or
+        discrete open-loop system, from the encirclements of -1 by its Nyquist
+        contour (see nyquist.nyquist_stability). Nothing is plotted, so this is
+        cheap enough to run for every candidate in a parameter sweep.
+    """
+    with stage("nyquist"):
+        sys = FactoredTF.from_tf(sys_tf)
+        return nyquist_stability(sys.zeros_, sys.poles_, sys.gain, sys.dt, points)
+
+
+def time_response(sys_tf, ramp=False, steps=None):
+    """ Closed-loop (unity negative feedback) time response of the continuous
+        system to a unit step, or to a unit ramp if ramp is set.
+    """
+    simulator = LTISimulator(_closed_loop(sys_tf))
+    time, response = simulator.ramp(steps) if ramp else simulator.step(steps)
+    return TimeResponse(time, response)
+
+
+def discrete_time_response(discrete_sys_tf, sampling_time, ramp=False, steps=None):
+    """ Closed-loop (unity negative feedback) discrete time response to a unit
+        step, or to a sampled unit ramp (input k*Ts at sample k) if ramp is set.
+        sampling_time must match the system's sampling period.
+    """
+    _check_sampling_time(discrete_sys_tf, sampling_time)
+    simulator = LTISimulator(_closed_loop(discrete_sys_tf))
+    time, response = simulator.ramp(steps) if ramp else simulator.step(steps)
+    return TimeResponse(time, response)
+
+
+def performance_metrics(sys_tf, steps=None):
+    """ Step response rise time (s), overshoot (%), peak and settling times (s),
+        final value and steady-state error, the ramp tracking error, the IAE,
+        ISE and ITAE step error integrals, and the system type and error
+        constants of the unity feedback loop round a continuous or discrete
+        open-loop system (see metrics.loop_metrics). Nothing is plotted, and
+        the steady-state errors and ISE are exact rather than read off a graph.
+    """
+    with stage("metrics"):
+        step, ramp, constants = loop_metrics(sys_tf, steps)
+    return PerformanceMetrics(float(step.rise_time), float(step.overshoot), float(step.peak_time),
+                              float(step.settling_time), float(step.final_value),
+                              float(step.steady_state_error), float(ramp.tracking_error),
+                              float(step.iae), float(step.ise), float(step.itae),
+                              int(constants.system_type), float(constants.position),
+                              float(constants.velocity), float(constants.acceleration))
+
+
+def root_locus(sys_tf, gains=None):
+    """ Closed-loop pole locations for a range of loop gains K, found from the
+        roots of den + K*num. Each column of the returned roots array is a
+        single branch, ordered so that it follows on smoothly between gains.
+        Unless specific gains are given, the locus is traced with adaptive gain
+        steps (see rlocus.trace_root_locus).
+    """
+    num, den = tf_coefficients(sys_tf)
+    with stage("root finding"):
+        if gains is None:
+            trace = trace_root_locus(num, den, _sampling_period(sys_tf))
+            count("root solves", trace.root_solves)
+            return RootLocus(trace.roots, trace.gains)
+        gains = np.asarray(gains, dtype=float)
+        count("root solves", len(gains))
+        return RootLocus(fixed_gain_locus(num, den, gains), gains)
+
+
+def poles_zeros_bode(poles, zeros, gain, omega=None):
+    """ Gain (dB) and phase (deg) response of a system given as lists of poles,
+        zeros and an overall gain. Returns frequency, magnitude and phase in the
+        same order as scipy.signal.bode.
+    """
+    if omega is None:
+        lower, upper = zpk_frequency_range(zeros, poles)
+        omega = np.geomspace(lower, upper, 1000)
+    with stage("frequency response"):
+        mag_db, phase_deg, omega = batch_zpk_response([zeros], [poles], [gain], omega)
+    return omega, mag_db[0], phase_deg[0]
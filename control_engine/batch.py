@@ -0,0 +1,305 @@
+"""
+    Unattended batch runs of the app's analyses over files of jobs.
+
+    Each job names a plant G(s), a compensator F (in s, or in z when a sampling
+    period Ts is given, exactly as on the Classic and Modern Control pages) and
+    the analyses wanted, one per CSV row or JSON line. Jobs are spread across a
+    pool of worker processes and each result is written out as a JSON line as
+    soon as it finishes, so output streams while the batch runs and memory use
+    does not grow with the number of jobs. Throughput and per-job timing
+    statistics are reported at the end.
+
+    Usage: python -m control_engine jobs.csv -o results.jsonl [--processes N]
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from . import analysis
+from .result_cache import cached_analysis
+
+BatchStats = namedtuple("BatchStats", ["jobs", "failed", "elapsed", "throughput", "mean_time",
+                                       "median_time", "p95_time", "max_time"])
+
+# analyses run for a job that does not list any
+DEFAULT_ANALYSES = ("margins", "bode", "step")
+
+# jobs queued per worker process, keeping workers busy without reading the whole job file
+JOBS_PER_PROCESS = 4
+
+# column (or key) names accepted for each job field
+FIELD_ALIASES = {
+    "plant": ("plant", "G", "G(s)", "oltf"),
+    "compensator": ("compensator", "F", "F(s)", "F(z)"),
+    "sampling_time": ("sampling_time", "Ts", "T"),
+    "analyses": ("analyses", "analysis"),
+    "id": ("id", "job", "name"),
+}
+
+# analysis name -> (function, keyword arguments) for continuous and discrete jobs
+CONTINUOUS_ANALYSES = {
+    "margins": (analysis.stability_margins, {}),
+    "bode": (analysis.bode_response, {}),
+    "closed_loop_bode": (analysis.bode_response, {"closed_loop": True}),
+    "nyquist": (analysis.nyquist_response, {}),
+    "stability": (analysis.closed_loop_stability, {}),
+    "step": (analysis.time_response, {}),
+    "ramp": (analysis.time_response, {"ramp": True}),
+    "metrics": (analysis.performance_metrics, {}),
+    "root_locus": (analysis.root_locus, {}),
+}
+
+DISCRETE_ANALYSES = {
+    "bode": (analysis.discrete_bode_response, {}),
+    "closed_loop_bode": (analysis.discrete_bode_response, {"closed_loop": True}),
+    "nyquist": (analysis.nyquist_response, {}),
+    "stability": (analysis.closed_loop_stability, {}),
+    "step": (analysis.discrete_time_response, {}),
+    "ramp": (analysis.discrete_time_response, {"ramp": True}),
+    "metrics": (analysis.performance_metrics, {}),
+    "root_locus": (analysis.root_locus, {}),
+}
+
+ANALYSES = sorted(CONTINUOUS_ANALYSES)
+
+
+def read_jobs(path):
+    """ Generator yielding a job dict (id, plant, compensator, sampling_time,
+        analyses) for each row of a CSV file, or each line of a JSON lines
+        file (chosen by a .json, .jsonl or .ndjson extension). A row that
+        cannot be read as a job gives an invalid job (see invalid_job) rather
+        than stopping the batch.
+    """
+    with open(path, newline="") as stream:
+        if os.path.splitext(path)[1].lower() in (".json", ".jsonl", ".ndjson"):
+            records = (line for line in stream if line.strip())
+        else:
+            records = csv.DictReader(stream)
+        for number, record in enumerate(records, 1):
+            try:
+                if isinstance(record, str):
+                    record = json.loads(record)
+                yield normalise_job(record, number)
+            except ValueError as error:
+                yield invalid_job(record, number, error)
+
+
+def invalid_job(record, number, error):
+    """ Job standing in for a record that could not be read, which run_job
+        reports as failed with the reading error
+    """
+    job_id = str(number)
+    if isinstance(record, dict):
+        job_id = next((str(record[alias]) for alias in FIELD_ALIASES["id"]
+                       if record.get(alias) not in (None, "")), job_id)
+    return {"id": job_id, "plant": None, "compensator": None, "sampling_time": None, "analyses": [],
+            "error": "".join(traceback.format_exception_only(type(error), error)).strip()}
+
+
+def normalise_job(record, number):
+    """ Job dict from a raw CSV row or JSON record, with defaults filled in """
+    if not isinstance(record, dict):
+        raise ValueError("Job {0} is not a record of named fields".format(number))
+    fields = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if record.get(alias) not in (None, ""):
+                fields[field] = record[alias]
+                break
+
+    if "plant" not in fields:
+        raise ValueError("Job {0} has no plant transfer function".format(number))
+    analyses = fields.get("analyses") or DEFAULT_ANALYSES
+    if isinstance(analyses, str):
+        analyses = analyses.replace(";", " ").replace(",", " ").split()
+    unknown = [name for name in analyses if name not in CONTINUOUS_ANALYSES]
+    if unknown:
+        raise ValueError("Job {0} requests unknown analyses: {1}".format(number, ", ".join(unknown)))
+
+    sampling_time = fields.get("sampling_time")
+    try:
+        sampling_time = float(sampling_time) if sampling_time is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("Job {0} has an invalid sampling time: {1!r}".format(number, sampling_time))
+    return {
+        "id": str(fields.get("id", number)),
+        "plant": str(fields["plant"]),
+        "compensator": str(fields.get("compensator", "1")),
+        "sampling_time": sampling_time,
+        "analyses": list(analyses),
+    }
+
+
+def run_job(job, use_cache=True):
+    """ Run every analysis requested by a job, returning a JSON-ready record of
+        the results (or the error raised) and the time taken by each analysis.
+    """
+    start = time.perf_counter()
+    record = {"id": job["id"], "plant": job["plant"], "compensator": job["compensator"],
+              "sampling_time": job["sampling_time"], "results": {}, "timings": {}}
+    if job.get("error"):
+        record.update(status="error", error=job["error"], seconds=0.0)
+        return record
+    try:
+        if job["sampling_time"]:
+            # margins are reported for the continuous plant, as on the Modern Control page
+            plant_tf = analysis.build_factored_system(job["plant"])
+            discrete_tf = analysis.build_discrete_system(job["plant"], job["compensator"],
+                                                         job["sampling_time"])
+        else:
+            sys_tf = analysis.build_factored_system(job["plant"], job["compensator"])
+        for name in job["analyses"]:
+            analysis_start = time.perf_counter()
+            if not job["sampling_time"]:
+                function, keywords = CONTINUOUS_ANALYSES[name]
+                target = sys_tf
+            elif name == "margins":
+                function, keywords = CONTINUOUS_ANALYSES[name]
+                target = plant_tf
+            else:
+                function, keywords = DISCRETE_ANALYSES[name]
+                target = discrete_tf
+                if function in (analysis.discrete_bode_response, analysis.discrete_time_response):
+                    keywords = dict(keywords, sampling_time=job["sampling_time"])
+
+            if use_cache:
+                result = cached_analysis(function, target, **keywords)
+            else:
+                result = function(target, **keywords)
+            record["results"][name] = to_json(result)
+            record["timings"][name] = time.perf_counter() - analysis_start
+        record["status"] = "ok"
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = "".join(traceback.format_exception_only(type(error), error)).strip()
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def to_json(value):
+    """ JSON-ready form of an analysis result: named tuples become objects,
+        arrays become lists, and complex values are split into real and imag.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if hasattr(value, "_fields"):
+        return dict((field, to_json(item)) for field, item in zip(value._fields, value))
+    if isinstance(value, (tuple, list)):
+        return [to_json(item) for item in value]
+    array = np.asarray(value)
+    if np.iscomplexobj(array):
+        return {"real": to_json(array.real), "imag": to_json(array.imag)}
+    if array.ndim:
+        return array.astype(float).tolist()
+    return float(array)
+
+
+def run_batch(jobs, output, processes=None, use_cache=True):
+    """ Run an iterable of jobs across a pool of worker processes, writing each
+        result to the output stream as a JSON line as it completes (so lines
+        are in completion order, not job order). Returns the BatchStats.
+
+        Set processes=1 to run in the calling process. When run from a script,
+        the call must sit under an 'if __name__ == "__main__":' guard. A job
+        that cannot be read or analysed is
+        written as an error record, and the rest of the batch carries on.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    times = []
+    failed = 0
+    start = time.perf_counter()
+
+    def write(record):
+        nonlocal failed
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        times.append(record["seconds"])
+        failed += record["status"] != "ok"
+
+    if processes == 1:
+        for job in jobs:
+            write(run_job(job, use_cache))
+    else:
+        jobs = iter(jobs)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = {}
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < processes*JOBS_PER_PROCESS:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                    else:
+                        pending[executor.submit(run_job, job, use_cache)] = job
+                if pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = pending.pop(future)
+                        try:
+                            write(future.result())
+                        except Exception as error:
+                            write(run_job(invalid_job(job, job["id"], error)))
+
+    return batch_stats(times, failed, time.perf_counter() - start)
+
+
+def batch_stats(times, failed, elapsed):
+    """ Throughput (jobs/s) and per-job timing statistics (s) for a finished batch """
+    if not times:
+        return BatchStats(0, 0, elapsed, 0.0, math.nan, math.nan, math.nan, math.nan)
+    times = np.asarray(times)
+    return BatchStats(len(times), failed, elapsed, len(times)/elapsed if elapsed else math.inf,
+                      float(times.mean()), float(np.median(times)),
+                      float(np.percentile(times, 95)), float(times.max()))
+
+
+def format_stats(stats):
+    """ Human-readable summary of the BatchStats of a run """
+    return ("{0} jobs ({1} failed) in {2:.2f}s - {3:.1f} jobs/s\n"
+            "per job: mean {4:.1f}ms, median {5:.1f}ms, 95th percentile {6:.1f}ms, "
+            "max {7:.1f}ms".format(stats.jobs, stats.failed, stats.elapsed, stats.throughput,
+                                   stats.mean_time*1000, stats.median_time*1000,
+                                   stats.p95_time*1000, stats.max_time*1000))
+
+
+def main(argv=None):
+    """ Command-line entry point: run a job file and report the statistics """
+    parser = argparse.ArgumentParser(prog="python -m control_engine",
+                                     description="Run Control Engineering analyses over a file of jobs.")
+    parser.add_argument("jobs", help="CSV or JSON lines file with plant, compensator, "
+                                     "sampling_time and analyses for each job")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSON lines file for the results (default: standard output)")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always recompute rather than using the on-disk result cache")
+    parser.add_argument("--list-analyses", action="store_true",
+                        help="print the available analyses and exit")
+    args = parser.parse_args(argv)
+
+    if args.list_analyses:
+        print("\n".join(ANALYSES))
+        return 0
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        stats = run_batch(read_jobs(args.jobs), output, args.processes, not args.no_cache)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(format_stats(stats), file=sys.stderr)
+    return 1 if stats.failed else 0
@@ -0,0 +1,126 @@
+"""
+    Side-by-side comparison of a digital design at several sampling periods.
+
+    Choosing the sampling period Ts trades processor load against the phase
+    lost to the zero-order hold, so a design is usually tried at a handful of
+    candidate periods. Here the continuous plant is factored once and
+    discretised for every period in one stacked pass (see
+    sampling.discretize_factored), so high-order plants keep their accuracy.
+    Each period's margins, closed-loop poles, step response metrics
+    and Bode response up to its Nyquist frequency are then returned as columns
+    of one table, aligned with the list of periods.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .analysis import BodeResponse, TimeResponse, build_factored_system
+from .expressions import compile_factored
+from .factored import FactoredTF, factored_margins
+from .frequency_grid import adaptive_zpk_grid
+from .instrument import stage
+from .metrics import step_metrics
+from .sampling import discretize_factored
+from .simulate import MAX_STEPS, LTISimulator, default_time_step
+
+SamplingComparison = namedtuple("SamplingComparison", [
+    "sampling_times", "gain_margin_db", "phase_margin", "wcg", "wcp", "stable", "pole_radius",
+    "rise_time", "overshoot", "settling_time", "final_value", "closed_loop_poles", "bode", "step"])
+
+# (heading, column, format) of each column of the comparison table
+COMPARISON_COLUMNS = (("Ts (s)", "sampling_times", "{0:.4g}"),
+                      ("GM (dB)", "gain_margin_db", "{0:.2f}"),
+                      ("PM (deg)", "phase_margin", "{0:.2f}"),
+                      ("wcg (rad/s)", "wcg", "{0:.4g}"),
+                      ("wcp (rad/s)", "wcp", "{0:.4g}"),
+                      ("max |pole|", "pole_radius", "{0:.4f}"),
+                      ("stable", "stable", "{0}"),
+                      ("rise (s)", "rise_time", "{0:.4g}"),
+                      ("overshoot (%)", "overshoot", "{0:.2f}"),
+                      ("settling (s)", "settling_time", "{0:.4g}"),
+                      ("final", "final_value", "{0:.4g}"))
+
+
+def compare_sampling_times(oltf, dig_compensator, sampling_times, points=500):
+    """ Discrete unity feedback designs for the s-domain plant and z-domain
+        compensator expressions at each sampling period (s) in a list. Table
+        columns are arrays in the order of sampling_times; closed_loop_poles,
+        bode and step are lists of per-period results. Step responses all
+        cover the same time span, long enough for the slowest loop to settle,
+        so they can be overlaid.
+    """
+    sampling_times = np.atleast_1d(np.asarray(sampling_times, dtype=float))
+    if not sampling_times.size or np.any(sampling_times <= 0):
+        raise ValueError("Sampling periods must be positive")
+
+    with stage("sampling comparison", periods=len(sampling_times)):
+        plant = build_factored_system(oltf)
+        comp = compile_factored(dig_compensator, variable="z")
+        loops = [sampled*FactoredTF(comp.zeros, comp.poles, comp.gain, sampled.dt)
+                 for sampled in discretize_factored(plant, sampling_times)]
+
+        margins = np.array([factored_margins(loop) for loop in loops], dtype=float).reshape(-1, 4)
+        with np.errstate(divide='ignore'):
+            gain_margin_db = np.where(margins[:, 0] > 0, 20*np.log10(margins[:, 0]), 0.0)
+        closed_loops = [loop.feedback() for loop in loops]
+        poles = [closed.poles_ for closed in closed_loops]
+        pole_radius = np.array([np.abs(roots).max() if roots.size else 0.0 for roots in poles])
+
+        bode = []
+        for loop in loops:
+            omega, response = adaptive_zpk_grid(loop.zeros_, loop.poles_, loop.gain, loop.dt, points=points)
+            with np.errstate(divide='ignore'):
+                mag_db = 20*np.log10(np.abs(response))
+            bode.append(BodeResponse(mag_db, np.degrees(np.unwrap(np.angle(response))), omega))
+
+        steps, metrics = _step_responses(loops, closed_loops, pole_radius < 1)
+
+    def column(name):
+        return np.array([getattr(metric, name) for metric in metrics], dtype=float)
+
+    return SamplingComparison(sampling_times, gain_margin_db, margins[:, 1], margins[:, 2], margins[:, 3],
+                              pole_radius < 1, pole_radius, column("rise_time"), column("overshoot"),
+                              column("settling_time"), column("final_value"), poles, bode, steps)
+
+
+def comparison_rows(comparison):
+    """ Formatted table cells for a SamplingComparison, one row per sampling
+        period, in the order of COMPARISON_COLUMNS
+    """
+    cells = [[form.format(value) for value in getattr(comparison, column)]
+             for _, column, form in COMPARISON_COLUMNS]
+    return list(zip(*cells))
+
+
+def comparison_table(comparison):
+    """ A SamplingComparison as a plain text table with aligned columns """
+    rows = [tuple(heading for heading, _, _ in COMPARISON_COLUMNS)] + comparison_rows(comparison)
+    widths = [max(len(row[index]) for row in rows) for index in range(len(COMPARISON_COLUMNS))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def _step_responses(loops, closed_loops, stable):
+    """ Step responses of the discrete closed loops over a shared time span,
+        and the StepMetrics of each, measured against its DC gain L/(1 + L)
+        at z = 1. This is found from the open loop, as closed-loop poles
+        crowded near z = 1 at short sampling periods make it inaccurate to
+        evaluate the closed loop there directly.
+    """
+    spans = [period*count for period, count in (default_time_step(closed) for closed in closed_loops)]
+    settled = [span for span, converges in zip(spans, stable) if converges]
+    span = max(settled or spans)
+
+    steps, metrics = [], []
+    for loop, closed, converges in zip(loops, closed_loops, stable):
+        count = int(min(np.ceil(span/closed.dt), MAX_STEPS))
+        with np.errstate(over='ignore', invalid='ignore'):
+            time, response = LTISimulator(closed).step(count)
+        steps.append(TimeResponse(time, response))
+
+        # unstable loops have no final value to measure against
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dc_gain = loop.evaluate(np.ones(1))[0].real
+        final_value = np.nan if not converges else 1.0 if np.isinf(dc_gain) else dc_gain/(1 + dc_gain)
+        metrics.append(step_metrics(time, response, final_value, discrete=True))
+    return steps, metrics
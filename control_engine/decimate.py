@@ -0,0 +1,84 @@
+"""
+    Reduction of dense traces to the resolution they are displayed at.
+
+    A line drawn across a few hundred pixels gains nothing from holding
+    hundreds of thousands of points, but matplotlib still has to transform and
+    rasterise every one of them. Traces with increasing x (Bode, time
+    responses) are split into one bucket per pixel column, and only the first,
+    last, lowest and highest point of each bucket is kept, so peaks, notches
+    and steps look exactly as they would at full resolution. Parametric
+    curves (Nyquist, root locus) instead drop the points that stay within the
+    same pixel as both of their neighbours. Non-finite values are always
+    kept, so gaps in a trace are preserved.
+"""
+
+import numpy as np
+
+
+def minmax_decimate(x, y, buckets, log_x=False):
+    """ (x, y) reduced to at most four points per bucket (typically one per
+        pixel column), keeping each bucket's extremes. x must be increasing;
+        set log_x for buckets of equal width on a logarithmic axis.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    buckets = max(int(buckets), 1)
+    if len(x) <= 4*buckets:
+        return x, y
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        position = np.log10(x) if log_x else x
+    finite = np.isfinite(position)
+    if not finite.any():
+        return x, y
+    low, high = position[finite].min(), position[finite].max()
+    if high <= low:
+        return x, y
+    bucket = np.floor((position - low)/(high - low)*buckets)
+    bucket = np.clip(np.where(finite, bucket, -1), -1, buckets - 1).astype(int)
+
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1))
+    ends = np.append(starts[1:], len(x)) - 1
+    sizes = np.diff(np.append(starts, len(x)))
+    valid = np.isfinite(y)
+    lowest = _first_extreme(np.where(valid, y, np.inf), starts, sizes, np.minimum)
+    highest = _first_extreme(np.where(valid, y, -np.inf), starts, sizes, np.maximum)
+
+    keep = np.unique(np.concatenate((starts, ends, lowest, highest, np.flatnonzero(~valid))))
+    return x[keep], y[keep]
+
+
+def thin_path(x, y, x_resolution, y_resolution):
+    """ (x, y) of a parametric curve without the points lying in the same
+        x_resolution by y_resolution cell (a pixel, in data units) as both
+        of their neighbours.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 3 or not (x_resolution > 0 and y_resolution > 0):
+        return x, y
+
+    with np.errstate(invalid='ignore'):
+        column = np.floor(x/x_resolution)
+        row = np.floor(y/y_resolution)
+    same = (column[1:] == column[:-1]) & (row[1:] == row[:-1])
+    interior = same[1:] & same[:-1]
+    keep = np.concatenate(([True], ~interior, [True])) | ~(np.isfinite(x) & np.isfinite(y))
+    return x[keep], y[keep]
+
+
+def visible_range(x, lower, upper):
+    """ Slice of increasing x covering [lower, upper], with one point beyond
+        each end so a line drawn from it still reaches the edges of the view.
+    """
+    start = max(int(np.searchsorted(x, lower, side="left")) - 1, 0)
+    stop = min(int(np.searchsorted(x, upper, side="right")) + 1, len(x))
+    return slice(start, stop)
+
+
+def _first_extreme(values, starts, sizes, reduce):
+    """ Index of the first minimum (or maximum) within each run of values """
+    extremes = np.repeat(reduce.reduceat(values, starts), sizes)
+    candidates = np.flatnonzero(values == extremes)
+    run = np.searchsorted(starts, candidates, side="right")
+    return candidates[np.concatenate(([True], np.diff(run) != 0))]
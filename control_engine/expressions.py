@@ -0,0 +1,338 @@
+"""
+    Safe compiler for the algebraic transfer function expressions entered in
+    the app, e.g. "1/(s*(s+1))" or "(z-0.5)/(z-1)".
+
+    Rather than handing the text to eval(), each expression is parsed into a
+    Python syntax tree and walked with a small whitelist of operations (numbers,
+    the domain variable, named parameters, + - * / and integer powers). The tree
+    is reduced directly to numerator and denominator coefficient arrays, and the
+    result is cached against the normalised expression text so repeat analyses
+    of the same plant skip parsing and polynomial algebra entirely.
+"""
+
+import ast
+import itertools
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# number of distinct compiled expressions held before the least recently used is evicted
+CACHE_SIZE = 512
+
+CompiledTF = namedtuple("CompiledTF", ["num", "den"])
+CompiledZPK = namedtuple("CompiledZPK", ["zeros", "poles", "gain"])
+
+# largest integer power accepted, guarding against runaway polynomial expansion
+MAX_EXPONENT = 64
+
+# highest degree (number of roots, in factored form) of any polynomial an
+# expression reduces to, checked before multiplying so nested powers cannot
+# expand without bound
+MAX_DEGREE = 256
+
+# named constants that may appear in an expression alongside numbers
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def normalise_expression(expression):
+    """ Canonical text form of an expression, used as its cache key. Whitespace
+        is removed and the '^' power notation is accepted as '**'.
+    """
+    return "".join(str(expression).split()).replace("^", "**")
+
+
+def compile_expression(expression, variable="s", parameters=None):
+    """ Compile an algebraic transfer function expression in the given domain
+        variable ('s' or 'z') into (num, den) coefficient arrays, highest power
+        first, with the leading denominator coefficient normalised to one.
+
+        Any other names used in the expression must be supplied as numeric
+        values through the parameters dict. The returned arrays are shared
+        between callers via the cache, and so are marked read-only.
+    """
+    if parameters:
+        parameter_items = tuple(sorted((name, float(value)) for name, value in parameters.items()))
+    else:
+        parameter_items = ()
+    return _compile(normalise_expression(expression), variable, parameter_items)
+
+
+def compile_factored(expression, variable="s", parameters=None):
+    """ Compile an expression into its (zeros, poles, gain) without expanding
+        products into one high-order polynomial. Products, quotients and powers
+        simply gather the roots of their operands; only sums are expanded, and
+        then just the polynomials being added, so the roots of each factor are
+        found from its own low-order coefficients. Arrays are read-only, as for
+        compile_expression.
+    """
+    if parameters:
+        parameter_items = tuple(sorted((name, float(value)) for name, value in parameters.items()))
+    else:
+        parameter_items = ()
+    return _compile_factored(normalise_expression(expression), variable, parameter_items)
+
+
+def parameterise_expression(expression, prefix="p"):
+    """ (template, values) with each number in an expression replaced by a named
+        parameter, so "(s+2)/(s+5)" becomes "(s+p1)/(s+p2)" with values
+        {"p1": 2.0, "p2": 5.0} in order of appearance. Integer exponents are
+        left as they are. The template compiles back to the original expression
+        when given these values, and can be recompiled as any of them change.
+    """
+    normalised = normalise_expression(expression)
+    tree = _parse(normalised)
+    exponents = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            exponents.update(id(child) for child in ast.walk(node.right))
+    literals = sorted((node.col_offset, node.end_col_offset, node.value) for node in ast.walk(tree)
+                      if isinstance(node, ast.Constant) and id(node) not in exponents)
+
+    used = set(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+    names = (name for name in ("{0}{1}".format(prefix, index) for index in itertools.count(1))
+             if name not in used)
+    pieces, values, position = [], {}, 0
+    for start, end, value in literals:
+        name = next(names)
+        pieces.extend((normalised[position:start], name))
+        values[name] = float(value)
+        position = end
+    pieces.append(normalised[position:])
+    return "".join(pieces), values
+
+
+def substitute_parameters(template, parameters):
+    """ Expression text with each named parameter of a template replaced by its
+        value, the reverse of parameterise_expression: "(s+p1)/(s+p2)" with
+        {"p1": 2.0, "p2": 5.0} becomes "(s+2)/(s+5)". Negative values are
+        bracketed, and names without a value are left in place.
+    """
+    normalised = normalise_expression(template)
+    names = sorted((node.col_offset, node.end_col_offset, node.id) for node in ast.walk(_parse(normalised))
+                   if isinstance(node, ast.Name) and node.id in parameters)
+    pieces, position = [], 0
+    for start, end, name in names:
+        value = "{0:.6g}".format(float(parameters[name]))
+        pieces.extend((normalised[position:start], "({0})".format(value) if value.startswith("-") else value))
+        position = end
+    pieces.append(normalised[position:])
+    return "".join(pieces)
+
+
+def cache_info():
+    """ Hit/miss statistics of the compiled expression cache """
+    return _compile.cache_info()
+
+
+def clear_cache():
+    """ Empty the compiled expression caches """
+    _compile.cache_clear()
+    _compile_factored.cache_clear()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile(normalised, variable, parameter_items):
+    """ Parse and reduce a normalised expression - cached on all arguments """
+    tree = _parse(normalised)
+    num, den = _Reducer(variable, dict(parameter_items)).visit(tree.body)
+    num, den = _trim(num), _trim(den)
+    if not np.any(den):
+        raise ValueError("Transfer function denominator is zero: {0}".format(normalised))
+
+    # normalise so the denominator is monic
+    num, den = num/den[0], den/den[0]
+    num.flags.writeable = False
+    den.flags.writeable = False
+    return CompiledTF(num, den)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile_factored(normalised, variable, parameter_items):
+    """ Parse and reduce a normalised expression to factored form - cached """
+    tree = _parse(normalised)
+    zeros, poles, gain = _FactoredReducer(variable, dict(parameter_items)).visit(tree.body)
+    zeros, poles = np.array(zeros, dtype=complex), np.array(poles, dtype=complex)
+    zeros.flags.writeable = False
+    poles.flags.writeable = False
+    return CompiledZPK(zeros, poles, float(gain))
+
+
+def _parse(normalised):
+    """ Syntax tree of a normalised expression, with errors as ValueError """
+    if not normalised:
+        raise ValueError("Empty transfer function expression")
+    try:
+        return ast.parse(normalised, mode="eval")
+    except SyntaxError:
+        raise ValueError("Invalid transfer function expression: {0}".format(normalised))
+
+
+def _check_degree(degree):
+    """ Reject a polynomial of more than MAX_DEGREE before it is formed """
+    if degree > MAX_DEGREE:
+        raise ValueError("Transfer function expression expands to degree {0}, above the maximum of {1}".format(
+                         degree, MAX_DEGREE))
+
+
+def _check_degrees(operator, left, right):
+    """ Check the numerator and denominator degrees that combining operands of
+        (numerator, denominator) degrees left and right with operator would give
+    """
+    if isinstance(operator, (ast.Add, ast.Sub)):
+        _check_degree(max(left[0] + right[1], right[0] + left[1]))
+        _check_degree(left[1] + right[1])
+    elif isinstance(operator, ast.Mult):
+        _check_degree(left[0] + right[0])
+        _check_degree(left[1] + right[1])
+    elif isinstance(operator, ast.Div):
+        _check_degree(left[0] + right[1])
+        _check_degree(left[1] + right[0])
+
+
+def _trim(poly):
+    """ Remove leading zero coefficients from a polynomial array """
+    poly = np.trim_zeros(np.asarray(poly, dtype=float), "f")
+    return poly if poly.size else np.zeros(1)
+
+
+class _Reducer(ast.NodeVisitor):
+    """ Walks a parsed expression, reducing each whitelisted node to a rational
+        function held as a (num, den) pair of polynomial coefficient arrays.
+    """
+    def __init__(self, variable, parameters):
+        self.variable = variable
+        self.parameters = parameters
+
+    def generic_visit(self, node):
+        raise ValueError("Unsupported syntax in transfer function expression: {0}".format(
+                         type(node).__name__))
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError("Unsupported constant in transfer function expression: {0!r}".format(
+                             node.value))
+        return np.array([float(node.value)]), np.ones(1)
+
+    def visit_Name(self, node):
+        if node.id == self.variable:
+            return np.array([1.0, 0.0]), np.ones(1)
+        if node.id in self.parameters:
+            return np.array([self.parameters[node.id]]), np.ones(1)
+        if node.id in CONSTANTS:
+            return np.array([CONSTANTS[node.id]]), np.ones(1)
+        raise ValueError("Unknown name '{0}' in transfer function expression".format(node.id))
+
+    def visit_UnaryOp(self, node):
+        num, den = self.visit(node.operand)
+        if isinstance(node.op, ast.USub):
+            return -num, den
+        if isinstance(node.op, ast.UAdd):
+            return num, den
+        return self.generic_visit(node.op)
+
+    def visit_BinOp(self, node):
+        if isinstance(node.op, ast.Pow):
+            return self._power(self.visit(node.left), node.right)
+
+        (num_l, den_l), (num_r, den_r) = self.visit(node.left), self.visit(node.right)
+        left, right = (len(num_l) - 1, len(den_l) - 1), (len(num_r) - 1, len(den_r) - 1)
+        _check_degrees(node.op, left, right)
+        if isinstance(node.op, ast.Add):
+            return np.polyadd(np.polymul(num_l, den_r), np.polymul(num_r, den_l)), np.polymul(den_l, den_r)
+        if isinstance(node.op, ast.Sub):
+            return np.polysub(np.polymul(num_l, den_r), np.polymul(num_r, den_l)), np.polymul(den_l, den_r)
+        if isinstance(node.op, ast.Mult):
+            return np.polymul(num_l, num_r), np.polymul(den_l, den_r)
+        if isinstance(node.op, ast.Div):
+            if not np.any(num_r):
+                raise ValueError("Division by zero in transfer function expression")
+            return np.polymul(num_l, den_r), np.polymul(den_l, num_r)
+        return self.generic_visit(node.op)
+
+    def _power(self, base, exponent_node):
+        """ Raise a rational function to a (possibly negative) integer power """
+        exponent = self._exponent(exponent_node)
+        num, den = base
+        _check_degree(abs(exponent)*(max(len(num), len(den)) - 1))
+        if exponent < 0:
+            num, den = den, num
+        result_num, result_den = np.ones(1), np.ones(1)
+        for _ in range(abs(exponent)):
+            result_num, result_den = np.polymul(result_num, num), np.polymul(result_den, den)
+        return result_num, result_den
+
+    def _exponent(self, node):
+        """ Value of a constant integer exponent, checked against MAX_EXPONENT """
+        exponent_num, exponent_den = map(_trim, _Reducer(self.variable, self.parameters).visit(node))
+        if len(exponent_num) != 1 or len(exponent_den) != 1:
+            raise ValueError("Exponents in transfer function expressions must be constant")
+        exponent = exponent_num[0]/exponent_den[0]
+        if exponent != int(exponent):
+            raise ValueError("Exponents in transfer function expressions must be integers")
+        if abs(exponent) > MAX_EXPONENT:
+            raise ValueError("Exponent {0:g} exceeds the maximum of {1}".format(exponent, MAX_EXPONENT))
+        return int(exponent)
+
+
+class _FactoredReducer(_Reducer):
+    """ Walks a parsed expression as _Reducer does, but reduces each node to a
+        (zeros, poles, gain) triple, expanding polynomials only to add them.
+    """
+    def visit_Constant(self, node):
+        num, _ = _Reducer.visit_Constant(self, node)
+        return _EMPTY, _EMPTY, num[0]
+
+    def visit_Name(self, node):
+        if node.id == self.variable:
+            return np.zeros(1, dtype=complex), _EMPTY, 1.0
+        num, _ = _Reducer.visit_Name(self, node)
+        return _EMPTY, _EMPTY, num[0]
+
+    def visit_UnaryOp(self, node):
+        zeros, poles, gain = self.visit(node.operand)
+        if isinstance(node.op, ast.USub):
+            return zeros, poles, -gain
+        if isinstance(node.op, ast.UAdd):
+            return zeros, poles, gain
+        return self.generic_visit(node.op)
+
+    def visit_BinOp(self, node):
+        if isinstance(node.op, ast.Pow):
+            return self._power(self.visit(node.left), node.right)
+
+        (zeros_l, poles_l, gain_l), (zeros_r, poles_r, gain_r) = self.visit(node.left), self.visit(node.right)
+        _check_degrees(node.op, (len(zeros_l), len(poles_l)), (len(zeros_r), len(poles_r)))
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            sign = 1.0 if isinstance(node.op, ast.Add) else -1.0
+            left = np.polymul(gain_l*np.real(np.poly(zeros_l)), np.real(np.poly(poles_r)))
+            right = np.polymul(sign*gain_r*np.real(np.poly(zeros_r)), np.real(np.poly(poles_l)))
+            num = _trim(np.polyadd(left, right))
+            if not np.any(num):
+                return _EMPTY, _EMPTY, 0.0
+            return np.roots(num).astype(complex), np.concatenate((poles_l, poles_r)), num[0]
+        if isinstance(node.op, ast.Mult):
+            if gain_l == 0 or gain_r == 0:
+                return _EMPTY, _EMPTY, 0.0
+            return np.concatenate((zeros_l, zeros_r)), np.concatenate((poles_l, poles_r)), gain_l*gain_r
+        if isinstance(node.op, ast.Div):
+            if gain_r == 0:
+                raise ValueError("Division by zero in transfer function expression")
+            return np.concatenate((zeros_l, poles_r)), np.concatenate((poles_l, zeros_r)), gain_l/gain_r
+        return self.generic_visit(node.op)
+
+    def _power(self, base, exponent_node):
+        """ Raise a factored rational function to a (possibly negative) integer power """
+        exponent = self._exponent(exponent_node)
+        zeros, poles, gain = base
+        if exponent < 0:
+            if gain == 0:
+                raise ValueError("Division by zero in transfer function expression")
+            zeros, poles, gain = poles, zeros, 1.0/gain
+        count = abs(exponent)
+        _check_degree(count*max(len(zeros), len(poles)))
+        return np.tile(zeros, count), np.tile(poles, count), gain**count
+
+
+_EMPTY = np.zeros(0, dtype=complex)
@@ -0,0 +1,345 @@
+"""
+    Factored (zero/pole/gain) transfer functions for high-order loops.
+
+    Multiplying transfer functions as coefficient polynomials, and then
+    re-finding the roots of the products, loses accuracy quickly once a loop
+    has twenty or more states. A FactoredTF instead keeps its zeros, poles and
+    gain: series connection just gathers roots, and unity (or general)
+    feedback finds the closed-loop poles as the eigenvalues of a diagonally
+    balanced state-space realisation built from first and second-order
+    sections, each of which is well conditioned. The frequency response is
+    evaluated factor by factor, and coefficients are only formed on request.
+
+    A FactoredTF offers the poles(), zeros(), dt and isdtime() members of a
+    python-control transfer function, so it can be passed to the analysis
+    functions in place of one.
+"""
+
+import math
+
+import numpy as np
+import control
+import scipy.optimize
+from scipy.linalg import eigvals, matrix_balance
+
+from .freqresp import evaluation_points, zpk_evaluate
+from .frequency_grid import adaptive_zpk_grid, zpk_frequency_range
+
+# imaginary parts below this (relative to the root's size) are treated as real
+REAL_TOLERANCE = 1e-9
+
+
+class FactoredTF(object):
+    """ SISO transfer function gain*prod(s - zeros)/prod(s - poles), with
+        sampling period dt for a discrete system (None if continuous).
+    """
+    def __init__(self, zeros, poles, gain, dt=None):
+        self.zeros_ = np.array(zeros, dtype=complex).reshape(-1)
+        self.poles_ = np.array(poles, dtype=complex).reshape(-1)
+        self.gain = float(np.real(gain))
+        self.dt = dt if dt else None
+        self._realisation = None
+
+    @classmethod
+    def from_coefficients(cls, num, den, dt=None):
+        """ Factored form of a num/den transfer function """
+        num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=float)), "f")
+        den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=float)), "f")
+        if not den.size:
+            raise ValueError("Transfer function denominator is zero")
+        if not num.size:
+            return cls([], np.roots(den), 0.0, dt)
+        return cls(np.roots(num), np.roots(den), num[0]/den[0], dt)
+
+    @classmethod
+    def from_tf(cls, sys_tf):
+        """ Factored form of a python-control SISO transfer function """
+        if isinstance(sys_tf, cls):
+            return sys_tf
+        dt = sys_tf.dt if sys_tf.isdtime(strict=True) else None
+        return cls.from_coefficients(sys_tf.num[0][0], sys_tf.den[0][0], dt)
+
+    def __repr__(self):
+        return "FactoredTF(zeros={0}, poles={1}, gain={2!r}, dt={3!r})".format(
+            np.array2string(self.zeros_), np.array2string(self.poles_), self.gain, self.dt)
+
+    def zeros(self):
+        return self.zeros_.copy()
+
+    def poles(self):
+        return self.poles_.copy()
+
+    def isdtime(self, strict=False):
+        return self.dt is not None
+
+    def isctime(self, strict=False):
+        return self.dt is None
+
+    @property
+    def relative_degree(self):
+        return len(self.poles_) - len(self.zeros_)
+
+    def __mul__(self, other):
+        """ Series connection with another system or a scalar gain """
+        other = self._coerce(other)
+        return FactoredTF(np.concatenate((self.zeros_, other.zeros_)),
+                          np.concatenate((self.poles_, other.poles_)),
+                          self.gain*other.gain, self._common_dt(other))
+
+    __rmul__ = __mul__
+
+    def series(self, other):
+        return self*other
+
+    def feedback(self, other=1, sign=-1):
+        """ Closed-loop system self/(1 - sign*self*other), negative feedback by
+            default. The closed-loop poles are the eigenvalues of the balanced
+            loop realisation; the zeros are those of self and the poles of
+            other. Improper loops fall back to coefficient arithmetic.
+        """
+        other = self._coerce(other)
+        dt = self._common_dt(other)
+        if self.relative_degree < 0 or other.relative_degree < 0:
+            closed = control.feedback(self.to_tf(), other.to_tf(), sign)
+            return FactoredTF.from_tf(closed)
+
+        A1, B1, C1, D1 = self.state_space()
+        A2, B2, C2, D2 = other.state_space()
+        loop_gain = 1 - sign*D1*D2
+        if abs(loop_gain) < 1e-12:
+            raise ValueError("Feedback loop is algebraically ill-posed (1 + G*H is zero at infinity)")
+
+        # states are [x1, x2]; y1 = Cy.x + Dy.r, and the plant input is u1 = Cu.x + Du.r
+        n1, n2 = len(A1), len(A2)
+        Cy = np.concatenate((C1, sign*D1*C2))/loop_gain
+        Cu = np.concatenate((np.zeros(n1), sign*C2)) + sign*D2*Cy
+        A = np.zeros((n1 + n2, n1 + n2))
+        A[:n1, :n1] = A1
+        A[n1:, n1:] = A2
+        A[:n1, :] += np.outer(B1, Cu)
+        A[n1:, :] += np.outer(B2, Cy)
+        poles = _eigenvalues(A)
+
+        if self.relative_degree + other.relative_degree == 0:
+            gain = self.gain/(1 - sign*self.gain*other.gain)
+        else:
+            gain = self.gain
+        return FactoredTF(np.concatenate((self.zeros_, other.poles_)), poles, gain, dt)
+
+    def state_space(self):
+        """ (A, B, C, D) realisation as a cascade of first and second-order
+            sections, diagonally balanced, with B and C as 1-D arrays and D a
+            scalar. The system must be proper. The realisation is built once
+            and shared between callers, so its arrays are read-only.
+        """
+        if self._realisation is None:
+            A, B, C, D = self._realise()
+            for array in (A, B, C):
+                array.flags.writeable = False
+            self._realisation = A, B, C, D
+        return self._realisation
+
+    def _realise(self):
+        """ Balanced section cascade realisation, as returned by state_space """
+        if self.relative_degree < 0:
+            raise ValueError("Improper transfer function has no state-space realisation")
+        sections = _sections(self.zeros_, self.poles_)
+        if not sections:
+            return np.zeros((0, 0)), np.zeros(0), np.zeros(0), self.gain
+
+        # share the gain out so every section has a comparable gain, rather than
+        # one section carrying a huge (or tiny) overall factor
+        scales = [_size(np.roots(den))/_size(np.roots(num)) for num, den in sections]
+        residual = self.gain/np.prod(scales)
+        share = abs(residual)**(1.0/len(sections))
+        A, B, C, D = np.zeros((0, 0)), np.zeros(0), np.zeros(0), math.copysign(1.0, residual)
+        for (num, den), scale in zip(sections, scales):
+            A, B, C, D = _cascade((A, B, C, D), _companion(num*scale*share, den))
+        if len(A):
+            A, (scale, _) = matrix_balance(A, permute=False, separate=True)
+            B, C = B/scale, C*scale
+        return A, B, C, D
+
+    def coefficients(self):
+        """ (num, den) coefficient arrays, highest power first """
+        num = self.gain*np.real(np.poly(self.zeros_)) if self.gain else np.zeros(1)
+        return np.atleast_1d(num), np.atleast_1d(np.real(np.poly(self.poles_)))
+
+    def to_tf(self):
+        """ Equivalent python-control transfer function """
+        num, den = self.coefficients()
+        return control.tf(num, den, self.dt) if self.dt else control.tf(num, den)
+
+    def evaluate(self, points):
+        """ Complex response at points in the s (or z) plane """
+        return zpk_evaluate(self.zeros_, self.poles_, self.gain, points)
+
+    def frequency_response(self, omega):
+        """ Complex response at the given angular frequencies (rad/s) """
+        return self.evaluate(evaluation_points(omega, self.dt))
+
+    def _coerce(self, other):
+        if isinstance(other, FactoredTF):
+            return other
+        if isinstance(other, control.TransferFunction):
+            return FactoredTF.from_tf(other)
+        return FactoredTF([], [], float(other), self.dt)
+
+    def _common_dt(self, other):
+        if self.dt and other.dt and self.dt != other.dt:
+            raise ValueError("Cannot connect systems with different sampling periods")
+        return self.dt or other.dt
+
+
+def factored_margins(sys):
+    """ Gain margin (absolute), phase margin (deg), and the phase and gain
+        crossover frequencies (rad/s) of a FactoredTF, with the same meaning
+        and selection rules as control.margin. Crossings are bracketed on an
+        adaptive frequency grid and then solved to full precision.
+    """
+    lower, upper = zpk_frequency_range(sys.zeros_, sys.poles_, sys.dt)
+    lower /= 10.0
+    if not sys.dt:
+        upper *= 10.0
+    omega, response = adaptive_zpk_grid(sys.zeros_, sys.poles_, sys.gain, sys.dt,
+                                        points=500, omega_range=(lower, upper))
+    return margins_on_grid(omega, response, sys.frequency_response, sys.dt)
+
+
+def margins_on_grid(omega, response, frequency_response, dt=None):
+    """ Gain margin, phase margin (deg) and the phase and gain crossover
+        frequencies (rad/s) from a response sampled on a frequency grid, as
+        factored_margins. Crossings are bracketed between grid points and then
+        solved with frequency_response(omega), which evaluates the response
+        exactly at an array of frequencies. As in control.margin, a negative
+        real response at zero frequency (or, for a system sampled every dt
+        seconds, at the Nyquist frequency) also counts as a phase crossing.
+    """
+    def log_gain(w):
+        return math.log(abs(frequency_response(np.array([w]))[0]))
+
+    def reverse_angle(w):
+        return float(np.angle(-frequency_response(np.array([w]))[0]))
+
+    finite = np.isfinite(response)
+    with np.errstate(divide='ignore'):
+        magnitude = np.log(np.abs(response))
+    angle = np.angle(-response)
+
+    w_180 = []
+    for index in np.flatnonzero(np.diff(np.sign(angle)) != 0):
+        if finite[index] and finite[index + 1] and response[index].real <= 0 and \
+                abs(angle[index] - angle[index + 1]) < math.pi:
+            w_180.append(scipy.optimize.brentq(reverse_angle, omega[index], omega[index + 1],
+                                               xtol=1e-14*omega[index]))
+
+    # the grid stops short of the ends of the frequency axis, where the response is real
+    ends = np.array([0.0, math.pi/dt] if dt else [0.0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        at_ends = frequency_response(ends)
+    real = np.isfinite(at_ends) & (np.abs(at_ends.imag) <= REAL_TOLERANCE*np.abs(at_ends))
+    w_180.extend(ends[real & (at_ends.real < 0)])
+
+    wc = []
+    for index in np.flatnonzero(np.diff(np.sign(magnitude)) != 0):
+        if np.isfinite(magnitude[index]) and np.isfinite(magnitude[index + 1]):
+            wc.append(scipy.optimize.brentq(log_gain, omega[index], omega[index + 1],
+                                            xtol=1e-14*omega[index]))
+
+    w_180, wc = np.array(w_180), np.array(wc)
+    with np.errstate(divide='ignore'):
+        gm = 1.0/np.abs(frequency_response(w_180)) if w_180.size else np.array([])
+    pm = np.remainder(np.angle(frequency_response(wc), deg=True), 360.0) - 180.0 \
+        if wc.size else np.array([])
+
+    if gm.size and not np.isinf(gm).all():
+        with np.errstate(divide='ignore'):
+            index = int(np.argmin(np.abs(np.log(gm))))
+        gain_margin, wcg = float(gm[index]), float(w_180[index])
+    else:
+        gain_margin, wcg = math.inf, math.nan
+    if pm.size:
+        index = int(np.argmin(np.abs(pm)))
+        phase_margin, wcp = float(pm[index]), float(wc[index])
+    else:
+        phase_margin, wcp = math.inf, math.nan
+    return gain_margin, phase_margin, wcg, wcp
+
+
+def _eigenvalues(A):
+    """ Eigenvalues of a balanced square matrix, with near-real values made real """
+    if not len(A):
+        return np.zeros(0, dtype=complex)
+    values = eigvals(matrix_balance(A, permute=True)[0])
+    values = np.where(np.abs(values.imag) <= REAL_TOLERANCE*np.maximum(1.0, np.abs(values)),
+                      values.real, values)
+    return values.astype(complex)
+
+
+def _real_factors(roots):
+    """ Real coefficient polynomials of degree 1 (real roots) or 2 (complex
+        conjugate pairs) whose product has the given roots.
+    """
+    roots = np.asarray(roots, dtype=complex)
+    real = np.abs(roots.imag) <= REAL_TOLERANCE*np.maximum(1.0, np.abs(roots))
+    factors = [np.array([1.0, -root.real]) for root in roots[real]]
+    for root in roots[~real & (roots.imag > 0)]:
+        factors.append(np.array([1.0, -2*root.real, abs(root)**2]))
+    return factors
+
+
+def _size(roots):
+    """ Product of the magnitudes of the non-zero roots - a section's gain scale """
+    magnitudes = np.abs(roots)
+    return float(np.prod(magnitudes[magnitudes > 0]))
+
+
+def _sections(zeros, poles):
+    """ (num, den) pairs of real first and second-order sections, each proper,
+        whose product has the given zeros and poles and unit leading gain.
+    """
+    dens = sorted(_real_factors(poles), key=len, reverse=True)
+    nums = sorted(_real_factors(zeros), key=len, reverse=True)
+    sections = [[np.ones(1), den] for den in dens]
+
+    for num in nums:
+        fitting = [section for section in sections
+                   if len(section[1]) - len(section[0]) >= len(num) - 1]
+        if not fitting:
+            # a complex zero pair with only first-order sections left: merge two of them
+            spare = [section for section in sections if len(section[1]) > len(section[0])]
+            first, second = spare[0], spare[1]
+            sections = [section for section in sections if section is not second]
+            first[0] = np.polymul(first[0], second[0])
+            first[1] = np.polymul(first[1], second[1])
+            fitting = [first]
+        fitting[0][0] = np.polymul(fitting[0][0], num)
+    return [(num, den) for num, den in sections]
+
+
+def _companion(num, den):
+    """ Controllable canonical (A, B, C, D) of one proper section, den monic """
+    order = len(den) - 1
+    num = np.concatenate((np.zeros(len(den) - len(num)), num))
+    D = num[0]
+    residual = num[1:] - D*den[1:]
+    A = np.zeros((order, order))
+    A[0, :] = -den[1:]
+    A[1:, :-1] = np.eye(order - 1)
+    B = np.zeros(order)
+    B[0] = 1.0
+    return A, B, residual.astype(float), float(D)
+
+
+def _cascade(first, second):
+    """ Series connection of two realisations, first feeding second """
+    A1, B1, C1, D1 = first
+    A2, B2, C2, D2 = second
+    n1, n2 = len(A1), len(A2)
+    A = np.zeros((n1 + n2, n1 + n2))
+    A[:n1, :n1] = A1
+    A[n1:, n1:] = A2
+    A[n1:, :n1] = np.outer(B2, C1)
+    B = np.concatenate((B1, B2*D1))
+    C = np.concatenate((D2*C1, C2))
+    return A, B, C, D1*D2
@@ -0,0 +1,143 @@
+"""
+    Vectorised frequency response evaluation for many systems at once.
+
+    Systems are supplied as stacks of coefficient arrays or of zero/pole/gain
+    data, which may differ in order from one system to the next. They are
+    padded out to a common shape and evaluated on a shared frequency grid in a
+    single numpy pass, giving (systems x frequencies) magnitude and phase arrays
+    without any Python-level loop over the systems themselves.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+BatchResponse = namedtuple("BatchResponse", ["mag_db", "phase_deg", "omega"])
+
+
+def pad_coefficients(polys):
+    """ Stack polynomial coefficient arrays (highest power first) of differing
+        lengths into one 2-D array, left-padding the shorter ones with zeros.
+    """
+    polys = [np.atleast_1d(np.asarray(poly)) for poly in polys]
+    width = max(len(poly) for poly in polys)
+    dtype = np.result_type(float, *polys)
+    padded = np.zeros((len(polys), width), dtype=dtype)
+    for index, poly in enumerate(polys):
+        padded[index, width - len(poly):] = poly
+    return padded
+
+
+def pad_roots(root_sets):
+    """ Stack sets of roots of differing lengths into one 2-D complex array,
+        padding the shorter sets with NaN (which contribute nothing when the
+        response is evaluated).
+    """
+    root_sets = [np.atleast_1d(np.asarray(roots, dtype=complex)) for roots in root_sets]
+    width = max([len(roots) for roots in root_sets] + [0])
+    padded = np.full((len(root_sets), width), np.nan, dtype=complex)
+    for index, roots in enumerate(root_sets):
+        padded[index, :len(roots)] = roots
+    return padded
+
+
+def evaluation_points(omega, dt=None):
+    """ Points at which to evaluate a transfer function for the given angular
+        frequencies: j*omega for continuous systems, or exp(j*omega*dt) on the
+        unit circle for discrete systems with sampling period dt.
+    """
+    omega = np.asarray(omega, dtype=float)
+    if dt:
+        return np.exp(1j*omega*dt)
+    return 1j*omega
+
+
+def batch_evaluate(nums, dens, points):
+    """ Complex value of each num/den transfer function at each of the given
+        points, as a (systems x points) array.
+    """
+    nums = nums if isinstance(nums, np.ndarray) and nums.ndim == 2 else pad_coefficients(nums)
+    dens = dens if isinstance(dens, np.ndarray) and dens.ndim == 2 else pad_coefficients(dens)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _polyval_rows(nums, points)/_polyval_rows(dens, points)
+
+
+def batch_frequency_response(nums, dens, omega, dt=None):
+    """ Gain (dB) and unwrapped phase (deg) of many transfer functions, given as
+        stacks of numerator and denominator coefficients, on a shared
+        frequency grid. Set dt to evaluate discrete systems with that period.
+    """
+    response = batch_evaluate(nums, dens, evaluation_points(omega, dt))
+    return _response_arrays(response, omega)
+
+
+def batch_zpk_response(zeros, poles, gains, omega, dt=None):
+    """ Gain (dB) and phase (deg) of many systems given in factored form, as
+        sequences of zero sets, pole sets and gains, on a shared frequency grid.
+
+        The response is accumulated as a sum of log-magnitudes and angles of
+        each factor, so it stays accurate for systems with many poles where
+        expanding into coefficients would not.
+    """
+    zeros = zeros if isinstance(zeros, np.ndarray) and zeros.ndim == 2 else pad_roots(zeros)
+    poles = poles if isinstance(poles, np.ndarray) and poles.ndim == 2 else pad_roots(poles)
+    gains = np.asarray(gains, dtype=complex).reshape(-1, 1)
+    points = evaluation_points(omega, dt)
+
+    zero_db, zero_phase = _factor_sums(zeros, points)
+    pole_db, pole_phase = _factor_sums(poles, points)
+    with np.errstate(divide='ignore'):
+        gain_db = 20*np.log10(np.abs(gains))
+
+    mag_db = gain_db + zero_db - pole_db
+    phase = np.angle(gains) + zero_phase - pole_phase
+    return BatchResponse(mag_db, np.degrees(phase), np.asarray(omega, dtype=float))
+
+
+def zpk_evaluate(zeros, poles, gain, points):
+    """ Complex value of a single factored transfer function at each point,
+        formed from the summed logarithms of its factors so that high-order
+        systems neither overflow nor lose precision.
+    """
+    points = np.atleast_1d(np.asarray(points, dtype=complex))
+    zeros = np.asarray(zeros, dtype=complex)
+    poles = np.asarray(poles, dtype=complex)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        log_response = np.log(points[:, np.newaxis] - zeros[np.newaxis, :]).sum(axis=1) - \
+            np.log(points[:, np.newaxis] - poles[np.newaxis, :]).sum(axis=1)
+        return gain*np.exp(log_response)
+
+
+def _factor_sums(roots, points):
+    """ Summed dB magnitude and angle of (x - root) over each row of padded
+        roots, at every evaluation point x.
+    """
+    factors = points[np.newaxis, np.newaxis, :] - roots[:, :, np.newaxis]
+    present = ~np.isnan(roots)[:, :, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.where(present, 20*np.log10(np.abs(factors)), 0.0)
+    angle = np.where(present, np.angle(factors), 0.0)
+    # only factors reaching the negative real axis can wrap, which for left
+    # half-plane roots on a continuous grid is none of them
+    wraps = np.any(factors.real < 0, axis=2)
+    if wraps.any():
+        angle[wraps] = np.unwrap(angle[wraps], axis=-1)
+    return magnitude.sum(axis=1), angle.sum(axis=1)
+
+
+def _polyval_rows(coeffs, points):
+    """ Horner evaluation of every row of a coefficient matrix at all points """
+    points = np.atleast_1d(points)
+    result = np.zeros((coeffs.shape[0], len(points)), dtype=complex)
+    for column in coeffs.T:
+        result *= points
+        result += column[:, np.newaxis]
+    return result
+
+
+def _response_arrays(response, omega):
+    """ Split (systems x freqs) complex responses into dB magnitude and phase """
+    with np.errstate(divide='ignore'):
+        mag_db = 20*np.log10(np.abs(response))
+    phase_deg = np.degrees(np.unwrap(np.angle(response), axis=1))
+    return BatchResponse(mag_db, phase_deg, np.asarray(omega, dtype=float))
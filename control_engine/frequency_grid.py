@@ -0,0 +1,170 @@
+"""
+    Adaptive frequency grids for Bode and Nyquist evaluation.
+
+    A uniform grid dense enough to resolve a lightly damped resonance or pin
+    down a crossover wastes most of its points on regions where the response is
+    flat. Instead, a coarse logarithmic grid is seeded with the break
+    frequencies of the poles and zeros and points either side of each resonant
+    peak, then repeatedly bisected wherever the gain or phase changes too
+    quickly between neighbouring points, or where the response crosses 0 dB or
+    -180 degrees, until the curve is resolved or the point budget is used up.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .freqresp import batch_evaluate, evaluation_points, zpk_evaluate
+
+FrequencyGrid = namedtuple("FrequencyGrid", ["omega", "response"])
+
+
+def frequency_range(num, den, dt=None):
+    """ (lower, upper) frequency limits in rad/s spanning a decade either side
+        of the pole and zero break frequencies. Discrete systems stop at the
+        Nyquist frequency pi/dt.
+    """
+    return _roots_range(_roots(num, den), dt)
+
+
+def zpk_frequency_range(zeros, poles, dt=None):
+    """ As frequency_range, for a system given by its zeros and poles """
+    return _roots_range(np.concatenate((np.asarray(zeros, dtype=complex),
+                                        np.asarray(poles, dtype=complex))), dt)
+
+
+def adaptive_frequency_grid(num, den, dt=None, points=500, omega_range=None, initial_points=50,
+                            max_db_step=1.0, max_phase_step=5.0, crossing_tolerance=1e-5):
+    """ Frequency vector (rad/s) adapted to the response of the num/den transfer
+        function, together with the complex response evaluated on it.
+
+        Intervals are bisected while the gain changes by more than max_db_step
+        dB or the phase by more than max_phase_step degrees across them, and
+        intervals holding a 0 dB or -180 degree crossing are bisected until
+        their relative width falls below crossing_tolerance. No more than
+        points frequencies are evaluated in total.
+    """
+    num = np.atleast_1d(np.asarray(num, dtype=float))
+    den = np.atleast_1d(np.asarray(den, dtype=float))
+
+    def evaluate(omega):
+        return batch_evaluate(num[np.newaxis, :], den[np.newaxis, :], evaluation_points(omega, dt))[0]
+
+    return _adaptive_grid(_roots(num, den), evaluate, dt, points, omega_range, initial_points,
+                          max_db_step, max_phase_step, crossing_tolerance)
+
+
+def adaptive_zpk_grid(zeros, poles, gain, dt=None, points=500, omega_range=None, initial_points=50,
+                      max_db_step=1.0, max_phase_step=5.0, crossing_tolerance=1e-5):
+    """ As adaptive_frequency_grid, for a system given in factored form. The
+        response is evaluated factor by factor, without forming coefficients.
+    """
+    zeros = np.asarray(zeros, dtype=complex)
+    poles = np.asarray(poles, dtype=complex)
+
+    def evaluate(omega):
+        return zpk_evaluate(zeros, poles, gain, evaluation_points(omega, dt))
+
+    return _adaptive_grid(np.concatenate((zeros, poles)), evaluate, dt, points, omega_range,
+                          initial_points, max_db_step, max_phase_step, crossing_tolerance)
+
+
+def _adaptive_grid(roots, evaluate, dt, points, omega_range, initial_points, max_db_step,
+                   max_phase_step, crossing_tolerance):
+    """ Bisection refinement shared by the coefficient and factored grids """
+    lower, upper = omega_range if omega_range is not None else _roots_range(roots, dt)
+    initial_points = min(initial_points, points)
+
+    seeds = np.concatenate((_feature_frequencies(roots, dt), _resonance_frequencies(roots, dt)))
+    seeds = seeds[(seeds > lower) & (seeds < upper)]
+    seeds = seeds[:max(0, points - initial_points)]
+    omega = np.unique(np.concatenate((np.geomspace(lower, upper, initial_points), seeds)))
+    response = evaluate(omega)
+
+    while len(omega) < points:
+        priority = _refinement_priority(omega, response, max_db_step, max_phase_step,
+                                        crossing_tolerance)
+        flagged = np.flatnonzero(priority > 0)
+        if not flagged.size:
+            break
+
+        # bisect the most urgent intervals first, within the remaining budget
+        flagged = flagged[np.argsort(priority[flagged])[::-1]][:points - len(omega)]
+        midpoints = np.sqrt(omega[flagged]*omega[flagged + 1])
+        omega = np.concatenate((omega, midpoints))
+        response = np.concatenate((response, evaluate(midpoints)))
+        order = np.argsort(omega)
+        omega, response = omega[order], response[order]
+
+    return FrequencyGrid(omega, response)
+
+
+def _roots(num, den):
+    """ Zeros and poles of a num/den system, together in one array """
+    return np.concatenate((np.roots(num), np.roots(den))).astype(complex)
+
+
+def _roots_range(roots, dt):
+    """ Frequency limits for a system with the given zeros and poles """
+    features = _feature_frequencies(roots, dt)
+    if features.size:
+        lower = 10.0**(math.floor(np.log10(features.min())) - 1)
+        upper = 10.0**(math.ceil(np.log10(features.max())) + 1)
+    else:
+        lower, upper = 0.1, 10.0
+    if dt:
+        upper = math.pi/dt
+        lower = min(lower, upper/1000.0)
+    return lower, upper
+
+
+def _refinement_priority(omega, response, max_db_step, max_phase_step, crossing_tolerance):
+    """ Score for bisecting each interval between adjacent frequencies - zero if
+        the interval is already resolved. Crossings outrank everything else.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mag_db = 20*np.log10(np.abs(response))
+    phase = np.degrees(np.unwrap(np.angle(response)))
+
+    with np.errstate(invalid='ignore'):
+        score = np.maximum(np.abs(np.diff(mag_db))/max_db_step, np.abs(np.diff(phase))/max_phase_step)
+    score = np.where(np.isfinite(score) & (score > 1), score, 0.0)
+
+    # intervals containing a gain crossover or a -180 (mod 360) phase crossing
+    crossing = (np.diff(np.sign(mag_db)) != 0) | (np.diff(np.floor((phase + 180.0)/360.0)) != 0)
+    unresolved = omega[1:]/omega[:-1] > 1 + crossing_tolerance
+    score = np.where(crossing & unresolved, score + np.inf, score)
+
+    # stop bisecting intervals that have become vanishingly narrow
+    return np.where(omega[1:]/omega[:-1] > 1 + 1e-12, score, 0.0)
+
+
+def _continuous_roots(roots, dt):
+    """ Poles and zeros of the system, mapped to the s-plane if discrete """
+    if dt:
+        roots = roots[roots != 0]
+        roots = np.log(roots.astype(complex))/dt
+    return roots
+
+
+def _feature_frequencies(roots, dt):
+    """ Break frequencies (rad/s) of the system's non-zero poles and zeros """
+    frequencies = np.abs(_continuous_roots(roots, dt))
+
+    # roots within rounding error of the origin (or z=1) are integrators, not breaks
+    threshold = 1e-8*max(1.0, frequencies.max()) if frequencies.size else 0.0
+    return np.unique(frequencies[frequencies > threshold])
+
+
+def _resonance_frequencies(roots, dt):
+    """ Points spread either side of each complex pole or zero pair's natural
+        frequency, at offsets scaled by its damping ratio.
+    """
+    roots = _continuous_roots(roots, dt)
+    roots = roots[roots.imag > 0]
+    natural = np.abs(roots)
+    damping = -roots.real/natural
+    offsets = np.array([-2.0, -1.0, -0.5, 0.5, 1.0, 2.0])
+    frequencies = natural[:, np.newaxis]*(1 + np.maximum(damping, 1e-3)[:, np.newaxis]*offsets)
+    return np.unique(frequencies[frequencies > 0])
@@ -0,0 +1,188 @@
+"""
+    Timing and profiling instrumentation for the analysis stages.
+
+    The engine wraps each costly stage of an analysis (parsing expressions,
+    forming feedback loops, discretisation, root finding, frequency responses,
+    simulation) in a named stage, and the app adds its own stages for each
+    page handler and for rendering with matplotlib. Every stage run is logged
+    as a structured record (name, enclosing stage, start, duration, thread and
+    any context given) in a bounded buffer, alongside running per-stage totals
+    and named counters, so the records can be exported and summarised to see
+    where the latency goes in a real session.
+
+    cProfile capture can also be switched on, in which case each outermost
+    stage is run under its own profiler and the statistics are accumulated
+    for inspection or dumping to a file.
+"""
+
+import cProfile
+import csv
+import json
+import math
+import pstats
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+StageStats = namedtuple("StageStats", ["name", "count", "total", "mean", "min", "max", "last"])
+
+# most recent stage records kept for export, older records being discarded
+MAX_RECORDS = 10000
+
+_lock = threading.Lock()
+_local = threading.local()
+_records = deque(maxlen=MAX_RECORDS)
+_totals = {}
+_counters = {}
+_profiling = {"enabled": False, "stats": None}
+
+
+@contextmanager
+def stage(name, **context):
+    """ Context manager timing the enclosed code as the named stage. Keyword
+        arguments are kept with the stage's record as context.
+    """
+    stack = _stack()
+    profiler = _start_profiler() if not stack and _profiling["enabled"] else None
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        if profiler is not None:
+            _stop_profiler(profiler)
+        _record(name, parent, started, seconds, context)
+
+
+def timed(name):
+    """ Decorator timing every call of a function as the named stage """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """ Add to a named counter, e.g. the number of polynomial root solves """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def summary():
+    """ StageStats (times in seconds) for every stage run so far, slowest in
+        total first.
+    """
+    with _lock:
+        totals = [(name, list(values)) for name, values in _totals.items()]
+    stats = [StageStats(name, calls, total, total/calls, low, high, last)
+             for name, (calls, total, low, high, last) in totals]
+    return sorted(stats, key=lambda item: item.total, reverse=True)
+
+
+def counters():
+    """ Current value of every named counter """
+    with _lock:
+        return dict(_counters)
+
+
+def records():
+    """ Structured records (dicts) of the most recent stage runs, oldest first """
+    with _lock:
+        return [dict(record) for record in _records]
+
+
+def export(path):
+    """ Write the stage records to a file - JSON lines for a .json or .jsonl
+        extension, CSV otherwise - followed (in JSON) by the counters.
+    """
+    items = records()
+    if path.lower().endswith((".json", ".jsonl")):
+        with open(path, "w") as stream:
+            for item in items:
+                stream.write(json.dumps(item) + "\n")
+            stream.write(json.dumps({"counters": counters()}) + "\n")
+        return
+
+    fields = ["stage", "parent", "start", "seconds", "thread", "context"]
+    with open(path, "w", newline="") as stream:
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        for item in items:
+            writer.writerow(dict(item, context=json.dumps(item["context"])))
+
+
+def reset():
+    """ Discard all stage records, totals, counters and profile statistics """
+    with _lock:
+        _records.clear()
+        _totals.clear()
+        _counters.clear()
+        _profiling["stats"] = None
+
+
+def set_profiling(enabled):
+    """ Switch cProfile capture of each outermost stage on or off """
+    _profiling["enabled"] = bool(enabled)
+
+
+def profiling_enabled():
+    return _profiling["enabled"]
+
+
+def profile_stats():
+    """ pstats.Stats accumulated over every profiled stage, or None """
+    with _lock:
+        return _profiling["stats"]
+
+
+def dump_profile(path):
+    """ Save the accumulated profile statistics for use with pstats or snakeviz """
+    stats = profile_stats()
+    if stats is None:
+        raise ValueError("No profile has been captured - switch profiling on first")
+    stats.dump_stats(path)
+
+
+def _stack():
+    """ Names of the stages currently open in this thread """
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _record(name, parent, started, seconds, context):
+    with _lock:
+        _records.append({"stage": name, "parent": parent, "start": started, "seconds": seconds,
+                         "thread": threading.current_thread().name, "context": context})
+        calls, total, low, high, _ = _totals.get(name, (0, 0.0, math.inf, 0.0, 0.0))
+        _totals[name] = (calls + 1, total + seconds, min(low, seconds), max(high, seconds), seconds)
+
+
+def _start_profiler():
+    """ A running profiler for this thread, or None if one cannot be started
+        (only one profiler may be active at a time on some Python versions).
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def _stop_profiler(profiler):
+    profiler.disable()
+    with _lock:
+        if _profiling["stats"] is None:
+            _profiling["stats"] = pstats.Stats(profiler)
+        else:
+            _profiling["stats"].add(profiler)
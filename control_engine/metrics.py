@@ -0,0 +1,231 @@
+"""
+    Time-domain performance metrics of closed-loop responses.
+
+    The metrics are read from sampled responses with whole-array operations,
+    so a stack of responses sharing one time vector (for example a batch of
+    candidate compensators, or one plant at several gains) is measured in a
+    single pass, without a Python loop over the responses. Threshold crossings
+    are located to sub-sample accuracy by linear interpolation.
+
+    Where the closed loop's pole/zero data gives a metric exactly, that is used
+    in place of the sampled estimate: steady-state step and ramp errors follow
+    from the open-loop error constants, and the integral of squared step error
+    from a Lyapunov equation, neither depending on how long the response was
+    simulated for.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.linalg import solve_continuous_lyapunov, solve_discrete_lyapunov
+
+from .factored import FactoredTF
+from .simulate import LTISimulator
+
+StepMetrics = namedtuple("StepMetrics", ["rise_time", "overshoot", "peak_time", "settling_time",
+                                         "final_value", "steady_state_error", "iae", "ise", "itae"])
+RampMetrics = namedtuple("RampMetrics", ["tracking_error", "iae", "ise", "itae"])
+ErrorConstants = namedtuple("ErrorConstants", ["system_type", "position", "velocity", "acceleration"])
+LoopMetrics = namedtuple("LoopMetrics", ["step", "ramp", "constants"])
+
+# fractions of the final value between which the rise time is measured
+RISE_LIMITS = (0.1, 0.9)
+
+# band about the final value, as a fraction of it, that a settled response stays within
+SETTLING_BAND = 0.02
+
+# roots this close to s = 0 (or z = 1), relative to the system's largest root, are integrators
+INTEGRATOR_TOLERANCE = 1e-8
+
+
+def step_metrics(time, response, final_value=None, discrete=False):
+    """ 10-90% rise time, percentage overshoot, peak time, 2% settling time,
+        steady-state error and the IAE, ISE and ITAE error integrals of unit
+        step responses sampled at the given times. response may hold many
+        responses along its leading axes, with time along the last; each
+        metric is then an array over the leading axes. The final value is
+        taken from the last sample unless given (e.g. the DC gain). Metrics
+        that cannot be measured, such as for a response with no final value
+        or one that never reaches it, are nan. Set discrete for sampled
+        responses held between samples.
+    """
+    time = np.asarray(time, dtype=float)
+    response = np.asarray(response, dtype=float)
+    if final_value is None:
+        final_value = response[..., -1]
+    final_value = np.broadcast_to(np.asarray(final_value, dtype=float), response.shape[:-1])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # responses scaled so each heads from 0 towards 1
+        scaled = response/final_value[..., np.newaxis]
+        low = _first_crossing(time, scaled, RISE_LIMITS[0])
+        high = _first_crossing(time, scaled, RISE_LIMITS[1])
+        rise_time = high - low
+
+        peak = np.nanargmax(np.where(np.isfinite(scaled), scaled, -np.inf), axis=-1)
+        peak_value = np.take_along_axis(scaled, peak[..., np.newaxis], axis=-1)[..., 0]
+        overshoot = np.maximum(peak_value - 1.0, 0.0)*100.0
+        peak_time = time[peak]
+
+        outside = ~(np.abs(scaled - 1.0) <= SETTLING_BAND)
+        last = time.size - 1 - np.argmax(outside[..., ::-1], axis=-1)
+        settling_time = np.where(outside.any(axis=-1), time[np.minimum(last + 1, time.size - 1)], time[0])
+
+    valid = np.isfinite(final_value) & (final_value != 0)
+    settled = valid & ~outside[..., -1]
+    iae, ise, itae = error_integrals(time, 1.0 - response, discrete)
+    return StepMetrics(np.where(valid, rise_time, np.nan), np.where(valid, overshoot, np.nan),
+                       np.where(valid, peak_time, np.nan), np.where(settled, settling_time, np.nan),
+                       final_value, 1.0 - final_value, iae, ise, itae)
+
+
+def ramp_metrics(time, response, discrete=False):
+    """ Tracking error at the final sample and the IAE, ISE and ITAE error
+        integrals of unit ramp responses (input equal to time), batched over
+        leading axes as step_metrics
+    """
+    time = np.asarray(time, dtype=float)
+    error = time - np.asarray(response, dtype=float)
+    iae, ise, itae = error_integrals(time, error, discrete)
+    return RampMetrics(error[..., -1], iae, ise, itae)
+
+
+def error_integrals(time, error, discrete=False):
+    """ (IAE, ISE, ITAE): the integrals of |e|, e**2 and t*|e| over the sampled
+        time span, along the last axis of error. Continuous responses are
+        integrated by the trapezoidal rule, and discrete ones as held
+        between samples.
+    """
+    time = np.asarray(time, dtype=float)
+    error = np.asarray(error, dtype=float)
+    if discrete:
+        weights = np.append(np.diff(time), 0.0)
+    else:
+        steps = np.diff(time)
+        weights = (np.append(steps, 0.0) + np.insert(steps, 0, 0.0))/2
+    with np.errstate(over='ignore', invalid='ignore'):
+        magnitude = np.abs(error)
+        return (np.sum(magnitude*weights, axis=-1), np.sum(error**2*weights, axis=-1),
+                np.sum(time*magnitude*weights, axis=-1))
+
+
+def error_constants(loop):
+    """ System type (the number of open-loop integrators) and the position,
+        velocity and acceleration error constants Kp, Kv and Ka of an open-loop
+        system, found exactly from its poles and zeros. For a stable unity
+        feedback loop the steady-state step error is 1/(1 + Kp) and the ramp
+        error 1/Kv. Discrete constants are per second, taking the integrator
+        as Ts/(z - 1).
+    """
+    loop = FactoredTF.from_tf(loop)
+    origin = 1.0 if loop.dt else 0.0
+    roots = np.concatenate((loop.zeros_, loop.poles_))
+    scale = max(float(np.abs(roots).max()) if roots.size else 1.0, 1.0)
+    at_origin_zeros = np.abs(loop.zeros_ - origin) <= INTEGRATOR_TOLERANCE*scale
+    at_origin_poles = np.abs(loop.poles_ - origin) <= INTEGRATOR_TOLERANCE*scale
+    system_type = int(np.count_nonzero(at_origin_poles) - np.count_nonzero(at_origin_zeros))
+
+    remaining_zeros = origin - loop.zeros_[~at_origin_zeros]
+    remaining_poles = origin - loop.poles_[~at_origin_poles]
+    static = (loop.gain*np.prod(remaining_zeros)/np.prod(remaining_poles)).real
+    constants = []
+    for order in range(3):
+        if system_type > order:
+            constants.append(np.inf)
+        elif system_type == order:
+            constants.append(static/loop.dt**order if loop.dt else static)
+        else:
+            constants.append(0.0)
+    return ErrorConstants(system_type, *constants)
+
+
+def step_error_ise(closed):
+    """ Integral of the squared error 1 - y of the unity feedback closed
+        loop's step response, over infinite time, from a Lyapunov equation.
+        This is inf if the loop is unstable or has a steady-state error.
+    """
+    closed = FactoredTF.from_tf(closed)
+    A, B, C, D = closed.state_space()
+    states = len(A)
+    if not states:
+        return 0.0 if D == 1 else np.inf
+    eigenvalues = np.linalg.eigvals(A)
+    if closed.dt:
+        if not np.all(np.abs(eigenvalues) < 1):
+            return np.inf
+        settled = np.linalg.solve(np.eye(states) - A, B)
+    else:
+        if not np.all(eigenvalues.real < 0):
+            return np.inf
+        settled = -np.linalg.solve(A, B)
+    if not np.isclose(C.dot(settled) + D, 1.0, rtol=0.0, atol=1e-9):
+        return np.inf
+
+    # the error decays from the settled state as C*exp(A*t)*settled (or C*A**k*settled)
+    if closed.dt:
+        covariance = solve_discrete_lyapunov(A, np.outer(settled, settled))
+        return float(C.dot(covariance).dot(C))*closed.dt
+    covariance = solve_continuous_lyapunov(A, -np.outer(settled, settled))
+    return float(C.dot(covariance).dot(C))
+
+
+def loop_metrics(loops, steps=None):
+    """ Step and ramp metrics of the unity feedback loops round one open-loop
+        system or a list of them (all continuous, or all discrete with one
+        sampling period), with the error constants of each. A list is
+        simulated as one batch on a shared time grid and measured in a
+        single pass, giving arrays of metrics in the order of the loops.
+
+        Final values, steady-state errors, ramp tracking errors and the step
+        ISE are exact, from the loops' poles and zeros; for unstable loops they
+        are nan, and the ISE is inf (as it is for a loop with a steady-state
+        error). The other metrics are measured from the simulated responses,
+        except that the step and ramp error integrals of an unstable loop are
+        inf, since its error grows without bound however long the simulation.
+    """
+    batched = isinstance(loops, (list, tuple))
+    loops = [FactoredTF.from_tf(loop) for loop in (loops if batched else [loops])]
+    closed_loops = [loop.feedback() for loop in loops]
+    constants = [error_constants(loop) for loop in loops]
+    discrete = loops[0].dt is not None
+
+    poles = [closed.poles_ for closed in closed_loops]
+    stable = np.array([np.all(np.abs(roots) < 1) if discrete else np.all(roots.real < 0) for roots in poles])
+    position = np.array([constant.position for constant in constants])
+    velocity = np.array([constant.velocity for constant in constants])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        final_value = np.where(np.isinf(position), 1.0, position/(1.0 + position))
+        ramp_error = np.where(np.isinf(velocity), 0.0, 1.0/velocity)
+    final_value = np.where(stable, final_value, np.nan)
+    ramp_error = np.where(stable, ramp_error, np.nan)
+
+    simulator = LTISimulator(closed_loops)
+    with np.errstate(over='ignore', invalid='ignore'):
+        time, step = simulator.step(steps)
+        _, ramp = simulator.ramp(steps)
+    step = step_metrics(time, step, final_value, discrete)
+    step = step._replace(iae=np.where(stable, step.iae, np.inf), itae=np.where(stable, step.itae, np.inf),
+                         ise=np.array([step_error_ise(closed) for closed in closed_loops]))
+    ramp = ramp_metrics(time, ramp, discrete)
+    ramp = ramp._replace(tracking_error=ramp_error, iae=np.where(stable, ramp.iae, np.inf),
+                         ise=np.where(stable, ramp.ise, np.inf), itae=np.where(stable, ramp.itae, np.inf))
+
+    constants = ErrorConstants(*[np.array(column) for column in zip(*constants)])
+    if not batched:
+        step, ramp, constants = [type(group)(*[column[0] for column in group])
+                                 for group in (step, ramp, constants)]
+    return LoopMetrics(step, ramp, constants)
+
+
+def _first_crossing(time, scaled, level):
+    """ Time at which each scaled response first reaches level, interpolated
+        between samples, or nan if it never does
+    """
+    reached = scaled >= level
+    index = np.argmax(reached, axis=-1)
+    before = np.maximum(index - 1, 0)
+    y0 = np.take_along_axis(scaled, before[..., np.newaxis], axis=-1)[..., 0]
+    y1 = np.take_along_axis(scaled, index[..., np.newaxis], axis=-1)[..., 0]
+    fraction = np.where(y1 > y0, (level - y0)/(y1 - y0), 0.0)
+    crossing = time[before] + np.clip(fraction, 0.0, 1.0)*(time[index] - time[before])
+    return np.where(reached.any(axis=-1), crossing, np.nan)
@@ -0,0 +1,253 @@
+"""
+    Closed-loop stability from the Nyquist criterion, without plotting.
+
+    The open-loop response L is evaluated round the Nyquist contour - up the
+    imaginary axis and back round a large semicircle through the right half
+    plane for a continuous system, or round the unit circle for a discrete
+    one - in one vectorised pass. Open-loop poles lying on the contour are
+    stepped round with small indentations into the unstable region, so they
+    count as stable poles. The contour is bisected wherever 1 + L turns
+    through too large an angle between neighbouring points, and the clockwise
+    encirclements N of -1 are then counted from the summed angle steps, giving
+    the number of unstable closed-loop poles as Z = N + P, where P is the
+    number of unstable open-loop poles.
+
+    Only the upper half of the contour is evaluated; for a real system the
+    lower half is its mirror image.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .freqresp import zpk_evaluate
+from .frequency_grid import zpk_frequency_range
+
+NyquistContour = namedtuple("NyquistContour", ["points", "response", "indented", "resolved"])
+NyquistStability = namedtuple("NyquistStability", ["stable", "marginal", "encirclements",
+                                                   "open_loop_unstable", "closed_loop_unstable"])
+
+# poles this close to the imaginary axis or unit circle (relative to the
+# system's largest root, for continuous systems) are taken to lie on it
+BOUNDARY_TOLERANCE = 1e-8
+
+# indentation radius, as a fraction of the distance to the nearest other root
+INDENT_FRACTION = 1e-2
+
+# times the indentation radius may be cut tenfold to keep closed-loop poles outside it
+INDENT_SHRINKS = 12
+
+# largest turn (rad) of 1 + L allowed between neighbouring contour points
+MAX_ANGLE_STEP = math.pi/4
+
+# rounds of bisection allowed before the contour is taken to pass through -1
+MAX_REFINEMENTS = 60
+
+
+def encirclements(response, point=-1.0):
+    """ Clockwise encirclements of point by closed curves, each given by its
+        complex values along the last axis of response (the last value joins
+        back to the first). Leading axes hold separate curves, so a whole
+        stack of curves is counted in one pass. The curves must be sampled
+        finely enough that none turns by more than pi about the point between
+        neighbouring values.
+    """
+    offset = np.asarray(response, dtype=complex) - point
+    closed = np.concatenate((offset, offset[..., :1]), axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turns = np.angle(closed[..., 1:]/closed[..., :-1]).sum(axis=-1)/(2*math.pi)
+    return -np.rint(turns).astype(int)
+
+
+def nyquist_contour(zeros, poles, gain, dt=None, points=200):
+    """ Points on the full Nyquist contour (in increasing frequency order) and
+        the open-loop response at each, for the system gain*prod(x - zeros)/
+        prod(x - poles), continuous or with sampling period dt. indented holds
+        the contour poles that were stepped round, and resolved is False if
+        the response could not be resolved near -1 (it passes through it, so
+        the closed loop has poles on the stability boundary).
+
+        points sets the size of the initial grid, which is then refined.
+    """
+    zeros = np.atleast_1d(np.asarray(zeros, dtype=complex))
+    poles = np.atleast_1d(np.asarray(poles, dtype=complex))
+    position, parameters, indented, isolated = _upper_contour(zeros, poles, gain, dt, points)
+
+    def evaluate(values):
+        return zpk_evaluate(zeros, poles, gain, position(values))
+
+    response = evaluate(parameters)
+    minimum_width = 1e-12*parameters[-1]
+    for _ in range(MAX_REFINEMENTS):
+        flagged = np.flatnonzero(_unresolved(response) & (np.diff(parameters) > minimum_width))
+        if not flagged.size:
+            break
+        midpoints = (parameters[flagged] + parameters[flagged + 1])/2
+        parameters = np.concatenate((parameters, midpoints))
+        response = np.concatenate((response, evaluate(midpoints)))
+        order = np.argsort(parameters)
+        parameters, response = parameters[order], response[order]
+
+    # intervals still turning too far, however narrow, pass (numerically) through -1
+    distance = np.abs(1 + response)
+    resolved = isolated and not _unresolved(response).any() and \
+        bool(np.all(distance > 1e-10*(1 + np.abs(response))))
+
+    upper = position(parameters)
+    return NyquistContour(np.concatenate((upper.conj()[::-1], upper)),
+                          np.concatenate((response.conj()[::-1], response)),
+                          indented, resolved)
+
+
+def nyquist_stability(zeros, poles, gain, dt=None, points=200):
+    """ Stability of the unity negative feedback loop around the open-loop
+        system gain*prod(x - zeros)/prod(x - poles), by the Nyquist criterion.
+
+        stable is True only if the closed loop is asymptotically stable;
+        marginal is set if it has poles on the stability boundary.
+        encirclements is N, open_loop_unstable is P, and closed_loop_unstable
+        the number of closed-loop poles Z = N + P in the unstable region.
+    """
+    zeros = np.atleast_1d(np.asarray(zeros, dtype=complex))
+    poles = np.atleast_1d(np.asarray(poles, dtype=complex))
+    if dt and len(zeros) > len(poles):
+        raise ValueError("Discrete-time system has more zeros than poles, so is not causal")
+
+    contour = nyquist_contour(zeros, poles, gain, dt, points)
+    if dt:
+        open_loop = int(np.count_nonzero(np.abs(poles) > 1 + BOUNDARY_TOLERANCE))
+    else:
+        open_loop = int(np.count_nonzero(poles.real > BOUNDARY_TOLERANCE*_size(zeros, poles)))
+    circles = int(encirclements(contour.response))
+    closed_loop = max(circles + open_loop, 0)
+    marginal = not contour.resolved
+    return NyquistStability(closed_loop == 0 and not marginal, marginal, circles, open_loop,
+                            closed_loop)
+
+
+def _unresolved(response):
+    """ Mask of the contour intervals over which 1 + L turns too far """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        steps = np.abs(np.angle((1 + response[1:])/(1 + response[:-1])))
+    return ~(steps <= MAX_ANGLE_STEP)
+
+
+def _size(zeros, poles):
+    """ Largest root magnitude of the system, or 1 if it has no non-zero roots """
+    roots = np.abs(np.concatenate((zeros, poles)))
+    return float(roots.max()) if roots.size and roots.max() > 0 else 1.0
+
+
+def _upper_contour(zeros, poles, gain, dt, points):
+    """ (position, parameters, indented, isolated) for the upper half of the
+        contour: a function mapping a contour parameter (frequency along the
+        boundary, then arc length round the closing semicircle if continuous)
+        to points in the s or z plane, the initial parameter values, and the
+        boundary poles stepped round. Each indentation is a half circle of radius
+        epsilon about a boundary pole, lifted off the boundary by
+        sqrt(epsilon**2 - (u - centre)**2) at parameter u. The closing
+        semicircle lies beyond every closed-loop pole, and isolated is False if
+        a closed-loop pole sits on a boundary pole.
+    """
+    roots = np.concatenate((zeros, poles))
+    scale = _size(zeros, poles)
+    if dt:
+        on_boundary = np.abs(np.abs(poles) - 1) <= BOUNDARY_TOLERANCE
+        centres = np.abs(np.angle(poles[on_boundary]))
+        seeds = np.abs(np.angle(roots[roots != 0]))
+        widths = np.abs(1 - np.abs(roots[roots != 0]))
+        end = math.pi
+        grid = np.linspace(0.0, end, points)
+    else:
+        tolerance = BOUNDARY_TOLERANCE*scale
+        on_boundary = np.abs(poles.real) <= tolerance
+        centres = np.abs(poles[on_boundary].imag)
+        seeds = np.abs(roots.imag)
+        widths = np.abs(roots.real)
+        lower, upper = zpk_frequency_range(zeros, poles)
+        arc_radius = max(10*upper, 2*_root_bound(zeros, poles, gain))
+        end = arc_radius*(1 + math.pi/2)
+        grid = np.concatenate(([0.0], np.geomspace(lower, arc_radius, points),
+                               arc_radius*(1 + math.pi/2*np.linspace(0.0, 1.0, 33))))
+
+    centres = _distinct(centres, BOUNDARY_TOLERANCE*(1 if dt else scale))
+    boundary = np.exp(1j*centres) if dt else 1j*centres
+    radii = []
+    isolated = True
+    for point in boundary:
+        radius, clear = _indent_radius(point, zeros, poles, gain, dt, scale)
+        radii.append(radius)
+        isolated = isolated and clear
+
+    def position(parameters):
+        parameters = np.asarray(parameters, dtype=float)
+        lift = np.zeros(parameters.shape)
+        for centre, radius in zip(centres, radii):
+            lift += np.sqrt(np.maximum(radius**2 - (parameters - centre)**2, 0.0))
+        if dt:
+            return np.exp(1j*parameters)*(1 + lift)
+        along = 1j*np.minimum(parameters, arc_radius) + lift
+        arc = arc_radius*np.exp(1j*(math.pi/2 - (parameters - arc_radius)/arc_radius))
+        return np.where(parameters > arc_radius, arc, along)
+
+    # seed points either side of every root's frequency, scaled by its distance from the boundary
+    offsets = np.array([-2.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0])
+    windows = [centre + radius*np.cos(np.linspace(math.pi, 0.0, 17))
+               for centre, radius in zip(centres, radii)]
+    parameters = np.concatenate([grid, (seeds[:, np.newaxis] + widths[:, np.newaxis]*offsets).ravel()]
+                                + windows)
+    parameters = np.unique(np.clip(parameters, 0.0, end))
+    return position, parameters, boundary, isolated
+
+
+def _root_bound(zeros, poles, gain):
+    """ Fujiwara's bound on the magnitude of the closed-loop poles, the roots of
+        prod(s - poles) + gain*prod(s - zeros), or 0 if it cannot be formed.
+    """
+    num = gain*np.atleast_1d(np.real(np.poly(zeros)))
+    den = np.atleast_1d(np.real(np.poly(poles)))
+    size = max(len(num), len(den))
+    characteristic = np.zeros(size)
+    characteristic[size - len(den):] += den
+    characteristic[size - len(num):] += num
+    characteristic = np.trim_zeros(characteristic, "f")
+    if len(characteristic) < 2:
+        return 0.0
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        ratios = np.abs(characteristic[1:]/characteristic[0])
+        ratios[-1] /= 2
+        bound = 2*np.max(ratios**(1.0/np.arange(1, len(ratios) + 1)))
+    return float(bound) if np.isfinite(bound) else 0.0
+
+
+def _distinct(values, tolerance):
+    """ Sorted values with any lying within tolerance of the previous one removed """
+    values = np.sort(values)
+    if values.size < 2:
+        return values
+    return values[np.concatenate(([True], np.diff(values) > tolerance))]
+
+
+def _indent_radius(point, zeros, poles, gain, dt, scale):
+    """ (radius, clear) of the indentation round a boundary pole: a fraction of
+        the distance to the nearest other root, shrunk until |L| > 10 all the
+        way round it, so that no closed-loop pole can lie inside (by Rouche's
+        theorem). clear is False if |L| stays small however close the
+        indentation comes, meaning a closed-loop pole sits on the boundary.
+    """
+    outward = point if dt else 1.0
+    arc = outward*np.exp(1j*np.linspace(-math.pi/2, math.pi/2, 9))
+    radius = INDENT_FRACTION*_clearance(point, np.concatenate((zeros, poles)), 1.0 if dt else scale)
+    for _ in range(INDENT_SHRINKS):
+        if np.all(np.abs(zpk_evaluate(zeros, poles, gain, point + radius*arc)) > 10):
+            return radius, True
+        radius /= 10
+    return radius, False
+
+
+def _clearance(point, roots, scale):
+    """ Distance from a boundary pole to the nearest root not at the same place """
+    distances = np.abs(roots - point)
+    distances = distances[distances > BOUNDARY_TOLERANCE*scale]
+    return min(float(distances.min()), scale) if distances.size else scale
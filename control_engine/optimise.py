@@ -0,0 +1,420 @@
+"""
+    Automatic search for lead, lag and PID compensators meeting loop targets.
+
+    Candidates are judged on phase margin, gain margin, closed-loop bandwidth
+    and step overshoot. The plant is factored and its frequency response
+    evaluated once, on the fixed grid of a LoopTuner, so each candidate only
+    costs the evaluation of its own low-order response on that grid, done for a
+    whole population of candidates at once as array operations. While
+    screening, margins and bandwidth are interpolated between grid points and
+    overshoot is estimated from the closed-loop resonant peak, so thousands of
+    candidates are scored per second.
+
+    The search begins with a quasi-random sample of the whole parameter space.
+    Each of several random weightings of the four targets picks its best
+    sample as a starting point, which is refined by a shrinking random local
+    search, the starts running in parallel worker processes. The
+    non-dominated candidates found are then evaluated exactly (margins solved
+    on the grid, stability from the closed-loop poles, and overshoot, rise and
+    settling times from simulated step responses) and the Pareto set of these
+    is returned.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import qmc
+
+from .expressions import substitute_parameters
+from .factored import margins_on_grid
+from .freqresp import evaluation_points
+from .instrument import stage
+from .metrics import loop_metrics
+from .tuning import LoopTuner
+
+DesignTargets = namedtuple("DesignTargets", ["phase_margin", "gain_margin_db", "bandwidth", "overshoot"])
+CompensatorDesign = namedtuple("CompensatorDesign", ["expression", "parameters", "phase_margin",
+                                                     "gain_margin_db", "bandwidth", "overshoot",
+                                                     "rise_time", "settling_time", "meets_targets"])
+OptimisationResult = namedtuple("OptimisationResult", ["structure", "template", "targets", "designs",
+                                                       "candidates", "tuner"])
+
+# minimum phase margin (deg), gain margin (dB) and closed-loop bandwidth (rad/s), and the
+# maximum step overshoot (%), used when no targets are given; None leaves a target unset
+DEFAULT_TARGETS = DesignTargets(45.0, 6.0, None, 20.0)
+
+# (s-domain, z-domain) compensator template of each structure; {0} is the sampling period
+TEMPLATES = {
+    "lead": ("K*(s+a)/(s+b)", "K*(z-a)/(z-b)"),
+    "lag": ("K*(s+a)/(s+b)", "K*(z-a)/(z-b)"),
+    "pid": ("Kp+Ki/s+Kd*s/(Tf*s+1)", "Kp+Ki*{0}*z/(z-1)+Kd*(z-1)/({0}*z)"),
+}
+
+STRUCTURES = sorted(TEMPLATES)
+
+# decades a lead or lag compensator's pole may be separated from its zero; kept
+# above zero so the pole never cancels the zero, leaving a plain gain
+MIN_RATIO_DECADES = 0.25
+MAX_RATIO_DECADES = 2
+
+# ratio of the roll-off frequency of the PID derivative filter to the derivative's corner frequency
+DERIVATIVE_FILTER = 10.0
+
+# decades inside the ends of the tuner's frequency grid that compensator frequencies are kept
+FREQUENCY_INSET = 1
+
+# candidates in the initial quasi-random sample of the parameter space
+SAMPLES = 1024
+
+# starting points refined by local search
+STARTS = 8
+
+# candidates tried in each round of local search, and the number of rounds
+POPULATION = 64
+ROUNDS = 30
+
+# initial local search radius, as a fraction of each parameter's range, and the
+# factor it shrinks by after a round without improvement
+INITIAL_RADIUS = 0.15
+SHRINK = 0.6
+
+# most screened candidates evaluated exactly
+EXACT_DESIGNS = 48
+
+# phase and gain margins (deg, dB) beyond which a larger margin earns no more credit
+MARGIN_CAPS = (90.0, 30.0)
+
+# candidates compared against the Pareto front at a time
+PARETO_BLOCK = 256
+
+# weight of a missed target, relative to the most that meeting all the others can score
+SHORTFALL_PENALTY = 10.0
+
+
+def compensator_template(structure, sampling_time=None):
+    """ Compensator expression, with named parameters, searched for a structure
+        ("lead", "lag" or "pid"): in z when a sampling time is given
+    """
+    if structure not in TEMPLATES:
+        raise ValueError("Unknown compensator structure {0!r}, expected one of: {1}".format(
+            structure, ", ".join(STRUCTURES)))
+    if sampling_time:
+        return TEMPLATES[structure][1].format("{0:.6g}".format(float(sampling_time)))
+    return TEMPLATES[structure][0]
+
+
+def optimise_compensator(oltf, structure="lead", targets=None, sampling_time=None, starts=STARTS,
+                         processes=None, seed=0):
+    """ Search for compensators of the given structure for the s-domain plant
+        expression oltf, discretised with a zero-order hold if a sampling time
+        is given. targets is a DesignTargets (DEFAULT_TARGETS if not given).
+
+        Returns an OptimisationResult whose designs are the Pareto set of
+        stable loops, trading phase and gain margin and bandwidth against
+        overshoot, in order of bandwidth. If any design meets every target,
+        only those that do are returned. The tuner has the plant prepared
+        for live tuning of any of the designs.
+
+        The starts run across a pool of freshly spawned worker processes (one
+        per core unless processes is given), never forked, so it is safe to
+        call from a thread of a GUI; set processes=1 to search in the calling
+        process. When run from a script, the call must sit under an
+        'if __name__ == "__main__":' guard. The seed makes the search repeatable.
+    """
+    template = compensator_template(structure, sampling_time)
+    targets = targets or DEFAULT_TARGETS
+    dt = float(sampling_time) if sampling_time else None
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    with stage("compensator optimisation", structure=structure):
+        placeholder = _values(structure, np.zeros((1, 3)), dt)
+        tuner = LoopTuner(oltf, template, dict((name, float(value[0])) for name, value in placeholder.items()),
+                          sampling_time)
+        problem = _Problem(structure, dt, tuner.omega, evaluation_points(tuner.omega, dt),
+                           tuner.plant_response, _bounds(structure, tuner), targets)
+
+        sample = qmc.Sobol(3, seed=seed).random(SAMPLES)
+        screened = _screen(problem, sample)
+        weights = np.random.default_rng(seed).dirichlet(np.ones(4), size=starts)
+        jobs = [(problem, sample[np.argmin(_cost(problem, screened, weight))], weight, seed + index)
+                for index, weight in enumerate(weights)]
+        if processes == 1 or starts == 1:
+            searches = [_local_search(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(processes, starts),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                searches = list(executor.map(_local_search, *zip(*jobs)))
+
+        units = np.concatenate([sample] + [points for points, _ in searches])
+        screened = np.concatenate([screened] + [objectives for _, objectives in searches])
+        designs = _exact_designs(problem, tuner, template, units[_shortlist(problem, screened)])
+    return OptimisationResult(structure, template, targets, designs, len(units), tuner)
+
+
+def pareto_front(goals):
+    """ Indices of the rows of goals (one column per objective, each to be
+        maximised) not dominated by any other row; of identical rows only
+        the first is kept
+    """
+    goals = np.asarray(goals, dtype=float)
+    # in descending lexicographic order a row can only be dominated by an earlier
+    # one, and if by any earlier row then by one already on the front
+    order = np.lexsort(goals.T[::-1])[::-1]
+    front, kept = goals[:0], []
+    for start in range(0, len(order), PARETO_BLOCK):
+        block = order[start:start + PARETO_BLOCK]
+        rows = goals[block]
+        dominated = np.all(front[np.newaxis, :, :] >= rows[:, np.newaxis, :], axis=2).any(axis=1)
+        within = np.all(rows[np.newaxis, :, :] >= rows[:, np.newaxis, :], axis=2)
+        dominated |= np.tril(within, -1).any(axis=1)
+        kept.extend(block[~dominated])
+        front = np.concatenate((front, rows[~dominated]))
+    return np.array(sorted(kept), dtype=int)
+
+
+_Problem = namedtuple("_Problem", ["structure", "dt", "omega", "points", "plant_response", "bounds", "targets"])
+
+
+def _bounds(structure, tuner):
+    """ (lower, upper) log10 bounds of the three search coordinates: the
+        gain, and the centre frequency and pole/zero ratio of a lead or lag
+        compensator, or the integral and derivative corner frequencies of a
+        PID. Gains span those giving a crossover anywhere in the frequency range.
+    """
+    omega = tuner.omega
+    lower, upper = omega[0]*10.0**FREQUENCY_INSET, omega[-1]/10.0**FREQUENCY_INSET
+    magnitude = np.abs(tuner.plant_response[(omega >= lower) & (omega <= upper)])
+    magnitude = magnitude[np.isfinite(magnitude) & (magnitude > 0)]
+    if not magnitude.size:
+        raise ValueError("The plant has no finite, non-zero gain to compensate")
+    frequency = (np.log10(lower), np.log10(upper))
+    gain = (-np.log10(magnitude.max()) - 1, -np.log10(magnitude.min()) + 1)
+    third = frequency if structure == "pid" else (MIN_RATIO_DECADES, MAX_RATIO_DECADES)
+    return np.array([gain, frequency, third])
+
+
+def _values(structure, x, dt):
+    """ Template parameter values, as arrays, for rows of log10 search coordinates """
+    gain, first, second = (10.0**np.asarray(x, dtype=float)).T
+    if structure == "pid":
+        values = {"Kp": gain, "Ki": gain*first, "Kd": gain/second}
+        if not dt:
+            values["Tf"] = 1.0/(second*DERIVATIVE_FILTER)
+        return values
+    spread = np.sqrt(second)
+    zero, pole = (first/spread, first*spread) if structure == "lead" else (first*spread, first/spread)
+    if dt:
+        return {"K": gain, "a": np.exp(-zero*dt), "b": np.exp(-pole*dt)}
+    return {"K": gain, "a": zero, "b": pole}
+
+
+def _compensator_response(structure, values, points, dt):
+    """ Responses of a batch of compensators (one row per candidate) at the evaluation points """
+    x = points[np.newaxis, :]
+    value = dict((name, column[:, np.newaxis]) for name, column in values.items())
+    if structure == "pid":
+        if dt:
+            return value["Kp"] + value["Ki"]*dt*x/(x - 1) + value["Kd"]*(x - 1)/(dt*x)
+        return value["Kp"] + value["Ki"]/x + value["Kd"]*x/(value["Tf"]*x + 1)
+    if dt:
+        return value["K"]*(x - value["a"])/(x - value["b"])
+    return value["K"]*(x + value["a"])/(x + value["b"])
+
+
+def _loop_responses(problem, units):
+    """ Open-loop responses on the grid for rows of unit search coordinates """
+    bounds = problem.bounds
+    x = bounds[:, 0] + units*(bounds[:, 1] - bounds[:, 0])
+    values = _values(problem.structure, x, problem.dt)
+    return problem.plant_response*_compensator_response(problem.structure, values, problem.points, problem.dt)
+
+
+def _screen(problem, units):
+    """ Estimated (phase margin, gain margin dB, bandwidth, overshoot %) of each
+        candidate, one row per row of unit search coordinates
+    """
+    loops = _loop_responses(problem, units)
+    phase_margin, gain_margin_db = _grid_margins(loops)
+    bandwidth, overshoot = _closed_loop_shape(problem.omega, loops)
+    return np.column_stack((phase_margin, gain_margin_db, bandwidth, overshoot))
+
+
+def _grid_margins(loops):
+    """ Phase margin (deg) and gain margin (dB) of each row of open-loop
+        responses, interpolating the response linearly between grid points at
+        each crossing and taking the smallest margin, as margins_on_grid
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_gain = np.log(np.abs(loops))
+    angle = np.angle(-loops)
+    finite = np.isfinite(log_gain)
+    finite = finite[:, :-1] & finite[:, 1:]
+
+    def interpolate(rows, columns, values):
+        """ Response at the zero of values, between columns and the next """
+        left, right = values[rows, columns], values[rows, columns + 1]
+        fraction = left/(left - right)
+        return loops[rows, columns] + fraction*(loops[rows, columns + 1] - loops[rows, columns])
+
+    rows, columns = np.nonzero(finite & ((log_gain[:, :-1] > 0) != (log_gain[:, 1:] > 0)))
+    at = interpolate(rows, columns, log_gain)
+    phase_margin = _smallest(len(loops), rows, np.remainder(np.angle(at, deg=True), 360.0) - 180.0)
+
+    rows, columns = np.nonzero(finite & ((angle[:, :-1] > 0) != (angle[:, 1:] > 0)) & (loops[:, :-1].real <= 0) &
+                               (np.abs(angle[:, :-1] - angle[:, 1:]) < np.pi))
+    at = interpolate(rows, columns, angle)
+    with np.errstate(divide='ignore'):
+        gain_margin_db = _smallest(len(loops), rows, -20*np.log10(np.abs(at)))
+    return phase_margin, gain_margin_db
+
+
+def _smallest(count, rows, margins):
+    """ The margin of least magnitude for each of count rows, given the margins
+        found at each crossing and their rows; inf for rows with no crossing
+    """
+    smallest = np.full(count, np.inf)
+    order = np.lexsort((np.abs(margins), rows))
+    rows, first = np.unique(rows[order], return_index=True)
+    smallest[rows] = margins[order][first]
+    return smallest
+
+
+def _closed_loop_shape(omega, loops):
+    """ Closed-loop -3 dB bandwidth (rad/s) of each row of open-loop responses,
+        relative to its gain at the bottom of the grid (the top of the grid if
+        it never falls that far), and the step overshoot (%) of a second-order
+        loop with the same resonant peak
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        closed = np.log(np.abs(loops/(1 + loops)))
+    reference = closed[:, 0]
+    below = closed < reference[:, np.newaxis] - 0.5*np.log(2)
+    index = np.maximum(np.argmax(below, axis=1), 1)
+    rows = np.arange(len(loops))
+    y0, y1 = closed[rows, index - 1], closed[rows, index]
+    w0, w1 = np.log(omega[index - 1]), np.log(omega[index])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.clip((reference - 0.5*np.log(2) - y0)/(y1 - y0), 0.0, 1.0)
+    bandwidth = np.where(below.any(axis=1), np.exp(w0 + fraction*(w1 - w0)), omega[-1])
+
+    with np.errstate(invalid='ignore'):
+        peak = np.maximum(np.exp(np.nanmax(closed, axis=1) - reference), 1.0)
+        damping = np.sqrt((1 - np.sqrt(np.maximum(1 - peak**-2, 0.0)))/2)
+        overshoot = 100*np.exp(-np.pi*damping/np.sqrt(1 - damping**2))
+    return bandwidth, np.where(np.isfinite(overshoot), overshoot, 100.0)
+
+
+def _shortfall(targets, objectives):
+    """ How far each row of (phase margin, gain margin dB, bandwidth, overshoot)
+        falls short of the targets, summed over targets in proportion to
+        each's scale; zero where every target is met. A metric that could not
+        be measured counts as missing its target.
+    """
+    phase_margin, gain_margin_db, bandwidth, overshoot = np.asarray(objectives, dtype=float).T
+    shortfall = np.zeros(len(phase_margin))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if targets.phase_margin is not None:
+            shortfall += np.clip(targets.phase_margin - phase_margin, 0.0, 180.0)/MARGIN_CAPS[0]
+        if targets.gain_margin_db is not None:
+            shortfall += np.clip(targets.gain_margin_db - gain_margin_db, 0.0, 60.0)/MARGIN_CAPS[1]
+        if targets.bandwidth is not None:
+            shortfall += np.maximum(np.log10(targets.bandwidth/bandwidth), 0.0)
+        if targets.overshoot is not None:
+            shortfall += np.maximum(overshoot - targets.overshoot, 0.0)/100.0
+    return np.nan_to_num(shortfall, nan=1.0)
+
+
+def _goals(problem, objectives):
+    """ Objectives as goals to maximise, each on a scale of about one: capped
+        margins, bandwidth in decades across the search range, and overshoot
+    """
+    phase_margin, gain_margin_db, bandwidth, overshoot = np.asarray(objectives, dtype=float).T
+    low, high = problem.bounds[1]
+    return np.column_stack((np.clip(phase_margin, -180.0, MARGIN_CAPS[0])/MARGIN_CAPS[0],
+                            np.clip(gain_margin_db, -MARGIN_CAPS[1], MARGIN_CAPS[1])/MARGIN_CAPS[1],
+                            (np.log10(bandwidth) - low)/(high - low), -overshoot/100.0))
+
+
+def _cost(problem, objectives, weights):
+    """ Cost of each screened candidate under one weighting of the goals, with
+        missed targets and margins suggesting an unstable loop penalised
+    """
+    plausible = (objectives[:, 0] > 0) & (objectives[:, 1] > 0)
+    penalty = _shortfall(problem.targets, objectives) + ~plausible
+    return SHORTFALL_PENALTY*penalty - _goals(problem, objectives).dot(weights)
+
+
+def _local_search(problem, start, weights, seed):
+    """ Refine a starting point by random local search under one weighting of
+        the goals, returning every candidate tried and its screened objectives
+    """
+    rng = np.random.default_rng(seed)
+    best, radius = np.asarray(start, dtype=float), INITIAL_RADIUS
+    best_cost = _cost(problem, _screen(problem, best[np.newaxis, :]), weights)[0]
+    tried, screened = [], []
+    for _ in range(ROUNDS):
+        candidates = np.clip(best + radius*rng.standard_normal((POPULATION, len(best))), 0.0, 1.0)
+        objectives = _screen(problem, candidates)
+        tried.append(candidates)
+        screened.append(objectives)
+        costs = _cost(problem, objectives, weights)
+        index = int(np.argmin(costs))
+        if costs[index] < best_cost:
+            best, best_cost = candidates[index], costs[index]
+        else:
+            radius *= SHRINK
+    return np.concatenate(tried), np.concatenate(screened)
+
+
+def _shortlist(problem, screened):
+    """ Indices of at most EXACT_DESIGNS screened candidates worth evaluating
+        exactly: the Pareto set of those with plausible margins (and meeting
+        the targets, if any do), thinned evenly by bandwidth
+    """
+    plausible = (screened[:, 0] > 0) & (screened[:, 1] > 0)
+    meets = plausible & (_shortfall(problem.targets, screened) == 0)
+    pool = np.flatnonzero(meets if meets.any() else plausible)
+    if not pool.size:
+        pool = np.argsort(_cost(problem, screened, np.full(4, 0.25)))[:EXACT_DESIGNS]
+    front = pool[pareto_front(_goals(problem, screened[pool]))]
+    front = front[np.argsort(screened[front, 2])]
+    return front[np.unique(np.linspace(0, len(front) - 1, min(len(front), EXACT_DESIGNS)).round().astype(int))]
+
+
+def _exact_designs(problem, tuner, template, units):
+    """ CompensatorDesigns for the shortlisted candidates, evaluated exactly,
+        reduced to the Pareto set of the stable ones
+    """
+    bounds = problem.bounds
+    values = _values(problem.structure, bounds[:, 0] + units*(bounds[:, 1] - bounds[:, 0]), problem.dt)
+    responses = _loop_responses(problem, units)
+    parameter_sets = [dict((name, float(column[index])) for name, column in values.items())
+                      for index in range(len(units))]
+
+    loops, margins = [], []
+    for parameters, response in zip(parameter_sets, responses):
+        loop = tuner.plant*tuner.compensator(parameters)
+        gain_m, pm, _, _ = margins_on_grid(tuner.omega, response, loop.frequency_response, tuner.dt)
+        with np.errstate(divide='ignore'):
+            margins.append((pm, 20*np.log10(gain_m)))
+        loops.append(loop)
+    if not loops:
+        return []
+    margins = np.array(margins, dtype=float).reshape(-1, 2)
+    bandwidth, _ = _closed_loop_shape(problem.omega, responses)
+    step = loop_metrics(loops).step
+    objectives = np.column_stack((margins, bandwidth, step.overshoot))
+
+    stable = np.isfinite(step.final_value)
+    meets = stable & (_shortfall(problem.targets, objectives) == 0)
+    pool = np.flatnonzero(meets if meets.any() else stable)
+    front = pool[pareto_front(_goals(problem, objectives[pool]))]
+    return [CompensatorDesign(substitute_parameters(template, parameter_sets[index]), parameter_sets[index],
+                              float(margins[index, 0]), float(margins[index, 1]), float(bandwidth[index]),
+                              float(step.overshoot[index]), float(step.rise_time[index]),
+                              float(step.settling_time[index]), bool(meets[index]))
+            for index in front[np.argsort(bandwidth[front])]]
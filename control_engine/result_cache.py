@@ -0,0 +1,263 @@
+"""
+    Persistent on-disk cache of analysis results.
+
+    Margins, Bode arrays, step traces and the like are stored as uncompressed
+    .npz files named by a hash of the analysis type, its parameters and the
+    normalised coefficients of the system analysed, so any session (or anyone
+    sharing the cache directory) re-running the same plant, compensator and
+    sampling period loads the earlier result instead of recomputing it. The
+    directory is kept within a size budget by evicting the least recently used
+    entries. Files are written to a temporary name and then moved into place,
+    so readers never see a partially written result. Only the engine's own
+    result types (see result_types) are rebuilt from a cached file; a file
+    naming any other type is treated as a miss and deleted.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from .analysis import tf_coefficients
+from .result_types import lookup, type_name
+
+# environment variable overriding the default cache directory
+CACHE_DIR_VARIABLE = "CONTROL_ENGINE_CACHE"
+
+# total size of the cached files before the least recently used are evicted
+DEFAULT_MAX_BYTES = 256*1024*1024
+
+# part of every key: bumped whenever the stored layout changes, or a change to
+# the engine alters what any analysis returns for the same system and parameters
+# (2: adaptive frequency grids, factored margins and performance metrics;
+# 3: phase crossings at zero and Nyquist frequency; 4: error integrals of unstable loops)
+FORMAT_VERSION = 4
+
+_TYPE_FIELD = "__type__"
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_directory():
+    """ Cache directory from the CONTROL_ENGINE_CACHE environment variable, or
+        a control_engine folder in the user's cache directory.
+    """
+    directory = os.environ.get(CACHE_DIR_VARIABLE)
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "control_engine")
+    return directory
+
+
+def default_cache():
+    """ Result cache shared by every caller in this process, in the default directory """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
+
+
+def cached_analysis(function, sys_tf, **parameters):
+    """ Run an analysis function on a system through the default cache, as
+        function(sys_tf, **parameters), keyed on the function's name.
+    """
+    return default_cache().fetch(function.__name__, sys_tf, lambda: function(sys_tf, **parameters),
+                                 **parameters)
+
+
+def system_key(sys_tf):
+    """ Canonical (num, den, dt) description of a SISO system, with leading
+        zeros removed and the denominator scaled to be monic, so equivalent
+        transfer functions share cache entries.
+    """
+    num, den = tf_coefficients(sys_tf)
+    num = np.trim_zeros(num, "f")
+    den = np.trim_zeros(den, "f")
+    num = (num if num.size else np.zeros(1))/den[0]
+    den = den/den[0]
+    dt = float(sys_tf.dt) if sys_tf.isdtime(strict=True) else 0.0
+    return num + 0.0, den + 0.0, dt
+
+
+class ResultCache(object):
+    """ Content-addressed store of analysis results in a directory, bounded to
+        max_bytes on disk. Results may be named tuples (or plain tuples) of
+        arrays and numbers, as returned by the analysis functions.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._bytes = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, name, sys_tf, **parameters):
+        """ Hex digest identifying an analysis of a system with the given parameters """
+        num, den, dt = system_key(sys_tf)
+        digest = hashlib.sha256()
+        digest.update(repr((FORMAT_VERSION, name, dt, sorted(parameters.items()))).encode())
+        digest.update(np.ascontiguousarray(num, dtype="<f8").tobytes())
+        digest.update(b"/")
+        digest.update(np.ascontiguousarray(den, dtype="<f8").tobytes())
+        return digest.hexdigest()
+
+    def fetch(self, name, sys_tf, compute, **parameters):
+        """ Result of the named analysis of a system, loaded from the cache if
+            present, otherwise produced by calling compute() and stored. The
+            parameters must be plain values (numbers, strings, None or tuples
+            of these) fully describing the analysis besides the system itself.
+        """
+        key = self.key(name, sys_tf, **parameters)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def get(self, key):
+        """ Cached result for a key, or None if it is not held """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = dict((field, data[field]) for field in data.files)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        try:
+            result = _unpack(arrays)
+        except (KeyError, TypeError, ValueError):
+            # not a result this engine wrote, so it is never trusted again
+            self._discard(path)
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return result
+
+    def put(self, key, result):
+        """ Store a result under a key, evicting old entries if over budget """
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                np.savez(stream, **_pack(result))
+            size = os.path.getsize(temporary)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+            else:
+                self._bytes += size
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """ Remove the least recently used entries until the cache fits in
+            max_bytes (the cache's own budget by default).
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    info = entry.stat()
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, entry.path))
+        entries.sort()
+
+        total = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._bytes = total
+            self._stats["evictions"] += removed
+
+    def clear(self):
+        """ Remove every cached result and reset the statistics """
+        self.evict(0)
+        with self._lock:
+            self._stats.update(hits=0, misses=0, evictions=0)
+
+    def info(self):
+        """ Hit/miss/eviction counts, with the number and total size of entries """
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".npz")]
+        size = sum(entry.stat().st_size for entry in entries)
+        with self._lock:
+            return dict(self._stats, entries=len(entries), bytes=size, max_bytes=self.max_bytes)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _discard(self, path):
+        """ Remove one cached file, rescanning the cache size on the next store """
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._bytes = None
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _scan_size(self):
+        """ Total size in bytes of the cached results currently on disk """
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.name.endswith(".npz"))
+
+
+def _pack(result):
+    """ Arrays to save for a named tuple (one of the engine's result types) or
+        tuple result, with its type recorded
+    """
+    if hasattr(result, "_fields"):
+        fields = dict(zip(result._fields, result))
+        name = type_name(type(result))
+    elif isinstance(result, tuple):
+        fields = dict(("item{0}".format(index), value) for index, value in enumerate(result))
+        name = "tuple"
+    else:
+        raise ValueError("Only tuple results can be cached, not {0}".format(type(result).__name__))
+
+    arrays = dict((field, np.asarray(value)) for field, value in fields.items())
+    for field, array in arrays.items():
+        if array.dtype == object:
+            raise ValueError("Result field '{0}' cannot be stored as an array".format(field))
+    arrays[_TYPE_FIELD] = np.array(name)
+    return arrays
+
+
+def _unpack(arrays):
+    """ Rebuild a result saved by _pack, restoring scalars to Python numbers.
+        Raises ValueError if the recorded type is not one of the engine's.
+    """
+    name = str(arrays.pop(_TYPE_FIELD))
+    values = dict((field, array.item() if array.ndim == 0 else array)
+                  for field, array in arrays.items())
+    if name == "tuple":
+        return tuple(values["item{0}".format(index)] for index in range(len(values)))
+    return lookup(name)(**values)
@@ -0,0 +1,47 @@
+"""
+    The engine's result types that may be rebuilt from saved files.
+
+    The result cache and the results store record the named tuple type of each
+    result they save as "module:Name", and rebuild it from that name on
+    loading. Their directories can be shared, so the name read back is not
+    trusted: only the result types listed here are rebuilt, and any other name
+    is refused instead of being imported and called.
+"""
+
+import importlib
+
+# named tuple result types that may be saved and rebuilt, by the submodule defining them
+RESULT_TYPES = {
+    "analysis": ("Margins", "BodeResponse", "NyquistResponse", "TimeResponse", "RootLocus",
+                 "PerformanceMetrics"),
+    "expressions": ("CompiledTF", "CompiledZPK"),
+    "freqresp": ("BatchResponse",),
+    "frequency_grid": ("FrequencyGrid",),
+    "metrics": ("StepMetrics", "RampMetrics", "ErrorConstants", "LoopMetrics"),
+    "nyquist": ("NyquistContour", "NyquistStability"),
+    "rlocus": ("RootLocusTrace",),
+    "sweep": ("MarginSurface",),
+    "tuning": ("TuningResult",),
+    "comparison": ("SamplingComparison",),
+    "optimise": ("DesignTargets", "CompensatorDesign", "OptimisationResult"),
+    "zpk_sets": ("ZPKSet",),
+}
+
+
+def type_name(result_type):
+    """ The "module:Name" recorded for a result type, which must be listed in RESULT_TYPES """
+    name = "{0}:{1}".format(result_type.__module__, result_type.__name__)
+    if lookup(name) is not result_type:
+        raise ValueError("{0} is not one of the engine's result types".format(name))
+    return name
+
+
+def lookup(name):
+    """ The result type recorded as "module:Name", if it is listed in
+        RESULT_TYPES; any other name raises ValueError without importing anything
+    """
+    module, _, type_ = str(name).partition(":")
+    package, _, submodule = module.rpartition(".")
+    if package != __package__ or type_ not in RESULT_TYPES.get(submodule, ()):
+        raise ValueError("{0!r} is not one of the engine's result types".format(name))
+    return getattr(importlib.import_module(module), type_)
@@ -0,0 +1,241 @@
+"""
+    Store of past analysis results, kept for replay and later slicing.
+
+    Each result saved (a named tuple of arrays and numbers, or a tuple, list or
+    dict of them, such as a Bode, Nyquist, root locus or time response) gets a
+    directory of its own holding every array as a plain .npy file, and one line
+    in a JSON lines index recording when and how it was produced, its
+    structure, and the shape and type of each array. Numbers and strings are
+    kept in the index itself.
+
+    Loading a result rebuilds the same structure with each array memory-mapped
+    from its file, so nothing is read from disk until it is used: a band of
+    frequencies across ten thousand stored responses, for instance, reads just
+    those columns. Named tuples are only rebuilt if the index names one of the
+    engine's own result types (see result_types). Results are written to a
+    temporary directory and moved into place before being indexed, so readers
+    never see one partly written.
+
+    The store is kept within a size and a run budget by removing the oldest
+    runs first, and saving a run with the same metadata as an earlier one (the
+    same analysis with the same arguments) replaces it.
+"""
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+import numpy as np
+
+from .result_types import lookup, type_name
+
+# environment variable overriding the default results directory
+RESULTS_DIR_VARIABLE = "CONTROL_ENGINE_RESULTS"
+
+# name of the index file in the results directory
+INDEX_NAME = "index.jsonl"
+
+# total size of the stored arrays before the oldest runs are removed
+DEFAULT_MAX_BYTES = 512*1024*1024
+
+# number of runs kept before the oldest are removed
+DEFAULT_MAX_RUNS = 200
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_directory():
+    """ Results directory from the CONTROL_ENGINE_RESULTS environment variable,
+        or a control_engine/results folder in the user's data directory.
+    """
+    directory = os.environ.get(RESULTS_DIR_VARIABLE)
+    if not directory:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        directory = os.path.join(base, "control_engine", "results")
+    return directory
+
+
+def default_store():
+    """ Results store shared by every caller in this process, in the default directory """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ResultsStore()
+        return _default_store
+
+
+class ResultsStore(object):
+    """ Directory of saved analysis results with a metadata index, bounded to
+        max_bytes of arrays and max_runs runs. Any JSON-ready keyword arguments
+        given when saving (such as the plant, compensator and analysis) are
+        kept with the result, and runs can be listed and filtered by them.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, max_runs=DEFAULT_MAX_RUNS):
+        self.directory = directory or default_directory()
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+        self.max_bytes = int(max_bytes)
+        self.max_runs = int(max_runs)
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self, result, **metadata):
+        """ Save a result, returning the index record of the new run. Earlier
+            runs with the same metadata are replaced, and the oldest runs are
+            removed if the store is then over budget.
+        """
+        run_id = "{0:%Y%m%d-%H%M%S}-{1}".format(datetime.datetime.now(), uuid.uuid4().hex[:8])
+        staging = tempfile.mkdtemp(prefix=".saving-", dir=self.directory)
+        try:
+            arrays = {}
+            structure = _flatten(result, "result", staging, arrays)
+            record = {"id": run_id, "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                      "metadata": metadata, "structure": structure, "arrays": arrays,
+                      "bytes": sum(int(np.prod(shape))*np.dtype(dtype).itemsize for shape, dtype in arrays.values())}
+            if record["bytes"] > self.max_bytes:
+                raise ValueError("Result of {0:.1f} MB exceeds the store's {1:.1f} MB budget".format(
+                    record["bytes"]/2**20, self.max_bytes/2**20))
+            try:
+                line = json.dumps(record) + "\n"
+            except TypeError as error:
+                raise ValueError("Result metadata cannot be stored: {0}".format(error))
+            os.replace(staging, os.path.join(self.directory, run_id))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        with self.lock, open(self.index_path, "a") as index:
+            index.write(line)
+        metadata = json.loads(line)["metadata"]
+        self._remove([earlier["id"] for earlier in self.runs()
+                      if earlier["metadata"] == metadata and earlier["id"] != run_id])
+        self.evict()
+        return record
+
+    def evict(self, max_bytes=None, max_runs=None):
+        """ Remove the oldest runs until the store holds at most max_runs runs
+            and max_bytes of arrays (the store's own budgets by default)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_runs = self.max_runs if max_runs is None else max_runs
+        records = self.runs()
+        total = sum(record["bytes"] for record in records)
+        removed = []
+        for record in records:
+            if total <= max_bytes and len(records) - len(removed) <= max_runs:
+                break
+            removed.append(record["id"])
+            total -= record["bytes"]
+        self._remove(removed)
+
+    def runs(self, **metadata):
+        """ Index records of the saved runs, oldest first, keeping only those
+            whose metadata has the given values
+        """
+        if not os.path.exists(self.index_path):
+            return []
+        with self.lock, open(self.index_path) as index:
+            records = [json.loads(line) for line in index if line.strip()]
+        return [record for record in records
+                if all(record["metadata"].get(key) == value for key, value in metadata.items())]
+
+    def record(self, run_id):
+        """ Index record of one run """
+        for record in self.runs():
+            if record["id"] == run_id:
+                return record
+        raise ValueError("No stored run {0!r} in {1}".format(run_id, self.directory))
+
+    def load(self, run_id):
+        """ A saved result, rebuilt with its arrays memory-mapped read-only """
+        return _rebuild(self.record(run_id)["structure"], os.path.join(self.directory, run_id))
+
+    def array(self, run_id, name):
+        """ One memory-mapped array of a saved result, by the name listed in its
+            record's "arrays" (e.g. "result.1.mag_db"), without rebuilding the rest
+        """
+        return np.load(os.path.join(self.directory, run_id, name + ".npy"), mmap_mode="r")
+
+    def delete(self, run_id):
+        """ Remove a run's arrays and its index record """
+        self._remove([run_id])
+
+    def _remove(self, run_ids):
+        """ Remove the index records of several runs in one rewrite, then their arrays """
+        run_ids = set(run_ids)
+        if not run_ids:
+            return
+        with self.lock:
+            with open(self.index_path) as index:
+                lines = [line for line in index if line.strip() and json.loads(line)["id"] not in run_ids]
+            temporary = self.index_path + ".tmp"
+            with open(temporary, "w") as index:
+                index.writelines(lines)
+            os.replace(temporary, self.index_path)
+        for run_id in run_ids:
+            shutil.rmtree(os.path.join(self.directory, run_id), ignore_errors=True)
+
+
+def select_band(response, lower, upper):
+    """ The part of a frequency response (any named tuple with an omega field,
+        such as a BodeResponse or BatchResponse) between the lower and upper
+        frequencies. Fields running along omega are sliced on their last axis;
+        memory-mapped fields stay memory-mapped, so only the band is read.
+    """
+    omega = response.omega
+    start, stop = np.searchsorted(omega, lower, side="left"), np.searchsorted(omega, upper, side="right")
+    return response._replace(**dict(
+        (field, value[..., start:stop]) for field, value in zip(response._fields, response)
+        if isinstance(value, np.ndarray) and value.ndim and value.shape[-1] == len(omega)))
+
+
+def _flatten(value, name, directory, arrays):
+    """ JSON description of a result's structure, saving each array in it to
+        directory as name.npy and listing its (shape, dtype) in arrays. Named
+        tuples must be among the engine's result types.
+    """
+    if hasattr(value, "_fields"):
+        return {"type": type_name(type(value)),
+                "fields": dict((field, _flatten(item, "{0}.{1}".format(name, field), directory, arrays))
+                               for field, item in zip(value._fields, value))}
+    if isinstance(value, (tuple, list)):
+        return {type(value).__name__: [_flatten(item, "{0}.{1}".format(name, index), directory, arrays)
+                                       for index, item in enumerate(value)]}
+    if isinstance(value, dict):
+        return {"dict": dict((str(key), _flatten(item, "{0}.{1}".format(name, key), directory, arrays))
+                             for key, item in value.items())}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {"value": value}
+    if isinstance(value, np.generic):
+        return {"value": value.item()}
+    array = np.asarray(value)
+    if array.dtype == object:
+        raise ValueError("Result part '{0}' cannot be stored as an array".format(name))
+    stored = np.lib.format.open_memmap(os.path.join(directory, name + ".npy"), mode="w+",
+                                       dtype=array.dtype, shape=array.shape)
+    stored[...] = array
+    stored.flush()
+    del stored
+    arrays[name] = (list(array.shape), array.dtype.str)
+    return {"array": name}
+
+
+def _rebuild(structure, directory):
+    """ Result described by a structure from _flatten, with memory-mapped
+        arrays. Raises ValueError for a type that is not one of the engine's.
+    """
+    if "array" in structure:
+        return np.load(os.path.join(directory, structure["array"] + ".npy"), mmap_mode="r")
+    if "value" in structure:
+        return structure["value"]
+    if "tuple" in structure:
+        return tuple(_rebuild(item, directory) for item in structure["tuple"])
+    if "list" in structure:
+        return [_rebuild(item, directory) for item in structure["list"]]
+    if "dict" in structure:
+        return dict((key, _rebuild(item, directory)) for key, item in structure["dict"].items())
+    result_type = lookup(structure["type"])
+    return result_type(**dict((field, _rebuild(item, directory)) for field, item in structure["fields"].items()))
@@ -0,0 +1,274 @@
+"""
+    Root-locus tracing by continuation in the loop gain.
+
+    The closed-loop poles are the roots of den(s) + K*num(s). Rather than
+    re-solving that polynomial from scratch at every gain, each step predicts
+    where the roots move using the sensitivity ds/dK, then polishes them with a
+    few vectorised Newton iterations. The gain step grows while the prediction
+    holds up and shrinks where the branches curve sharply, so smooth loci come
+    from a fraction of the full polynomial solves. The asymptotes, breakaway
+    points and imaginary-axis (or unit-circle) crossings are found exactly and
+    the trace is made to land on each of them.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+RootLocusTrace = namedtuple("RootLocusTrace", ["roots", "gains", "centroid", "angles",
+                                               "crossing_gains", "crossing_points",
+                                               "breakaway_gains", "breakaway_points",
+                                               "root_solves"])
+
+# Newton iterations allowed to polish predicted roots before a full solve is used
+NEWTON_ITERATIONS = 8
+
+
+def match_roots(previous, current):
+    """ Reorder the current roots so each sits in the branch of its nearest
+        root from the previous gain step.
+    """
+    remaining = list(current)
+    ordered = np.empty_like(previous)
+    for index, root in enumerate(previous):
+        nearest = int(np.argmin(np.abs(np.asarray(remaining) - root)))
+        ordered[index] = remaining.pop(nearest)
+    return ordered
+
+
+def fixed_gain_locus(num, den, gains):
+    """ Closed-loop roots at each of the given gains, found by a full solve of
+        den + K*num at every gain, with branches matched between gains.
+    """
+    num, den = _coefficients(num, den)
+    padded_num = _pad(num, den)
+    roots = np.empty((len(gains), len(den) - 1), dtype=complex)
+    previous = None
+    for index, gain in enumerate(gains):
+        current = np.roots(den + gain*padded_num).astype(complex)
+        if previous is not None:
+            current = match_roots(previous, current)
+        roots[index] = current
+        previous = current
+    return roots
+
+
+def asymptotes(num, den):
+    """ Centroid and angles (rad) of the asymptotes followed by the branches
+        heading to infinity as the gain grows.
+    """
+    num, den = _coefficients(num, den)
+    excess = len(den) - len(num)
+    if excess <= 0:
+        return None, np.array([])
+    centroid = (np.sum(np.roots(den)) - np.sum(np.roots(num))).real/excess
+    angles = (2*np.arange(excess) + 1)*math.pi/excess
+    return centroid, angles
+
+
+def stability_crossings(num, den, dt=None):
+    """ Positive gains, and the root locations, at which the locus crosses the
+        imaginary axis (continuous) or the unit circle (discrete).
+
+        On the boundary K = -den/num must be real, so den(s)*num(-s) -
+        num(s)*den(-s) vanishes there (or the unit-circle equivalent using the
+        reversed polynomials); the boundary roots of that polynomial give the
+        crossings exactly.
+    """
+    num, den = _coefficients(num, den)
+    if dt:
+        offset = np.zeros(len(den) - len(num) + 1)
+        offset[0] = 1.0
+        condition = np.polysub(np.polymul(np.polymul(den, num[::-1]), offset),
+                               np.polymul(num, den[::-1]))
+    else:
+        condition = np.polysub(np.polymul(den, _reflect(num)), np.polymul(num, _reflect(den)))
+
+    candidates = np.roots(np.trim_zeros(condition, "f")) if np.any(condition) else np.array([])
+    if dt:
+        on_boundary = np.abs(np.abs(candidates) - 1) < 1e-6
+    else:
+        on_boundary = np.abs(candidates.real) < 1e-6*np.maximum(1.0, np.abs(candidates))
+        candidates = 1j*candidates.imag
+    return _positive_gains(num, den, candidates[on_boundary], upper_half=True)
+
+
+def breakaway_points(num, den):
+    """ Positive gains, and locations, at which branches meet and leave the
+        real axis (or otherwise coincide) - the roots of den'*num - den*num'
+        giving a real positive gain.
+    """
+    num, den = _coefficients(num, den)
+    condition = np.polysub(np.polymul(np.polyder(den), num), np.polymul(den, np.polyder(num)))
+    if not np.any(condition) or len(np.trim_zeros(condition, "f")) < 2:
+        return np.array([]), np.array([], dtype=complex)
+    candidates = np.roots(np.trim_zeros(condition, "f"))
+    return _positive_gains(num, den, candidates, upper_half=True)
+
+
+def trace_root_locus(num, den, dt=None, max_gain=None, max_move=0.02, tolerance=1e-3,
+                     max_points=5000):
+    """ Trace the root locus of den + K*num from K = 0 to max_gain.
+
+        Each step may move any root by at most max_move, and the difference
+        between predicted and polished roots must stay within tolerance, both
+        relative to the larger of the root's distance from the origin and the
+        overall size of the pole-zero pattern. Returns the
+        roots (one column per branch), the gains, the asymptotes, the exact
+        boundary crossings and breakaway points, and the number of full
+        polynomial solves that were needed.
+    """
+    num, den = _coefficients(num, den)
+    padded_num = _pad(num, den)
+    scale = _pattern_scale(num, den)
+    if max_gain is None:
+        max_gain = _default_max_gain(num, den, scale)
+
+    crossing_gains, crossing_points = stability_crossings(num, den, dt)
+    breakaway_gains, break_points = breakaway_points(num, den)
+    landmarks = np.unique(np.concatenate((crossing_gains, breakaway_gains)))
+    landmarks = list(landmarks[(landmarks > 0) & (landmarks < max_gain)])
+
+    roots = [np.roots(den).astype(complex)]
+    gains = [0.0]
+    root_solves = 1
+
+    # first step off the open-loop poles is taken with a full solve
+    gain = max_gain*1e-8
+    if landmarks:
+        gain = min(gain, landmarks[0]/2)
+    current = match_roots(roots[0], np.roots(den + gain*padded_num).astype(complex))
+    root_solves += 1
+    roots.append(current)
+    gains.append(gain)
+
+    log_step = 0.1
+    solve_next = False
+    while gain < max_gain and len(gains) < max_points:
+        target = min(gain*math.exp(log_step), max_gain)
+        if landmarks and target >= landmarks[0]:
+            target = landmarks.pop(0)
+            landing = True
+        else:
+            landing = False
+
+        polished = None
+        if not solve_next:
+            sensitivity = _sensitivity(current, gain, den, padded_num)
+            predicted = current + sensitivity*(target - gain)
+            size = np.maximum(scale, np.abs(current))
+            finite = np.all(np.isfinite(predicted))
+
+            if finite and np.any(np.abs(predicted - current) > max_move*size) and log_step > 1e-6:
+                if landing:
+                    landmarks.insert(0, target)
+                log_step /= 2
+                continue
+            if finite:
+                polished = _newton(predicted, target, den, padded_num, scale)
+            if polished is not None and np.any(np.abs(polished - predicted) > tolerance*size) \
+                    and log_step > 1e-6:
+                if landing:
+                    landmarks.insert(0, target)
+                log_step /= 2
+                continue
+
+        if polished is None:
+            polished = match_roots(current, np.roots(den + target*padded_num).astype(complex))
+            root_solves += 1
+        else:
+            log_step = min(log_step*1.5, 1.0)
+
+        current, gain = polished, target
+        roots.append(current)
+        gains.append(gain)
+
+        # sensitivities blow up where branches meet, so restart just past a landmark with a full solve
+        solve_next = landing
+
+    centroid, angles = asymptotes(num, den)
+    return RootLocusTrace(np.array(roots), np.array(gains), centroid, angles,
+                          crossing_gains, crossing_points, breakaway_gains, break_points,
+                          root_solves)
+
+
+def _coefficients(num, den):
+    """ Float coefficient arrays with leading zeros removed """
+    num = np.trim_zeros(np.atleast_1d(np.asarray(num, dtype=float)), "f")
+    den = np.trim_zeros(np.atleast_1d(np.asarray(den, dtype=float)), "f")
+    return (num if num.size else np.zeros(1)), den
+
+
+def _pad(num, den):
+    """ Numerator left-padded with zeros to the length of the denominator """
+    return np.concatenate((np.zeros(len(den) - len(num)), num))
+
+
+def _reflect(poly):
+    """ Coefficients of p(-s) given those of p(s) """
+    powers = np.arange(len(poly) - 1, -1, -1)
+    return poly*np.where(powers % 2, -1.0, 1.0)
+
+
+def _positive_gains(num, den, points, upper_half=False):
+    """ Filter candidate points to those where K = -den/num is real and
+        positive, returning (gains, points) sorted by gain.
+    """
+    points = np.asarray(points, dtype=complex)
+    if upper_half:
+        points = points[points.imag >= -1e-9]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gains = -np.polyval(den, points)/np.polyval(num, points)
+    valid = np.isfinite(gains) & (gains.real > 0) & \
+        (np.abs(gains.imag) <= 1e-6*np.maximum(1.0, np.abs(gains.real)))
+    order = np.argsort(gains.real[valid])
+    return gains.real[valid][order], points[valid][order]
+
+
+def _pattern_scale(num, den):
+    """ Characteristic size of the pole-zero pattern, used to scale step sizes """
+    roots = np.concatenate((np.roots(num), np.roots(den))) if len(num) > 1 else np.roots(den)
+    return max(1.0, float(np.max(np.abs(roots)))) if roots.size else 1.0
+
+
+def _default_max_gain(num, den, scale):
+    """ Gain at which the branches heading to infinity sit well outside the
+        pole-zero pattern, or the finite branches have all but reached the zeros.
+    """
+    excess = max(len(den) - len(num), 1)
+    return (10.0*scale)**excess*abs(den[0]/num[0])
+
+
+def _sensitivity(roots, gain, den, padded_num):
+    """ ds/dK for each root, by implicit differentiation of den + K*num = 0 """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derivative = np.polyval(np.polyder(den), roots) + gain*np.polyval(np.polyder(padded_num), roots)
+        return -np.polyval(padded_num, roots)/derivative
+
+
+def _newton(roots, gain, den, padded_num, scale):
+    """ Polish all roots together with Newton's method, returning None if they
+        fail to converge or collapse onto one another.
+    """
+    poly = den + gain*padded_num
+    derivative = np.polyder(poly)
+    roots = np.array(roots, dtype=complex)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(NEWTON_ITERATIONS):
+            correction = np.polyval(poly, roots)/np.polyval(derivative, roots)
+            if not np.all(np.isfinite(correction)):
+                return None
+            roots = roots - correction
+            if np.all(np.abs(correction) <= 1e-10*np.maximum(1.0, np.abs(roots))):
+                break
+        else:
+            return None
+
+    # two branches polishing onto the same root means one has been lost
+    if len(roots) > 1:
+        separation = np.abs(roots[:, np.newaxis] - roots[np.newaxis, :])
+        np.fill_diagonal(separation, np.inf)
+        if np.min(separation) < 1e-9*scale:
+            return None
+    return roots
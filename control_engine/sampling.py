@@ -0,0 +1,174 @@
+"""
+    Memoised discretisation of continuous plants.
+
+    Each discrete-time analysis needs the sampled form of the same s-domain
+    plant, and forming it (a matrix exponential for the zero-order hold) is
+    by far the most expensive step. Results are cached on the plant's
+    coefficients, the sampling period and the method, with least recently used
+    eviction. A bulk mode discretises one plant for a whole list of sampling
+    periods at once, sharing a single state-space realisation and evaluating
+    every zero-order hold matrix exponential in one stacked call. High-order
+    plants held in factored form can be discretised without ever forming
+    their coefficients.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import control
+from scipy.linalg import eigvals, expm
+
+from .analysis import tf_coefficients
+from .factored import FactoredTF
+from .freqresp import zpk_evaluate
+from .instrument import stage
+
+# number of discretised plants held before the least recently used is evicted
+CACHE_SIZE = 256
+
+# generalised eigenvalues beyond this (relative to the unit circle) are infinite zeros
+INFINITE_ZERO = 1e10
+
+# point on the unit circle (angle in rad) at which factored discretisations are matched in gain
+GAIN_ANGLE = 1.0
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def discretize(sys_tf, sampling_time, method='zoh'):
+    """ Discrete-time equivalent of a continuous SISO transfer function, as from
+        control.sample_system, reusing any earlier result for the same plant,
+        sampling period and method.
+    """
+    num, den = tf_coefficients(sys_tf)
+    key = (tuple(num), tuple(den), float(sampling_time), method)
+    discrete_tf = _lookup(key)
+    if discrete_tf is None:
+        with stage("sample_system"):
+            discrete_tf = control.sample_system(control.tf(num, den), key[2], method=method)
+        _store(key, discrete_tf)
+    return discrete_tf
+
+
+def discretize_many(sys_tf, sampling_times, method='zoh'):
+    """ Discretise one continuous plant for every sampling period in a list,
+        returning the discrete transfer functions in the same order. Periods
+        already in the cache are reused, and zero-order hold equivalents for the
+        remainder are formed together from one state-space realisation.
+    """
+    if method != 'zoh':
+        return [discretize(sys_tf, sampling_time, method) for sampling_time in sampling_times]
+
+    num, den = tf_coefficients(sys_tf)
+    keys = [(tuple(num), tuple(den), float(sampling_time), method) for sampling_time in sampling_times]
+    results = dict((key, _lookup(key)) for key in keys)
+
+    missing = sorted(key[2] for key, discrete_tf in results.items() if discrete_tf is None)
+    if missing:
+        with stage("sample_system", periods=len(missing)):
+            stacked = _zoh_stack(num, den, missing)
+        for sampling_time, discrete_tf in zip(missing, stacked):
+            key = (tuple(num), tuple(den), sampling_time, method)
+            results[key] = discrete_tf
+            _store(key, discrete_tf)
+    return [results[key] for key in keys]
+
+
+def discretize_factored(sys, sampling_times):
+    """ Zero-order hold equivalents of a continuous FactoredTF for each
+        sampling period in a list, kept in factored form. Its balanced section
+        realisation is exponentiated for every period in one stacked call. The
+        discrete poles are exp(p*Ts) of the continuous ones and the zeros are
+        the invariant zeros of each discrete realisation, so no high-order
+        polynomial is formed or solved.
+    """
+    sampling_times = [float(sampling_time) for sampling_time in sampling_times]
+    A, B, C, D = sys.state_space()
+    states = len(A)
+    if not states:
+        return [FactoredTF([], [], D, sampling_time) for sampling_time in sampling_times]
+
+    with stage("sample_system", periods=len(sampling_times)):
+        augmented = np.zeros((states + 1, states + 1))
+        augmented[:states, :states] = A
+        augmented[:states, states] = B
+        exponentials = expm(np.asarray(sampling_times)[:, np.newaxis, np.newaxis]*augmented)
+
+        # zeros are the finite generalised eigenvalues of [[Ad, Bd], [C, D]] - z[[I, 0], [0, 0]]
+        pencil = np.zeros((states + 1, states + 1))
+        pencil[:states, :states] = np.eye(states)
+        point = np.exp(1j*GAIN_ANGLE)
+        discrete = []
+        for sampling_time, exponential in zip(sampling_times, exponentials):
+            system = exponential.copy()
+            system[states, :states] = C
+            system[states, states] = D
+            zeros = eigvals(system, pencil)
+            zeros = zeros[np.isfinite(zeros) & (np.abs(zeros) < INFINITE_ZERO)]
+            poles = np.exp(sys.poles_*sampling_time)
+
+            Ad, Bd = exponential[:states, :states], exponential[:states, states]
+            response = C.dot(np.linalg.solve(point*np.eye(states) - Ad, Bd)) + D
+            gain = (response/zpk_evaluate(zeros, poles, 1.0, np.array([point]))[0]).real
+            discrete.append(FactoredTF(zeros, poles, gain, sampling_time))
+    return discrete
+
+
+def cache_info():
+    """ Hit/miss statistics and current size of the discretisation cache """
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_cache), maxsize=CACHE_SIZE)
+
+
+def clear_cache():
+    """ Empty the discretisation cache """
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats.update(hits=0, misses=0)
+
+
+def _lookup(key):
+    """ Cached discretisation for a key, marking it most recently used, or None """
+    with _cache_lock:
+        discrete_tf = _cache.get(key)
+        if discrete_tf is None:
+            _cache_stats["misses"] += 1
+        else:
+            _cache_stats["hits"] += 1
+            _cache.move_to_end(key)
+        return discrete_tf
+
+
+def _store(key, discrete_tf):
+    """ Add a discretisation to the cache, evicting the least recently used """
+    with _cache_lock:
+        _cache[key] = discrete_tf
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _zoh_stack(num, den, sampling_times):
+    """ Zero-order hold equivalents of a plant for several sampling periods,
+        from a single realisation and one stacked matrix exponential.
+    """
+    realisation = control.ss(control.tf(num, den))
+    A, B = np.asarray(realisation.A), np.asarray(realisation.B)
+    C, D = np.asarray(realisation.C), np.asarray(realisation.D)
+    states, inputs = B.shape
+
+    # exp([[A, B], [0, 0]]*Ts) holds the discrete A and B matrices in its top rows
+    augmented = np.zeros((states + inputs, states + inputs))
+    augmented[:states, :states] = A
+    augmented[:states, states:] = B
+    exponentials = expm(np.asarray(sampling_times)[:, np.newaxis, np.newaxis]*augmented)
+
+    discrete = []
+    for sampling_time, exponential in zip(sampling_times, exponentials):
+        discrete_ss = control.ss(exponential[:states, :states], exponential[:states, states:],
+                                 C, D, sampling_time)
+        discrete.append(control.tf(discrete_ss))
+    return discrete
@@ -0,0 +1,222 @@
+"""
+    Fast time-domain simulation of linear time-invariant systems.
+
+    A system (or a whole batch of systems) is converted once into a discrete
+    state-space realisation, which is then reused for step, ramp and arbitrary
+    input responses. Continuous systems are discretised with a first-order
+    hold, which is exact for the piecewise-linear inputs used here (steps,
+    ramps, and linearly interpolated sample arrays). Many systems and many
+    input signals are advanced together, one vectorised update per time step.
+"""
+
+import math
+
+import numpy as np
+import control
+from scipy.linalg import expm
+
+from .instrument import stage
+
+# bounds on the number of steps chosen automatically for a response
+MIN_STEPS = 500
+MAX_STEPS = 10000
+
+
+def default_time_step(sys_tf):
+    """ (dt, steps) giving a simulation horizon long enough for the slowest
+        pole of the system to settle, with enough points to resolve the fastest.
+        Discrete systems keep their own sampling period.
+    """
+    poles = np.asarray(sys_tf.poles(), dtype=complex)
+    discrete = sys_tf.isdtime(strict=True)
+    if discrete:
+        poles = np.log(poles[poles != 0])/sys_tf.dt
+
+    magnitudes = np.abs(poles)
+    magnitudes = magnitudes[magnitudes > 1e-9]
+    decay = -poles.real
+    decay = decay[decay > 1e-9*max(1.0, magnitudes.max() if magnitudes.size else 1.0)]
+
+    if decay.size:
+        horizon = 7.0/decay.min()
+    elif magnitudes.size:
+        horizon = 20*math.pi/magnitudes.min()
+    else:
+        horizon = 10.0
+
+    if discrete:
+        steps = int(np.clip(math.ceil(horizon/sys_tf.dt), 20, MAX_STEPS))
+        return sys_tf.dt, steps
+
+    fastest = magnitudes.max() if magnitudes.size else 1.0/horizon
+    steps = int(np.clip(math.ceil(20*horizon*fastest/(2*math.pi)), MIN_STEPS, MAX_STEPS))
+    return horizon/steps, steps
+
+
+class LTISimulator(object):
+    """ Simulates one or more SISO systems, sharing a single discrete
+        realisation across every input signal. Systems of differing order are
+        padded with inert states so they can be stacked and advanced together.
+
+        All systems must either be continuous, in which case they are
+        discretised with step dt (chosen automatically if not given), or
+        discrete with a common sampling period.
+    """
+    def __init__(self, systems, dt=None):
+        self.batched = isinstance(systems, (list, tuple))
+        systems = list(systems) if self.batched else [systems]
+        discrete = [sys_tf.isdtime(strict=True) for sys_tf in systems]
+        if any(discrete) and not all(discrete):
+            raise ValueError("Cannot simulate continuous and discrete systems together")
+
+        defaults = [default_time_step(sys_tf) for sys_tf in systems]
+        if all(discrete):
+            periods = set(float(sys_tf.dt) for sys_tf in systems)
+            if len(periods) > 1:
+                raise ValueError("Discrete systems must share a sampling period")
+            dt = periods.pop()
+        elif dt is None:
+            dt = min(default[0] for default in defaults)
+        self.dt = float(dt)
+        self.default_steps = max(int(math.ceil(default[0]*default[1]/self.dt)) for default in defaults)
+        self.default_steps = min(self.default_steps, MAX_STEPS)
+
+        with stage("realisation"):
+            realisations = [self._realise(sys_tf, self.dt) for sys_tf in systems]
+        order = max([realisation[0].shape[0] for realisation in realisations] + [1])
+        count = len(realisations)
+        self.A = np.zeros((count, order, order))
+        self.B = np.zeros((count, order))
+        self.C = np.zeros((count, order))
+        self.D = np.zeros(count)
+        self.input_offset = np.zeros((count, order))
+        for index, (A, B, C, D, offset) in enumerate(realisations):
+            states = A.shape[0]
+            self.A[index, :states, :states] = A
+            self.B[index, :states] = B
+            self.C[index, :states] = C
+            self.D[index] = D
+            self.input_offset[index, :states] = offset
+
+    @staticmethod
+    def _realise(sys_tf, dt):
+        """ Discrete (A, B, C, D) matrices for one system, along with the input
+            offset used to form its initial state.
+
+            For continuous systems the first-order hold equivalent is written in
+            a strictly causal form, with state xi[k] = x[k] - G2*u[k], so no
+            look-ahead at the next input sample is needed.
+        """
+        if hasattr(sys_tf, "state_space"):
+            # factored systems supply their own balanced realisation
+            A, B, C, D = sys_tf.state_space()
+            B, C, D = B[:, np.newaxis], C[np.newaxis, :], np.array([[D]])
+        else:
+            realisation = control.ss(sys_tf)
+            A, B = np.asarray(realisation.A, dtype=float), np.asarray(realisation.B, dtype=float)
+            C, D = np.asarray(realisation.C, dtype=float), np.asarray(realisation.D, dtype=float)
+        states = A.shape[0]
+        if sys_tf.isdtime(strict=True):
+            return A, B[:, 0], C[0], D[0, 0], np.zeros(states)
+
+        # exp([[A, B, 0], [0, 0, I/dt], [0, 0, 0]]*dt) holds Phi, G1 and G2 in its top rows
+        augmented = np.zeros((states + 2, states + 2))
+        augmented[:states, :states] = A*dt
+        augmented[:states, states] = B[:, 0]*dt
+        augmented[states, states + 1] = 1.0
+        exponential = expm(augmented)
+        phi = exponential[:states, :states]
+        gamma1 = exponential[:states, states]
+        gamma2 = exponential[:states, states + 1]
+
+        B_d = phi.dot(gamma2) + gamma1 - gamma2
+        D_d = D[0, 0] + C[0].dot(gamma2)
+        return phi, B_d, C[0], D_d, gamma2
+
+    def time(self, steps=None):
+        """ Time vector (seconds) for a response of the given number of steps """
+        steps = self.default_steps if steps is None else int(steps)
+        return np.arange(steps)*self.dt
+
+    def initial_state(self, first_input, state=None):
+        """ Internal state at the first sample for each system and signal, from
+            a physical state (zero by default) and the first input samples.
+        """
+        first_input = np.atleast_1d(np.asarray(first_input, dtype=float))
+        initial = -self.input_offset[:, :, np.newaxis]*first_input[np.newaxis, np.newaxis, :]
+        if state is not None:
+            initial = initial + np.asarray(state, dtype=float).reshape(len(self.A), -1, 1)
+        return initial
+
+    def simulate(self, inputs, state=None, return_state=False):
+        """ Responses to an array of input samples taken at the simulator's time
+            step - either one signal of shape (steps,) or many of shape
+            (signals, steps). Outputs have shape (systems, signals, steps), with
+            the systems axis dropped if a single system was given.
+
+            A starting internal state, as returned with return_state set, lets
+            a simulation continue on from where a previous one stopped.
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        signals = inputs.reshape(-1, inputs.shape[-1])
+        if state is None:
+            state = self.initial_state(signals[:, 0])
+        with stage("simulation", steps=signals.shape[1]):
+            outputs, state = self._run(signals, state)
+
+        if inputs.ndim == 1:
+            outputs = outputs[:, 0, :]
+        if not self.batched:
+            outputs = outputs[0]
+        return (outputs, state) if return_state else outputs
+
+    def _run(self, signals, state):
+        """ Advance every system over every signal, one vectorised update per step """
+        outputs = np.empty((len(self.A), signals.shape[0], signals.shape[1]))
+        state = np.array(state, dtype=float)
+        for k in range(signals.shape[1]):
+            u = signals[:, k]
+            outputs[:, :, k] = np.einsum("sn,snm->sm", self.C, state) + self.D[:, np.newaxis]*u
+            state = np.matmul(self.A, state) + self.B[:, :, np.newaxis]*u
+        return outputs, state
+
+    def stream(self, chunks, state=None):
+        """ Generator yielding the response to each chunk of an iterable of
+            input chunks in turn, carrying the internal state across chunk
+            boundaries. Each chunk is shaped as for simulate() and must hold
+            the same number of signals, so memory use depends only on the chunk
+            size and not on the overall length of the simulation.
+        """
+        for chunk in chunks:
+            outputs, state = self.simulate(chunk, state=state, return_state=True)
+            yield outputs
+
+    def step(self, steps=None):
+        """ (time, response) to a unit step input """
+        time = self.time(steps)
+        return time, self.simulate(np.ones(len(time)))
+
+    def ramp(self, steps=None):
+        """ (time, response) to a unit ramp input """
+        time = self.time(steps)
+        return time, self.simulate(time)
+
+
+def iter_chunks(samples, chunk_size):
+    """ Slice an input array (or memory-mapped recording) of shape (steps,) or
+        (signals, steps) into consecutive chunks along the time axis, without
+        copying the underlying data.
+    """
+    samples = np.asanyarray(samples)
+    for start in range(0, samples.shape[-1], int(chunk_size)):
+        yield samples[..., start:start + int(chunk_size)]
+
+
+def simulate_chunks(systems, chunks, dt=None, state=None):
+    """ Generator simulating one or more systems over an iterable of input
+        chunks, yielding an output chunk for each - see LTISimulator.stream.
+        An existing LTISimulator may be passed in place of the systems.
+    """
+    simulator = systems if isinstance(systems, LTISimulator) else LTISimulator(systems, dt)
+    for outputs in simulator.stream(chunks, state):
+        yield outputs
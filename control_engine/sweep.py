@@ -0,0 +1,84 @@
+"""
+    Gain and phase margin surfaces over compensator parameter grids.
+
+    A compensator is given as a template expression with named parameters, for
+    example "K*(s+a)/(s+b)", together with a grid of values for each parameter.
+    The grid is split into chunks which are spread across a pool of worker
+    processes, each worker compiling the template for its parameter sets,
+    computing the open-loop margins and checking closed-loop stability by the
+    Nyquist criterion. Chunking keeps inter-process traffic to a few arrays
+    per worker, so throughput scales with the number of cores.
+"""
+
+import itertools
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import control
+
+from .analysis import closed_loop_stability, stability_margins
+from .expressions import compile_expression
+
+MarginSurface = namedtuple("MarginSurface", ["names", "grids", "gain_margin_db", "phase_margin",
+                                             "wcg", "wcp", "stable"])
+
+# chunks handed to each worker process, enough to balance uneven chunk run times
+CHUNKS_PER_PROCESS = 4
+
+
+def margin_sweep(oltf, compensator_template, parameter_grid, processes=None):
+    """ Open-loop gain margin (dB), phase margin (deg) and crossover frequencies
+        (rad/s) of G(s)*F(s) for every combination of compensator parameters,
+        and whether the unity feedback closed loop is stable. Margins alone do
+        not say this for open-loop unstable or conditionally stable loops.
+
+        parameter_grid maps each parameter name in the template to a sequence
+        of values; the returned arrays have one axis per parameter, in the order
+        given by names. Set processes=1 to run in the calling process, or leave
+        as None to use every available core. When run from a script, the call
+        must sit under an 'if __name__ == "__main__":' guard so worker
+        processes can import it safely.
+    """
+    names = tuple(parameter_grid)
+    axes = [np.atleast_1d(np.asarray(parameter_grid[name], dtype=float)) for name in names]
+    combinations = np.array(list(itertools.product(*axes)), dtype=float).reshape(-1, len(names))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    chunks = [chunk for chunk in np.array_split(combinations, max(1, processes*CHUNKS_PER_PROCESS))
+              if len(chunk)]
+
+    if processes == 1 or len(chunks) == 1:
+        results = [_margin_chunk(oltf, compensator_template, names, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_margin_chunk, itertools.repeat(oltf),
+                                        itertools.repeat(compensator_template),
+                                        itertools.repeat(names), chunks))
+
+    margins = np.concatenate(results).reshape([len(axis) for axis in axes] + [5])
+    grids = np.meshgrid(*axes, indexing="ij")
+    return MarginSurface(names, grids, margins[..., 0], margins[..., 1],
+                         margins[..., 2], margins[..., 3], margins[..., 4] == 1)
+
+
+def _margin_chunk(oltf, compensator_template, names, values):
+    """ Margins and stability (1 if stable) for each row of parameter values -
+        run inside a worker process
+    """
+    plant_num, plant_den = compile_expression(oltf)
+    margins = np.full((len(values), 5), np.nan)
+    for index, row in enumerate(values):
+        comp_num, comp_den = compile_expression(compensator_template,
+                                                parameters=dict(zip(names, row)))
+        sys_tf = control.tf(np.polymul(plant_num, comp_num), np.polymul(plant_den, comp_den))
+        try:
+            result = stability_margins(sys_tf)
+            stability = closed_loop_stability(sys_tf)
+        except (ValueError, np.linalg.LinAlgError):
+            continue
+        margins[index] = (result.gain_margin_db, result.phase_margin, result.wcg, result.wcp,
+                          stability.stable)
+    return margins
@@ -0,0 +1,177 @@
+"""
+    Sets of many systems given by their poles, zeros and gains.
+
+    Systems are read from typed text (real or complex roots), from CSV files
+    with one system per row, or from binary .npy/.npz files, and held as
+    NaN-padded (systems x roots) arrays, as used by freqresp.pad_roots. Their
+    frequency responses are evaluated straight from the factored form on one
+    shared grid, a block of systems per numpy pass, so memory use stays bounded
+    however many systems there are and high-order systems keep their accuracy.
+    Responses can be exported to an .npz file for use by other tools.
+
+    Binary files hold the fields "poles" and "zeros" (complex, one row of
+    NaN-padded roots per system), "gain" (one real value per system) and
+    optionally "name": as the named arrays of an .npz file, or the fields of a
+    structured .npy array. A structured .npy file is memory-mapped, and if its
+    root fields are already complex (as save_zpk_set writes them) the set's
+    arrays are views of the file rather than copies read into memory.
+"""
+
+import csv
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .freqresp import BatchResponse, batch_zpk_response, pad_roots
+from .frequency_grid import zpk_frequency_range
+from .instrument import stage
+
+ZPKSet = namedtuple("ZPKSet", ["names", "zeros", "poles", "gains"])
+
+# complex factor values held in memory at once while evaluating a block of systems
+RESPONSE_ELEMENTS = 2**22
+
+# frequencies in the default logarithmic grid
+RESPONSE_POINTS = 1000
+
+# separators between a root and its conjugate offset, e.g. "-1±2j" for -1+2j and -1-2j
+PAIR_SEPARATORS = ("±", "+/-", "+-")
+
+
+def parse_roots(text):
+    """ Roots from comma (or semicolon) separated text. Each may be real or
+        complex, written as in Python ("-1+2j") or with i ("-1+2i"), and
+        "-1±2j" (or "-1+-2j") gives the conjugate pair -1+2j, -1-2j.
+    """
+    roots = []
+    for item in re.split(r"[,;]", str(text)):
+        item = "".join(item.split())
+        if not item:
+            continue
+        try:
+            for separator in PAIR_SEPARATORS:
+                if separator in item:
+                    centre, offset = item.split(separator, 1)
+                    centre, offset = _number(centre or "0"), _number(offset)
+                    roots.extend((centre + offset, centre - offset))
+                    break
+            else:
+                roots.append(_number(item))
+        except ValueError:
+            raise ValueError("Could not read {0!r} as a real or complex number".format(item))
+    return np.array(roots, dtype=complex)
+
+
+def _number(text):
+    """ Complex value of a number written as in Python, or with i for j """
+    return complex(text[:-1] + "j" if text.endswith("i") else text)
+
+
+def zpk_set(zeros, poles, gains, names=None):
+    """ ZPKSet from sequences of zero sets, pole sets and gains (one per
+        system). Zeros and poles already given as NaN-padded 2-D complex arrays
+        are kept as they are, without copying.
+    """
+    zeros, poles = _padded(zeros), _padded(poles)
+    gains = np.asarray(gains, dtype=float).reshape(-1)
+    if not len(zeros) == len(poles) == len(gains):
+        raise ValueError("Expected the same number of zero sets, pole sets and gains, got {0}, {1} and {2}".format(
+            len(zeros), len(poles), len(gains)))
+    if names is None:
+        names = [str(number) for number in range(1, len(gains) + 1)]
+    return ZPKSet(np.asarray(names, dtype=str), zeros, poles, gains)
+
+
+def _padded(root_sets):
+    """ Root sets as a NaN-padded (systems x roots) complex array """
+    if isinstance(root_sets, np.ndarray) and root_sets.ndim == 2 and root_sets.dtype == complex:
+        return root_sets
+    return pad_roots(root_sets)
+
+
+def load_zpk_set(path):
+    """ ZPKSet read from a CSV file (columns poles, zeros, gain and optionally
+        name, the roots written as for parse_roots) or from a binary .npy or
+        .npz file (see the module notes)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".npy", ".npz"):
+        names, zeros, poles, gains = [], [], [], []
+        with open(path, newline="") as stream:
+            for number, row in enumerate(csv.DictReader(stream), 1):
+                if row.get("gain") in (None, ""):
+                    raise ValueError("System {0} in {1} has no gain".format(number, path))
+                names.append(row.get("name") or str(number))
+                zeros.append(parse_roots(row.get("zeros") or ""))
+                poles.append(parse_roots(row.get("poles") or ""))
+                gains.append(float(row["gain"]))
+        return zpk_set(zeros, poles, gains, names)
+
+    if extension == ".npy":
+        data = np.load(path, mmap_mode="r")
+        fields = data.dtype.names or ()
+    else:
+        data = np.load(path)
+        fields = data.files
+    missing = [field for field in ("poles", "zeros", "gain") if field not in fields]
+    if missing:
+        raise ValueError("{0} has no {1} field(s)".format(path, ", ".join(missing)))
+    gains = np.asarray(data["gain"], dtype=float).reshape(-1)
+    zeros = np.asarray(data["zeros"], dtype=complex).reshape(len(gains), -1)
+    poles = np.asarray(data["poles"], dtype=complex).reshape(len(gains), -1)
+    names = np.asarray(data["name"], dtype=str) if "name" in fields else None
+    return zpk_set(zeros, poles, gains, names)
+
+
+def save_zpk_set(path, systems):
+    """ Write a ZPKSet to a structured .npy file readable by load_zpk_set """
+    dtype = [("name", systems.names.dtype), ("gain", float),
+             ("zeros", complex, (systems.zeros.shape[1],)), ("poles", complex, (systems.poles.shape[1],))]
+    data = np.zeros(len(systems.gains), dtype=dtype)
+    data["name"], data["gain"] = systems.names, systems.gains
+    data["zeros"], data["poles"] = systems.zeros, systems.poles
+    np.save(path, data)
+
+
+def zpk_set_response(systems, omega=None, dt=None, points=RESPONSE_POINTS):
+    """ Gain (dB) and phase (deg) of every system in a ZPKSet, as a
+        (systems x frequencies) BatchResponse. Unless a grid is given, the
+        frequencies span the features of all the systems. Systems are
+        evaluated a block at a time, keeping each block's factor values
+        within RESPONSE_ELEMENTS.
+    """
+    zeros, poles, gains = systems.zeros, systems.poles, systems.gains
+    if omega is None:
+        roots = np.concatenate((zeros.ravel(), poles.ravel()))
+        lower, upper = zpk_frequency_range(roots[:0], roots[~np.isnan(roots)], dt)
+        omega = np.geomspace(lower, upper, points)
+    omega = np.asarray(omega, dtype=float)
+
+    block = max(1, RESPONSE_ELEMENTS//(max(zeros.shape[1], poles.shape[1], 1)*len(omega)))
+    mag_db = np.empty((len(gains), len(omega)))
+    phase_deg = np.empty((len(gains), len(omega)))
+    with stage("frequency response", systems=len(gains)):
+        for start in range(0, len(gains), block):
+            part = slice(start, start + block)
+            response = batch_zpk_response(zeros[part], poles[part], gains[part], omega, dt)
+            mag_db[part], phase_deg[part] = response.mag_db, response.phase_deg
+    return BatchResponse(mag_db, phase_deg, omega)
+
+
+def export_response(path, response, names=None, dtype=np.float32):
+    """ Save a BatchResponse to an .npz file of the arrays omega (float64),
+        mag_db and phase_deg (systems x frequencies, single precision unless
+        another dtype is given) and names, if given. The file loads with
+        numpy.load alone. Returns the path written.
+    """
+    if not str(path).endswith(".npz"):
+        path = str(path) + ".npz"
+    arrays = {"omega": np.asarray(response.omega, dtype=float),
+              "mag_db": np.atleast_2d(response.mag_db).astype(dtype),
+              "phase_deg": np.atleast_2d(response.phase_deg).astype(dtype)}
+    if names is not None:
+        arrays["names"] = np.asarray(names, dtype=str)
+    np.savez(path, **arrays)
+    return path
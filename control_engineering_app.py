@@ -15,26 +15,894 @@
     Python Version: 3.4
 """
 
-# import matplotlib graphical libraries
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-
-import math
-import numpy as np
-
-# PIL lib for GUI image functionality
-from PIL import Image, ImageTk
+import importlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # import tkinter for app GUI
 import tkinter as tk
 from tkinter import ttk
 
-from scipy import signal
-import control
 
-# basic definition for s-domain 's' operator
-s = control.tf([1,0],1)
+class LazyModule(object):
+    """ Stand-in for a module that is only imported when one of its attributes is
+        first used, keeping heavy numeric libraries out of application start-up.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+np = LazyModule("numpy")
+
+# headless analysis engine performing all of the numeric work
+engine = LazyModule("control_engine")
+
+
+def load_image(filename):
+    """ Load an image file for display on a tkinter canvas, importing the PIL lib
+        for GUI image functionality on first use.
+    """
+    from PIL import Image, ImageTk
+    return ImageTk.PhotoImage(Image.open(filename))
+
+
+def stability_summary(stability):
+    """ One line describing a Nyquist stability verdict, for a plot title """
+    if stability.marginal:
+        verdict = "Closed loop marginally stable"
+    elif stability.stable:
+        verdict = "Closed loop stable"
+    else:
+        verdict = "Closed loop unstable"
+    return "{0} (N = {1}, P = {2}, Z = {3})".format(verdict, stability.encirclements,
+                                                  stability.open_loop_unstable,
+                                                  stability.closed_loop_unstable)
+
+
+def metrics_summary(metrics, ramp=False):
+    """ A few lines of closed-loop performance metrics, for a note on a time response """
+    if ramp:
+        return "Ramp tracking error: {0:.4g}\nSystem type: {1}".format(metrics.ramp_error, metrics.system_type)
+    return ("Rise time: {0:.4g} s\nOvershoot: {1:.2f} %\nSettling time (2%): {2:.4g} s\n"
+            "Steady-state error: {3:.4g}\nIAE: {4:.4g}  ISE: {5:.4g}  ITAE: {6:.4g}".format(
+                metrics.rise_time, metrics.overshoot, metrics.settling_time, metrics.steady_state_error,
+                metrics.iae, metrics.ise, metrics.itae))
+
+
+class AnalysisCancelled(Exception):
+    """ Raised inside a background analysis once it has been cancelled """
+
+
+class AnalysisTask(object):
+    """ Handle on a single analysis submitted to an AnalysisRunner. The analysis job
+        is passed its task, so it can report progress and stop early if cancelled.
+    """
+    def __init__(self, runner):
+        self.runner = runner
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """ Cancel the analysis - it is dropped if not yet started, and any result
+            it goes on to produce is discarded.
+        """
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.runner.forget(self)
+
+    def check(self):
+        """ Raise AnalysisCancelled if the analysis has been cancelled """
+        if self.cancelled:
+            raise AnalysisCancelled()
+
+    def progress(self, fraction, message=""):
+        """ Report progress (0 to 1) back to the GUI, stopping if cancelled """
+        self.check()
+        self.runner.post(self, "progress", (fraction, message))
+
+
+class AnalysisRunner(object):
+    """ Runs analysis jobs on a background thread pool so the GUI never blocks.
+        Progress, results and errors are queued by the workers and handed to
+        their callbacks on the Tk main thread, polled through after().
+    """
+    POLL_INTERVAL = 50
+
+    def __init__(self, widget, workers=2):
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.events = queue.Queue()
+        self.callbacks = {}
+        self.widget.after(self.POLL_INTERVAL, self.poll)
+
+    def submit(self, job, on_result, on_error=None, on_progress=None):
+        """ Run job(task) in the background, returning its AnalysisTask """
+        task = AnalysisTask(self)
+        self.callbacks[task] = (on_result, on_error, on_progress)
+        task.future = self.executor.submit(self.execute, task, job)
+        return task
+
+    def execute(self, task, job):
+        """ Worker-thread wrapper queueing the outcome of a job """
+        try:
+            result = job(task)
+        except AnalysisCancelled:
+            self.post(task, "cancelled", None)
+        except Exception as error:
+            self.post(task, "error", error)
+        else:
+            self.post(task, "result", result)
+
+    def post(self, task, kind, payload):
+        self.events.put((task, kind, payload))
+
+    def forget(self, task):
+        self.callbacks.pop(task, None)
+
+    def poll(self):
+        """ Deliver queued events to their callbacks on the main thread """
+        while True:
+            try:
+                task, kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            on_result, on_error, on_progress = self.callbacks.get(task, (None, None, None))
+            if kind == "progress":
+                if on_progress is not None and not task.cancelled:
+                    on_progress(*payload)
+                continue
+            self.forget(task)
+            if task.cancelled or kind == "cancelled":
+                continue
+            if kind == "result" and on_result is not None:
+                on_result(payload)
+            elif kind == "error" and on_error is not None:
+                on_error(payload)
+        self.widget.after(self.POLL_INTERVAL, self.poll)
+
+    def shutdown(self):
+        """ Cancel all outstanding analyses and release the worker threads """
+        for task in list(self.callbacks):
+            task.cancel()
+        self.executor.shutdown(wait=False)
+
+
+class AnalysisStatus(tk.Frame):
+    """ Progress bar, status message and cancel button for the background analyses
+        run from a page. Starting a new analysis cancels any still in progress.
+    """
+    def __init__(self, parent, runner, bg):
+        tk.Frame.__init__(self, parent, bg=bg)
+        self.runner = runner
+        self.task = None
+
+        self.message = tk.StringVar()
+        self.message.set("Ready")
+        self.progress_bar = ttk.Progressbar(self, length=200, maximum=1.0, mode="determinate")
+        self.progress_bar.pack(pady=2)
+        self.message_label = tk.Label(self, textvariable=self.message, font=('arial', 10), bg=bg)
+        self.message_label.pack()
+        self.cancel_button = ttk.Button(self, text="Cancel", width=10, command=self.cancel)
+        self.cancel_button.pack(pady=2)
+
+    def run(self, job, on_result, description, record=None, stored=None):
+        """ Run job(task) in the background, passing its result to on_result. Both
+            are timed as instrumentation stages, labelled with the page handler.
+            Given record (the handler's arguments), the result is also saved to
+            the results store, from which it can be replayed by passing it back
+            as stored, in which case it is drawn again without running the job.
+        """
+        self.cancel()
+        self.message.set("{0}...".format(description))
+        self.progress_bar["value"] = 0.0
+        handler = job.__qualname__.split(".<locals>")[0]
+        unsaved = []
+
+        def timed_job(task):
+            if stored is not None:
+                return stored
+            with engine.stage("analysis", handler=handler):
+                result = job(task)
+            if record is not None:
+                task.progress(1.0, "Saving results")
+                page, view = handler.split(".")
+                try:
+                    engine.default_store().save(result, page=page, view=view, arguments=record)
+                except (OSError, ValueError) as error:
+                    engine.instrument.count("results not saved")
+                    unsaved.append(error)
+            return result
+
+        def timed_result(result):
+            with engine.stage("render", handler=handler):
+                on_result(result)
+            if unsaved:
+                self.message.set("Done - results not saved: {0}".format(unsaved[0]))
+
+        self.task = self.runner.submit(timed_job, lambda result: self.finished(result, timed_result),
+                                       on_error=self.failed, on_progress=self.progress)
+
+    def progress(self, fraction, message):
+        self.progress_bar["value"] = fraction
+        if message:
+            self.message.set("{0}...".format(message))
+
+    def finished(self, result, on_result):
+        self.task = None
+        self.progress_bar["value"] = 1.0
+        self.message.set("Done")
+        on_result(result)
+
+    def failed(self, error):
+        self.task = None
+        self.progress_bar["value"] = 0.0
+        self.message.set("Error: {0}".format(error))
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.progress_bar["value"] = 0.0
+            self.message.set("Cancelled")
+
+
+class TracePlotter(object):
+    """ Draws analysis results into a matplotlib figure as named traces.
+
+        The axes of a layout, and the artists drawn on them, are created once
+        and updated in place with set_data by later analyses using the same
+        layout, rather than piling new artists on top of old ones. Dense
+        traces are decimated to the pixel resolution of their axes each time
+        the figure is drawn (and whenever the view is zoomed or panned), and
+        static reference overlays are drawn once as a single line collection.
+
+        With blitting set, traces are drawn over a saved image of the rest of
+        the figure, so plots updated many times a second (while a slider is
+        dragged) need not redraw their axes, ticks and labels each time.
+    """
+    # fraction of their span added to limits that grow to fit a trace, so the
+    # next few updates still fit and can be blitted
+    GROW_HEADROOM = 0.25
+
+    def __init__(self, figure, canvas, toolbar=None, blitting=False):
+        self.figure = figure
+        self.canvas = canvas
+        self.toolbar = toolbar
+        self.blitting = blitting
+        self.layout_name = None
+        self.axes = []
+        self.artists = {}
+        self.heading_text = None
+        self.used = set()
+        self.updating = False
+        self.background = None
+        self.background_view = None
+        canvas.mpl_connect("draw_event", self.drawn)
+
+    def layout(self, name, rows=1, xscale="linear"):
+        """ Axes for the named layout (rows of subplots, one above the other),
+            reused if the last plot had the same layout, otherwise made afresh.
+            Every plot starts with a call to layout and ends with draw.
+        """
+        self.updating = True
+        self.used = set()
+        if name != self.layout_name:
+            self.figure.clear()
+            self.axes = [self.figure.add_subplot(rows, 1, row + 1) for row in range(rows)]
+            for axes in self.axes:
+                axes.set_xscale(xscale)
+                axes.callbacks.connect("xlim_changed", self.view_changed)
+                axes.callbacks.connect("ylim_changed", self.view_changed)
+            self.artists = {}
+            self.heading_text = None
+            self.layout_name = name
+        return self.axes
+
+    def heading(self, text, **options):
+        """ Title text across the top of the figure """
+        if self.heading_text is None:
+            self.heading_text = self.figure.text(0.3, 0.93, text, **options)
+        self.heading_text.set_text(text)
+
+    def trace(self, axes, key, x, y, style="-", kind="line", **options):
+        """ Draw, or update in place, the named trace on the axes. kind is
+            "line" for traces with increasing x, "path" for parametric curves
+            and "stem" for a stem plot of samples.
+        """
+        entry = self.artists.get(key)
+        if entry is None:
+            if kind == "stem":
+                line, = axes.plot([], [], "-", animated=self.blitting, **options)
+                markers, = axes.plot([], [], "o", color=line.get_color(), animated=self.blitting)
+                axes.axhline(0.0, color="C3", linewidth=1)
+            else:
+                line, markers = axes.plot([], [], style, animated=self.blitting, **options)[0], None
+            entry = self.artists[key] = {"axes": axes, "line": line, "markers": markers, "kind": kind}
+        entry["x"] = np.asarray(x, dtype=float)
+        entry["y"] = np.asarray(y, dtype=float)
+        self.used.add(key)
+        self.decimate(entry, limits=self.data_limits(entry["x"], entry["y"]))
+        return entry["line"]
+
+    def branches(self, axes, key, curves, **options):
+        """ Draw, or update in place, a set of parametric curves (such as root
+            locus branches) as one line collection, coloured in turn.
+        """
+        entry = self.artists.get(key)
+        if entry is None:
+            from matplotlib.collections import LineCollection
+            collection = LineCollection([], **options)
+            axes.add_collection(collection)
+            entry = self.artists[key] = {"axes": axes, "collection": collection, "kind": "branches",
+                                         "scaled": True}
+        entry["curves"] = [(np.asarray(x, dtype=float), np.asarray(y, dtype=float)) for x, y in curves]
+        entry["collection"].set_color(["C{0}".format(index % 10) for index in range(len(curves))])
+        self.used.add(key)
+        points = np.concatenate([np.column_stack(curve) for curve in entry["curves"]] + [np.zeros((0, 2))])
+        self.decimate(entry, limits=self.data_limits(points[:, 0], points[:, 1]))
+
+    def overlay(self, axes, key, segments, scaled=False, **options):
+        """ Static reference lines (each an (N, 2) array of points), drawn once
+            per layout as a single line collection. Set scaled to include
+            them when the axes are autoscaled.
+        """
+        if key not in self.artists:
+            from matplotlib.collections import LineCollection
+            collection = LineCollection(segments, **options)
+            axes.add_collection(collection, autolim=False)
+            self.artists[key] = {"axes": axes, "collection": collection, "kind": "overlay",
+                                 "scaled": scaled}
+        self.used.add(key)
+
+    def note(self, axes, key, text):
+        """ Draw, or update in place, a boxed text note in the corner of the axes """
+        entry = self.artists.get(key)
+        if entry is None:
+            label = axes.text(0.98, 0.04, "", transform=axes.transAxes, ha="right", va="bottom",
+                              fontsize="small", bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
+            entry = self.artists[key] = {"axes": axes, "text": label, "kind": "overlay"}
+        entry["text"].set_text(text)
+        self.used.add(key)
+
+    def rescale(self, axes, grow=False):
+        """ Fit the axes' limits to their traces and scaled collections. If grow
+            is set, the limits are left alone while every trace still fits, and
+            are given GROW_HEADROOM when they do change.
+        """
+        if grow and self.fits(axes):
+            return
+        axes.relim(visible_only=True)
+        for key in self.used:
+            entry = self.artists[key]
+            if entry["axes"] is axes and entry.get("scaled"):
+                segments = entry["collection"].get_segments()
+                if segments:
+                    axes.update_datalim(np.concatenate(segments))
+        axes.set_autoscale_on(True)
+        axes.autoscale_view()
+        if grow:
+            bottom, top = axes.get_ylim()
+            axes.set_ylim(bottom - self.GROW_HEADROOM*(top - bottom), top + self.GROW_HEADROOM*(top - bottom))
+            if axes.get_xscale() == "linear":
+                left, right = axes.get_xlim()
+                axes.set_xlim(left, right + self.GROW_HEADROOM*(right - left))
+
+    def fits(self, axes):
+        """ True if the traces on axes lie within its current view """
+        (left, right), (bottom, top) = axes.get_xlim(), axes.get_ylim()
+        for key in self.used:
+            entry = self.artists[key]
+            if entry["axes"] is axes and "x" in entry:
+                (x_low, x_high), (y_low, y_high) = self.data_limits(entry["x"], entry["y"])
+                if x_low < min(left, right) or x_high > max(left, right) or \
+                        y_low < min(bottom, top) or y_high > max(bottom, top):
+                    return False
+        return True
+
+    def draw(self):
+        """ Hide the traces this plot did not use, decimate the rest to the
+            final view, and render the figure now - timing matplotlib's drawing
+            as its own stage
+        """
+        self.finish()
+        if self.toolbar is not None:
+            self.toolbar.update()
+        with engine.stage("matplotlib draw"):
+            self.canvas.draw()
+
+    def blit(self):
+        """ As draw, but with blitting only the traces are redrawn, over the
+            saved background, unless the view has changed since it was saved
+        """
+        self.finish()
+        if not self.blitting or self.background is None or self.background_view != self.view():
+            self.draw()
+            return
+        with engine.stage("matplotlib draw"):
+            self.canvas.restore_region(self.background)
+            self.draw_traces()
+            self.canvas.blit(self.figure.bbox)
+
+    def finish(self):
+        """ Show just the traces used by this plot, decimated to the final view """
+        for key, entry in self.artists.items():
+            for artist in (entry.get("line"), entry.get("markers"), entry.get("collection"), entry.get("text")):
+                if artist is not None:
+                    artist.set_visible(key in self.used)
+            if key in self.used and entry["kind"] != "overlay":
+                self.decimate(entry)
+        self.updating = False
+
+    def drawn(self, event):
+        """ After a full draw, save the background for blitting and draw the
+            traces (which are animated, so left out of it) on top
+        """
+        if self.blitting:
+            self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+            self.background_view = self.view()
+            self.draw_traces()
+
+    def draw_traces(self):
+        """ Draw the traces in use straight onto the canvas """
+        for key in self.used:
+            entry = self.artists[key]
+            for artist in (entry.get("line"), entry.get("markers")):
+                if artist is not None:
+                    self.figure.draw_artist(artist)
+
+    def view(self):
+        """ Figure size and axes limits, which a saved background depends on """
+        return (tuple(self.figure.bbox.bounds),
+                [(axes.get_xlim(), axes.get_ylim()) for axes in self.axes])
+
+    def view_changed(self, axes):
+        """ Re-decimate the traces on axes that have been zoomed or panned """
+        if self.updating:
+            return
+        for key in self.used:
+            entry = self.artists[key]
+            if entry["axes"] is axes and entry["kind"] != "overlay":
+                self.decimate(entry)
+
+    def decimate(self, entry, limits=None):
+        """ Set an entry's artists to its data, reduced to the pixel resolution
+            of its axes over the given (x, y) limits, or the current view.
+        """
+        axes = entry["axes"]
+        if limits is None:
+            limits = axes.get_xlim(), axes.get_ylim()
+        (left, right), (bottom, top) = limits
+        width, height = max(axes.bbox.width, 1.0), max(axes.bbox.height, 1.0)
+
+        if entry["kind"] == "branches":
+            entry["collection"].set_segments([np.column_stack(engine.thin_path(
+                x, y, abs(right - left)/width, abs(top - bottom)/height)) for x, y in entry["curves"]])
+            return
+
+        x, y = entry["x"], entry["y"]
+        if entry["kind"] == "path":
+            x, y = engine.thin_path(x, y, abs(right - left)/width, abs(top - bottom)/height)
+        else:
+            window = engine.visible_range(x, min(left, right), max(left, right))
+            x, y = engine.minmax_decimate(x[window], y[window], width,
+                                          log_x=axes.get_xscale() == "log")
+
+        if entry["kind"] == "stem":
+            entry["markers"].set_data(x, y)
+            gaps = np.full(len(x), np.nan)
+            x = np.column_stack((x, x, gaps)).ravel()
+            y = np.column_stack((np.zeros(len(y)), y, gaps)).ravel()
+        entry["line"].set_data(x, y)
+
+    @staticmethod
+    def data_limits(x, y):
+        """ (x, y) extents of the finite data, as used before the axes are rescaled """
+        finite = np.isfinite(x) & np.isfinite(y)
+        if not finite.any():
+            return (0.0, 1.0), (0.0, 1.0)
+        return (x[finite].min(), x[finite].max()), (y[finite].min(), y[finite].max())
+
+
+class PlotArea(tk.Frame, TracePlotter):
+    """ A matplotlib figure embedded in a page, with its navigation toolbar. Each
+        analysis redraws the same figure through the TracePlotter methods rather
+        than opening a window.
+    """
+    def __init__(self, parent, bg, figsize=(7, 4), blitting=False):
+        tk.Frame.__init__(self, parent, bg=bg)
+
+        # import matplotlib graphical libraries only once a plot is first needed
+        import matplotlib
+        matplotlib.use("TkAgg")
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+        figure = Figure(figsize=figsize, dpi=100)
+        canvas = FigureCanvasTkAgg(figure, master=self)
+        canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        toolbar = NavigationToolbar2Tk(canvas, self)
+        toolbar.update()
+        TracePlotter.__init__(self, figure, canvas, toolbar, blitting)
+
+
+class DiagnosticsPanel(tk.Toplevel):
+    """ Small window showing where analysis time is going: per-stage timings and
+        counters gathered by the engine's instrumentation, with controls to
+        capture a cProfile of each analysis and to export the records.
+    """
+    REFRESH_INTERVAL = 1000
+
+    COLUMNS = ("count", "total (ms)", "mean (ms)", "max (ms)", "last (ms)")
+
+    def __init__(self, parent):
+        tk.Toplevel.__init__(self, parent)
+        self.wm_title("Diagnostics")
+        self.instrument = engine.instrument
+
+        self.table = ttk.Treeview(self, columns=self.COLUMNS, height=12)
+        self.table.heading("#0", text="stage")
+        self.table.column("#0", width=160)
+        for column in self.COLUMNS:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=90, anchor="e")
+        self.table.pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.counters = tk.StringVar()
+        tk.Label(self, textvariable=self.counters, font=('arial', 10), justify="left").pack(padx=5, anchor="w")
+
+        controls = tk.Frame(self)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.profiling = tk.BooleanVar(value=self.instrument.profiling_enabled())
+        ttk.Checkbutton(controls, text="Capture cProfile", variable=self.profiling,
+                        command=lambda: self.instrument.set_profiling(self.profiling.get())).pack(side="left")
+        ttk.Button(controls, text="Reset", command=self.reset).pack(side="left", padx=2)
+        ttk.Button(controls, text="Export records", command=self.export).pack(side="left", padx=2)
+        ttk.Button(controls, text="Save profile", command=self.save_profile).pack(side="left", padx=2)
+
+        self.refresh()
+
+    def refresh(self):
+        """ Redraw the table from the latest stage statistics, then schedule the next refresh """
+        self.table.delete(*self.table.get_children())
+        for stats in self.instrument.summary():
+            self.table.insert("", "end", text=stats.name, values=(stats.count,
+                              "{0:.1f}".format(stats.total*1000), "{0:.2f}".format(stats.mean*1000),
+                              "{0:.2f}".format(stats.max*1000), "{0:.2f}".format(stats.last*1000)))
+        counters = self.instrument.counters()
+        self.counters.set("  ".join("{0}: {1}".format(name, value) for name, value in sorted(counters.items())))
+        self.after(self.REFRESH_INTERVAL, self.refresh)
+
+    def reset(self):
+        self.instrument.reset()
+
+    def export(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".jsonl",
+                                            filetypes=[("JSON lines", "*.jsonl"), ("CSV", "*.csv")])
+        if path:
+            self.instrument.export(path)
+
+    def save_profile(self):
+        from tkinter import filedialog, messagebox
+        if self.instrument.profile_stats() is None:
+            messagebox.showinfo("Diagnostics", "No profile captured yet - tick 'Capture cProfile' and run an analysis.",
+                                parent=self)
+            return
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".prof",
+                                            filetypes=[("Profile statistics", "*.prof")])
+        if path:
+            self.instrument.dump_profile(path)
+
+
+class TuningPanel(tk.Toplevel):
+    """ Window for tuning a compensator live. Every number in the compensator
+        expression gets a slider, and as a slider is dragged the open-loop Bode
+        plot, the stability margins and the closed-loop step response are
+        recomputed incrementally (see control_engine.tuning) and updated in
+        place. Slider events arriving while an update is pending are merged
+        into it, so the plots keep up with the latest position.
+    """
+    # slider positions either side of the starting value
+    SLIDER_STEPS = 400
+
+    # decades a slider spans either side of a non-zero starting value
+    SLIDER_DECADES = 2
+
+    def __init__(self, page, tuner):
+        tk.Toplevel.__init__(self, page)
+        self.wm_title("Live Compensator Tuning")
+        self.page = page
+        self.tuner = tuner
+        self.initial = dict(tuner.parameters)
+        self.pending = {}
+
+        controls = tk.Frame(self)
+        controls.pack(side="left", fill="y", padx=5, pady=5)
+        tk.Label(controls, text="F = {0}".format(tuner.template), font=('Helvetica', 12, 'bold')).pack(anchor="w")
+        self.readouts = {}
+        for name, value in self.initial.items():
+            readout = tk.StringVar()
+            tk.Label(controls, textvariable=readout, font=('arial', 10)).pack(anchor="w")
+            scale = tk.Scale(controls, from_=-self.SLIDER_STEPS, to=self.SLIDER_STEPS, orient="horizontal",
+                             showvalue=0, length=250, command=lambda position, name=name: self.moved(name, position))
+            scale.bind("<ButtonRelease-1>", self.settle)
+            scale.pack(anchor="w")
+            self.readouts[name] = readout
+        self.margins = tk.StringVar()
+        tk.Label(controls, textvariable=self.margins, font=('arial', 10), justify="left").pack(anchor="w", pady=10)
+        ttk.Button(controls, text="Apply to page", command=self.apply).pack(anchor="w")
+
+        self.plot_area = PlotArea(self, bg=self.cget("bg"), figsize=(7, 6), blitting=True)
+        self.plot_area.pack(side="right", fill="both", expand=True)
+        self.pending = dict(self.initial)
+        self.refresh()
+
+    def value(self, name, position):
+        """ Parameter value at a slider position: logarithmic about a non-zero
+            starting value, or linear over -1 to 1 about zero
+        """
+        start = self.initial[name]
+        fraction = float(position)/self.SLIDER_STEPS
+        if start == 0:
+            return fraction
+        return start*10.0**(self.SLIDER_DECADES*fraction)
+
+    def moved(self, name, position):
+        """ Record a slider's new value, scheduling an update unless one is pending """
+        if not self.pending:
+            self.after_idle(self.refresh)
+        self.pending[name] = self.value(name, position)
+
+    def refresh(self):
+        """ Apply the pending parameter values and update the plots """
+        values, self.pending = self.pending, {}
+        self.render(self.tuner.update(**values))
+
+    def settle(self, event=None):
+        """ Fit the axes to the traces once a slider is released """
+        for axes in self.plot_area.axes:
+            self.plot_area.rescale(axes)
+        self.plot_area.draw()
+
+    def render(self, result):
+        """ Show a tuning result, updating the existing traces in place. The axes
+            only grow to fit while dragging, so the plots can be blitted.
+        """
+        for name, value in result.parameters.items():
+            self.readouts[name].set("{0} = {1:.4g}".format(name, value))
+        margins = result.margins
+        stable = bool(np.all(np.abs(result.poles) < 1)) if self.tuner.dt else bool(np.all(result.poles.real < 0))
+        self.margins.set("Gain margin: {0:.2f} dB\nPhase margin: {1:.2f} degrees\n"
+                         "Gain crossover freq: {2:.4g} rad/s\nPhase crossover freq: {3:.4g} rad/s\n"
+                         "Closed loop: {4}".format(margins.gain_margin_db, margins.phase_margin,
+                                                   margins.wcg, margins.wcp,
+                                                   "stable" if stable else "unstable"))
+
+        gain_plot, phase_plot, step_plot = self.plot_area.layout("tuning", rows=3, xscale="log")
+        if step_plot.get_xscale() != "linear":
+            step_plot.set_xscale("linear")
+            gain_plot.grid(True, which='major', color='k', alpha=0.4)
+            phase_plot.grid(True, which='major', color='k', alpha=0.4)
+            step_plot.grid(True, color='k', alpha=0.4)
+            gain_plot.set_ylabel('Gain (dB)', weight="bold")
+            phase_plot.set_ylabel('Phase (deg)', weight="bold")
+            phase_plot.set_xlabel('Frequency (rad/s)')
+            step_plot.set_ylabel('Step response', weight="bold")
+            step_plot.set_xlabel('Time (s)')
+
+        mag, phase, omega = result.bode
+        self.plot_area.trace(gain_plot, "gain", omega, mag, '-', linewidth=1, color="b")
+        self.plot_area.trace(phase_plot, "phase", omega, phase, '-', linewidth=1, color="g")
+        time, response = result.step
+        self.plot_area.trace(step_plot, "step", time, response, '-', linewidth=1,
+                             kind="stem" if self.tuner.dt else "line")
+        for axes in (gain_plot, phase_plot, step_plot):
+            self.plot_area.rescale(axes, grow=True)
+        self.plot_area.blit()
+
+    def apply(self):
+        """ Write the tuned compensator back into the page's compensator entry """
+        self.page.tf_compensator.delete(0, "end")
+        self.page.tf_compensator.insert("end", engine.substitute_parameters(self.tuner.template,
+                                                                            self.tuner.parameters))
+
+
+class OptimiserPanel(tk.Toplevel):
+    """ Window searching for lead, lag or PID compensators for the page's plant
+        (see control_engine.optimise). The Pareto set of designs found is
+        tabulated; a design can be written into the page's compensator entry
+        or opened for live tuning.
+    """
+    # (heading, design field, format) of each column of the table of designs
+    COLUMNS = (("F", "expression", "{0}"),
+               ("PM (deg)", "phase_margin", "{0:.1f}"),
+               ("GM (dB)", "gain_margin_db", "{0:.1f}"),
+               ("bandwidth (rad/s)", "bandwidth", "{0:.3g}"),
+               ("overshoot (%)", "overshoot", "{0:.1f}"),
+               ("rise (s)", "rise_time", "{0:.3g}"),
+               ("settling (s)", "settling_time", "{0:.3g}"),
+               ("meets targets", "meets_targets", "{0}"))
+
+    # (DesignTargets field, label) of each target entry
+    TARGETS = (("phase_margin", "Min phase margin (deg)"), ("gain_margin_db", "Min gain margin (dB)"),
+               ("bandwidth", "Min bandwidth (rad/s)"), ("overshoot", "Max overshoot (%)"))
+
+    def __init__(self, page, digital=False):
+        tk.Toplevel.__init__(self, page)
+        self.wm_title("Compensator Optimiser")
+        self.page = page
+        self.digital = digital
+        self.result = None
+
+        controls = tk.Frame(self)
+        controls.pack(side="top", fill="x", padx=5, pady=5)
+        tk.Label(controls, text="Structure:").grid(row=0, column=0, sticky="e")
+        self.structure = ttk.Combobox(controls, values=engine.STRUCTURES, state="readonly", width=8)
+        self.structure.set("lead")
+        self.structure.grid(row=0, column=1, sticky="w")
+        self.targets = {}
+        for index, (field, label) in enumerate(self.TARGETS):
+            tk.Label(controls, text=label + ":").grid(row=1 + index//2, column=2*(index % 2), sticky="e")
+            entry = tk.Entry(controls, width=10)
+            default = getattr(engine.DEFAULT_TARGETS, field)
+            entry.insert("end", "" if default is None else "{0:g}".format(default))
+            entry.grid(row=1 + index//2, column=2*(index % 2) + 1, sticky="w")
+            self.targets[field] = entry
+        ttk.Button(controls, text="Optimise", command=self.run).grid(row=0, column=3, sticky="w")
+
+        columns = [heading for heading, _, _ in self.COLUMNS]
+        self.table = ttk.Treeview(self, columns=columns, show="headings", height=12)
+        for column in columns:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=260 if column == "F" else 90, anchor="e")
+        self.table.pack(fill="both", expand=True, padx=5, pady=5)
+
+        buttons = tk.Frame(self)
+        buttons.pack(side="bottom", fill="x", padx=5, pady=5)
+        ttk.Button(buttons, text="Apply to page", command=self.apply).pack(side="left")
+        ttk.Button(buttons, text="Tune live", command=self.tune).pack(side="left", padx=5)
+        self.summary = tk.StringVar()
+        tk.Label(buttons, textvariable=self.summary).pack(side="left", padx=10)
+
+    def run(self):
+        """ Search in the background for compensators meeting the entered
+            targets, or report a target that is not a number without searching
+        """
+        oltf = self.page.oltf.get()
+        sampling_time = self.page.sampling_time.get() if self.digital else None
+        structure = self.structure.get()
+        values = {}
+        for field, label in self.TARGETS:
+            text = self.targets[field].get().strip()
+            try:
+                values[field] = float(text) if text else None
+            except ValueError:
+                self.page.status.message.set("Error: {0} must be a number, not {1!r}".format(label, text))
+                return
+        targets = engine.DesignTargets(**values)
+
+        def analyse(task):
+            return engine.optimise_compensator(oltf, structure, targets, sampling_time)
+
+        self.page.status.run(analyse, self.show, "Optimising compensator")
+
+    def show(self, result):
+        """ Tabulate the designs of an optimisation result """
+        self.result = result
+        self.table.delete(*self.table.get_children())
+        for index, design in enumerate(result.designs):
+            self.table.insert("", "end", iid=str(index),
+                              values=[form.format(getattr(design, field)) for _, field, form in self.COLUMNS])
+        meeting = sum(design.meets_targets for design in result.designs)
+        self.summary.set("{0} designs ({1} meeting the targets) from {2} candidates".format(
+            len(result.designs), meeting, result.candidates))
+        self.lift()
+
+    def selected(self):
+        """ The design selected in the table, or None """
+        selection = self.table.selection()
+        if self.result is None or not selection:
+            return None
+        return self.result.designs[int(selection[0])]
+
+    def apply(self):
+        """ Write the selected design into the page's compensator entry """
+        design = self.selected()
+        if design is not None:
+            self.page.tf_compensator.delete(0, "end")
+            self.page.tf_compensator.insert("end", design.expression)
+
+    def tune(self):
+        """ Open the selected design for live tuning, against the plant already prepared """
+        design = self.selected()
+        if design is not None:
+            self.result.tuner.update(**design.parameters)
+            TuningPanel(self.page, self.result.tuner)
+
+
+class ComparisonTable(tk.Toplevel):
+    """ Window tabulating a comparison of sampling periods, one row per period """
+
+    def __init__(self, parent):
+        tk.Toplevel.__init__(self, parent)
+        self.wm_title("Sampling Period Comparison")
+        columns = [heading for heading, _, _ in engine.COMPARISON_COLUMNS]
+        self.table = ttk.Treeview(self, columns=columns, show="headings", height=8)
+        for column in columns:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=90, anchor="e")
+        self.table.pack(fill="both", expand=True, padx=5, pady=5)
+
+    def show(self, comparison):
+        self.table.delete(*self.table.get_children())
+        for row in engine.comparison_rows(comparison):
+            self.table.insert("", "end", values=row)
+
+
+class ResultsWindow(tk.Toplevel):
+    """ Window listing the analysis results saved to the results store, newest
+        first, any of which can be drawn again on its page without recomputation
+    """
+    COLUMNS = ("created", "page", "view", "arguments", "size (kB)")
+
+    def __init__(self, controller):
+        tk.Toplevel.__init__(self, controller)
+        self.wm_title("Results History")
+        self.controller = controller
+        self.store = engine.default_store()
+
+        self.table = ttk.Treeview(self, columns=self.COLUMNS, show="headings", height=12)
+        for column in self.COLUMNS:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=300 if column == "arguments" else 120,
+                              anchor="e" if column == "size (kB)" else "w")
+        self.table.pack(fill="both", expand=True, padx=5, pady=5)
+        self.table.bind("<Double-1>", lambda event: self.replay())
+
+        controls = tk.Frame(self)
+        controls.pack(fill="x", padx=5, pady=5)
+        ttk.Button(controls, text="Replay", command=self.replay).pack(side="left", padx=2)
+        ttk.Button(controls, text="Delete", command=self.delete).pack(side="left", padx=2)
+        ttk.Button(controls, text="Refresh", command=self.refresh).pack(side="left", padx=2)
+        self.refresh()
+
+    def refresh(self):
+        """ Redraw the list from the store's index """
+        self.table.delete(*self.table.get_children())
+        for record in reversed(self.store.runs()):
+            metadata = record["metadata"]
+            arguments = ", ".join("{0}={1}".format(name, value)
+                                  for name, value in metadata.get("arguments", {}).items())
+            self.table.insert("", "end", iid=record["id"], values=(
+                record["created"], metadata.get("page", ""), metadata.get("view", ""), arguments,
+                "{0:.1f}".format(record["bytes"]/1024)))
+
+    def replay(self):
+        """ Show the selected result's page and draw it from the stored arrays """
+        for run_id in self.table.selection()[:1]:
+            metadata = self.store.record(run_id)["metadata"]
+            pages = dict((page.__name__, page) for page in (ClassicControl, ModernControl, PolesZerosPlots))
+            page = pages[metadata["page"]]
+            self.controller.show_frame(page)
+            getattr(self.controller.frames[page], metadata["view"])(stored=self.store.load(run_id),
+                                                                      **metadata["arguments"])
+
+    def delete(self):
+        for run_id in self.table.selection():
+            self.store.delete(run_id)
+        self.refresh()
+
 
 class ControlSystemApp(tk.Tk):
     """ A tkinter based GUI application for mathematical and graphical analysis of control
@@ -58,23 +926,47 @@ class ControlSystemApp(tk.Tk):
         # set default style of buttons for the app
         ttk.Style().configure("TButton", padding=6, relief="flat", background="#ccc")
 
-        self.frames = {}
-
-        for F in (HomePage, ClassicControl, ModernControl, PolesZerosPlots):
-
-            frame = F(container, self)
+        # background workers shared by every page, so analyses never block the GUI
+        self.runner = AnalysisRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.close)
 
-            self.frames[F] = frame
+        # warm up the analysis engine in the background once the window is showing
+        self.after_idle(lambda: self.runner.submit(lambda task: engine.build_system("1/s"), lambda result: None))
 
-            frame.grid(row=0, column=0, sticky="nsew")
+        # pages are only built the first time they are shown, keeping start-up fast
+        self.container = container
+        self.frames = {}
 
+        self.diagnostics = None
+        self.results = None
         self.show_frame(HomePage)
 
     def show_frame(self, cont):
 
-        frame = self.frames[cont]
+        frame = self.frames.get(cont)
+        if frame is None:
+            frame = cont(self.container, self)
+            self.frames[cont] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
         frame.tkraise()
 
+    def show_diagnostics(self):
+        """ Open the diagnostics panel, or bring it to the front if already open """
+        if self.diagnostics is None or not self.diagnostics.winfo_exists():
+            self.diagnostics = DiagnosticsPanel(self)
+        self.diagnostics.lift()
+
+    def show_results(self):
+        """ Open the results history, or bring it to the front if already open """
+        if self.results is None or not self.results.winfo_exists():
+            self.results = ResultsWindow(self)
+        self.results.lift()
+
+    def close(self):
+        """ Stop any running analyses before closing the app window """
+        self.runner.shutdown()
+        self.destroy()
+
         
 class HomePage(tk.Frame):
     """ Main application welcome page with a selection of buttons linking to
@@ -100,11 +992,18 @@ class HomePage(tk.Frame):
                             command=lambda: controller.show_frame(ModernControl))
         modern_control_button.pack(padx=10, pady=10)
 
+        diagnostics_button = ttk.Button(self, text="Diagnostics", width=30,
+                            command=controller.show_diagnostics)
+        diagnostics_button.pack(padx=10, pady=10)
+
+        results_button = ttk.Button(self, text="Results History", width=30,
+                            command=controller.show_results)
+        results_button.pack(padx=10, pady=10)
+
         # create a canvas object and insert front page image
         self.canvas = tk.Canvas(self, width=300, height=300, bg="powder blue")
         self.canvas.pack()
-        self.img_file = Image.open("Control_Engineering_Icon.gif")
-        self.display_img = ImageTk.PhotoImage(self.img_file)
+        self.display_img = load_image("Control_Engineering_Icon.gif")
         self.canvas.create_image(150, 150, image=self.display_img)
 
         signature = tk.Label(self, text="Created by B.D. Fraser", font=('arial', 8), fg="steel blue", bg="powder blue")
@@ -168,6 +1067,20 @@ class ClassicControl(tk.Frame):
                             command= lambda: self.root_locus_plot(self.oltf.get(), self.tf_compensator.get()))
         self.root_locus.pack(pady=5, padx=10)
 
+        # button opening a window of sliders for tuning the compensator live
+        self.tuning_button = ttk.Button(self.data_area, text="Live Compensator Tuning", width=25,
+                            command= lambda: self.live_tuning(self.oltf.get(), self.tf_compensator.get()))
+        self.tuning_button.pack(pady=5, padx=10)
+
+        # button opening a window that searches for lead, lag or PID compensators
+        self.optimiser_button = ttk.Button(self.data_area, text="Optimise Compensator", width=25,
+                            command= lambda: OptimiserPanel(self))
+        self.optimiser_button.pack(pady=5, padx=10)
+
+        # progress and cancellation of the analysis running in the background
+        self.status = AnalysisStatus(self.data_area, controller.runner, bg="light goldenrod")
+        self.status.pack(pady=5)
+
         # return to home button
         self.home_button = ttk.Button(self.data_area, text="Return to Home", width=25,
                             command=lambda: controller.show_frame(HomePage))
@@ -179,8 +1092,7 @@ class ClassicControl(tk.Frame):
         # create a canvas object and insert front page image
         self.canvas = tk.Canvas(self.diagram_area, width=700, height=300, bg="light goldenrod")
         self.canvas.pack()
-        self.img_file = Image.open("transfer_function_system.gif")
-        self.display_img = ImageTk.PhotoImage(self.img_file)
+        self.display_img = load_image("transfer_function_system.gif")
         self.canvas.create_image(330, 150, image=self.display_img)
 
         # results area for displaying current gain and phase margin
@@ -193,124 +1105,172 @@ class ClassicControl(tk.Frame):
         self.margin_text.pack(pady=5)
         self.current_margins.set("Input a function to display gain and phase margins")
 
+        # embedded plot area, redrawn by each analysis
+        self.plot_area = PlotArea(self.diagram_area, bg="light goldenrod")
+        self.plot_area.pack(pady=5)
+
         # lower sig block
         self.signature = tk.Label(self, text="Created by B.D. Fraser", font=('arial', 8), fg="steel blue", bg="light goldenrod")
         self.signature.pack(side='bottom')
 
-    def output_margins(self, sys_tf):
-        """ Outputs the system stability margins based on the passed transfer
-            function argument. Analysed parameters include the gain margin (dB),
-            phase margin (deg), gain crossover freq (rad/s) and phase crossover
-            freq (rad/s)
+    def output_margins(self, margins):
+        """ Outputs the system stability margins computed by the analysis engine.
+            Analysed parameters include the gain margin (dB), phase margin (deg),
+            gain crossover freq (rad/s) and phase crossover freq (rad/s)
         """
-        # gather open-loop gain and phase margins, and crossover freqs
-        gain_m, pm, wg, wp = control.margin(sys_tf)
-
-        # convert gain margin to dB
-        gm = 20*math.log10(gain_m) if gain_m else 0
-
         # update gain and phase margin indication on GUI
         self.current_margins.set("Gain margin: {0} dB\nPhase margin: {1} degrees\n"
                                     "Gain crossover freq: {2} rad/s\n"
-                                    "Phase crossover freq: {3} rad/s".format(gm, pm, wg, wp))
+                                    "Phase crossover freq: {3} rad/s".format(margins.gain_margin_db,
+                                    margins.phase_margin, margins.wcg, margins.wcp))
         return
 
-    def plot_bode(self, oltf, tf_compensator, closed_loop=False):
+    def plot_bode(self, oltf, tf_compensator, closed_loop=False, stored=None):
         """ Plot either the open-loop or closed loop gain, dependent on closed_loop arg. 
             Gain and phase response are formed for each plot. The closed-loop transfer function
             used is based on the unity gain negative feedback model of the input system.
+            The analysis runs in the background, and is plotted on the page once complete.
         """
-        sys_tf = (eval(oltf)*(eval(tf_compensator)))
-
-        self.output_margins(sys_tf)
-
-        # if closed loop - determine cltf
-        if closed_loop:
-            sys_tf = control.feedback(sys_tf, 1)
-            plt.figure(2)
-        else:
-            plt.figure(1)
-
-        # obtain magnitude, phase and freq range using python control
-        mag, phase, omega = control.bode_plot(sys_tf, dB=True)
-
-        plt.figtext(0.3, 0.93, "Gain and Phase Response Bode Plots", size="large", weight="bold")
-
-        # plot magnitude gain response sub-plot
-        plt.subplot(2,1,1)
-        plt.semilogx(omega,mag,'k-',linewidth=1, color="b")
-        plt.grid(b=True, which='major', color='k', alpha=0.8)
-        plt.grid(b=True, which='minor', color='k', linestyle='--', alpha=0.4)
-        plt.ylabel('Gain magnitude (dB)', weight="bold")
-
-        # plot phase response sub-plot
-        plt.subplot(2,1,2)
-        plt.semilogx(omega,phase,'k-',linewidth=1, color="g")
-        plt.grid(b=True, which='major', color='k', alpha=0.8)
-        plt.grid(b=True, which='minor', color='k', linestyle='--', alpha=0.4)
-        plt.ylabel('Phase (degrees)', weight="bold")
-        plt.xlabel('Frequency (rad/s)', weight="bold")
-        plt.show()
+        def analyse(task):
+            sys_tf = engine.build_factored_system(oltf, tf_compensator)
+            task.progress(0.3, "Computing stability margins")
+            margins = engine.cached_analysis(engine.stability_margins, sys_tf)
+
+            # obtain magnitude, phase and freq range using the analysis engine
+            task.progress(0.6, "Computing frequency response")
+            return margins, engine.cached_analysis(engine.bode_response, sys_tf, closed_loop=closed_loop)
+
+        def render(result):
+            margins, (mag, phase, omega) = result
+            self.output_margins(margins)
+
+            gain_plot, phase_plot = self.plot_area.layout("bode", rows=2, xscale="log")
+            self.plot_area.heading("Gain and Phase Response Bode Plots", size="large", weight="bold")
+
+            # plot magnitude gain response sub-plot
+            self.plot_area.trace(gain_plot, "gain", omega, mag, '-', linewidth=1, color="b")
+            gain_plot.grid(True, which='major', color='k', alpha=0.8)
+            gain_plot.grid(True, which='minor', color='k', linestyle='--', alpha=0.4)
+            gain_plot.set_ylabel('Gain magnitude (dB)', weight="bold")
+            self.plot_area.rescale(gain_plot)
+
+            # plot phase response sub-plot
+            self.plot_area.trace(phase_plot, "phase", omega, phase, '-', linewidth=1, color="g")
+            phase_plot.grid(True, which='major', color='k', alpha=0.8)
+            phase_plot.grid(True, which='minor', color='k', linestyle='--', alpha=0.4)
+            phase_plot.set_ylabel('Phase (degrees)', weight="bold")
+            phase_plot.set_xlabel('Frequency (rad/s)', weight="bold")
+            self.plot_area.rescale(phase_plot)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, tf_compensator=tf_compensator, closed_loop=closed_loop),
+                        stored=stored)
         return
 
-    def plot_nyquist(self, oltf, tf_compensator):
+    def plot_nyquist(self, oltf, tf_compensator, stored=None):
         """ Form a Nyquist plot for the given transfer function. Includes phase angle
             lines for ease of reference.
         """
-        sys_tf = (eval(oltf)*(eval(tf_compensator)))
-        plt.figure(3)
-        control.nyquist_plot(sys_tf)
-        plt.axis([-2,2,-2,2])
-        theta = np.linspace(0,6.284,100)
-        plt.plot(np.cos(theta),np.sin(theta),'r-')
-        phi = np.linspace(0,360,37)/57.3
-    
-        for j in range(len(phi)):
-            plt.plot([0,np.sin(phi[j])],[0,np.cos(phi[j])],'g--')            
-        plt.grid(1)
-        plt.title('System Nyquist Plot')
-        plt.xlabel('Real')
-        plt.ylabel('Imaginary')
-        plt.show()
+        def analyse(task):
+            sys_tf = engine.build_factored_system(oltf, tf_compensator)
+            task.progress(0.5, "Computing frequency response")
+            return (engine.cached_analysis(engine.nyquist_response, sys_tf),
+                    engine.cached_analysis(engine.closed_loop_stability, sys_tf))
+
+        def render(result):
+            (real, imag, _), stability = result
+            nyquist, = self.plot_area.layout("nyquist")
+            self.plot_area.trace(nyquist, "positive", real, imag, 'b-', kind="path")
+            self.plot_area.trace(nyquist, "negative", real, -imag, 'b--', kind="path")
+            self.plot_area.trace(nyquist, "critical point", [-1], [0], 'r+', kind="path")
+            nyquist.axis([-2,2,-2,2])
+
+            # unit circle and phase angle lines every 10 degrees, drawn once as one overlay
+            theta = np.linspace(0, 2*np.pi, 100)
+            spokes = [np.array([[0, 0], [np.sin(phi), np.cos(phi)]]) for phi in np.radians(np.arange(0, 360, 10))]
+            self.plot_area.overlay(nyquist, "reference", [np.column_stack((np.cos(theta), np.sin(theta)))] + spokes,
+                                   colors=['r'] + ['g']*len(spokes), linestyles=['-'] + ['--']*len(spokes))
+            nyquist.grid(1)
+            nyquist.set_title('System Nyquist Plot\n' + stability_summary(stability))
+            nyquist.set_xlabel('Real')
+            nyquist.set_ylabel('Imaginary')
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, tf_compensator=tf_compensator), stored=stored)
         return
 
-    def time_domain_response(self, oltf, tf_compensator, ramp=False):
+    def time_domain_response(self, oltf, tf_compensator, ramp=False, stored=None):
         """ Plot the time-domain step response of the given transfer function.
             The closed-loop form of the transfer function must be used for this.
         """
-        sys_tf = (eval(oltf)*(eval(tf_compensator)))
-        closed_loop_tf = control.feedback(sys_tf, 1)
-
-        # if ramp selected, convert to ramp response, otherwise do step
-        if ramp:
-            title_txt = "Ramp"
-            plt.figure(5)
-            [time, _] = control.step_response(closed_loop_tf)
-            [x,y] = control.step_response((closed_loop_tf/s), time)
-            plt.plot([0.0, max(x)], [0.0, max(x)], 'r--', linewidth=1)
-        else:
-            [x,y] = control.step_response(closed_loop_tf)
-            plt.figure(4)
-            title_txt = "Step"
-        plt.plot(x,y, linewidth=1, alpha=1)
-        plt.title("Time-domain Unit {0} Response".format(title_txt))
-        plt.xlabel('Time (seconds)')
-        plt.ylabel('Response')
-        plt.grid(1)
-        plt.show()
+        def analyse(task):
+            sys_tf = engine.build_factored_system(oltf, tf_compensator)
+            task.progress(0.3, "Simulating closed-loop response")
+            time_response = engine.cached_analysis(engine.time_response, sys_tf, ramp=ramp)
+            task.progress(0.7, "Measuring performance")
+            return time_response, engine.cached_analysis(engine.performance_metrics, sys_tf)
+
+        def render(result):
+            [x,y], metrics = result
+            response, = self.plot_area.layout("time")
+            self.plot_area.note(response, "metrics", metrics_summary(metrics, ramp))
+
+            # if ramp selected, show ramp input for reference, otherwise do step
+            if ramp:
+                title_txt = "Ramp"
+                self.plot_area.trace(response, "ramp input", [0.0, max(x)], [0.0, max(x)], 'r--', linewidth=1)
+            else:
+                title_txt = "Step"
+            self.plot_area.trace(response, "response", x, y, '-', linewidth=1, color="C0")
+            response.set_title("Time-domain Unit {0} Response".format(title_txt))
+            response.set_xlabel('Time (seconds)')
+            response.set_ylabel('Response')
+            response.grid(1)
+            self.plot_area.rescale(response)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, tf_compensator=tf_compensator, ramp=ramp), stored=stored)
+        return
+
+    def live_tuning(self, oltf, tf_compensator):
+        """ Open a window with a slider for each number in the compensator. The
+            plant's response is prepared in the background, after which each
+            slider movement only recomputes the compensator's contribution.
+        """
+        def analyse(task):
+            template, values = engine.parameterise_expression(tf_compensator)
+            return engine.LoopTuner(oltf, template, values)
+
+        self.status.run(analyse, lambda tuner: TuningPanel(self, tuner), "Preparing live tuning")
         return
 
-    def root_locus_plot(self, oltf, tf_compensator):
+    def root_locus_plot(self, oltf, tf_compensator, stored=None):
         """ Plot the closed-loop root locus plot for the system based on the open
             loop transfer function poles and zeros.  
         """
-        sys_tf = eval(oltf)*eval(tf_compensator)
-        control.rlocus(sys_tf)
-        plt.grid()
-        plt.title('S-Domain Root Locus Plot')
-        plt.xlabel('Real')
-        plt.ylabel('Imaginary')
-        plt.show()
+        def analyse(task):
+            sys_tf = engine.build_factored_system(oltf, tf_compensator)
+            task.progress(0.3, "Tracing root locus")
+            return sys_tf.poles(), sys_tf.zeros(), engine.cached_analysis(engine.root_locus, sys_tf)
+
+        def render(result):
+            poles, zeros, (roots, _) = result
+            locus, = self.plot_area.layout("locus")
+            self.plot_area.branches(locus, "branches", [(branch.real, branch.imag) for branch in roots.T])
+            self.plot_area.trace(locus, "poles", poles.real, poles.imag, 'kx', kind="path")
+            self.plot_area.trace(locus, "zeros", zeros.real, zeros.imag, 'ko', kind="path", fillstyle='none')
+            locus.grid(1)
+            locus.set_title('S-Domain Root Locus Plot')
+            locus.set_xlabel('Real')
+            locus.set_ylabel('Imaginary')
+            self.plot_area.rescale(locus)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, tf_compensator=tf_compensator), stored=stored)
         return
 
 class ModernControl(tk.Frame):
@@ -346,6 +1306,12 @@ class ModernControl(tk.Frame):
         self.sampling_time.insert("end", "0.1")
         self.sampling_time.pack(pady=5, padx=10)
 
+        self.comparison_label = tk.Label(self.data_area, text="Sampling periods to compare (comma separated):", font=('arial', 12), bg="wheat")
+        self.comparison_label.pack()
+        self.comparison_times = tk.Entry(self.data_area, bd = 5, bg="cornsilk")
+        self.comparison_times.insert("end", "0.05, 0.1, 0.2, 0.5")
+        self.comparison_times.pack(pady=5, padx=10)
+
         # button and functionality for bode plot
         self.bode_button = ttk.Button(self.data_area, text="Plot Open-loop Bode", width=25,
                             command= lambda: self.plot_bode(self.oltf.get(), self.tf_compensator.get(), self.sampling_time.get()))
@@ -376,6 +1342,26 @@ class ModernControl(tk.Frame):
                             command= lambda: self.root_locus_plot(self.oltf.get(), self.tf_compensator.get(), self.sampling_time.get()))
         self.root_locus.pack(pady=5, padx=10)
 
+        # button opening a window of sliders for tuning the digital compensator live
+        self.tuning_button = ttk.Button(self.data_area, text="Live Compensator Tuning", width=25,
+                            command= lambda: self.live_tuning(self.oltf.get(), self.tf_compensator.get(), self.sampling_time.get()))
+        self.tuning_button.pack(pady=5, padx=10)
+
+        # button and command functionality for comparing several sampling periods
+        self.comparison_button = ttk.Button(self.data_area, text="Compare Sampling Periods", width=25,
+                            command= lambda: self.compare_sampling(self.oltf.get(), self.tf_compensator.get(), self.comparison_times.get()))
+        self.comparison_button.pack(pady=5, padx=10)
+        self.comparison_window = None
+
+        # button opening a window that searches for digital lead, lag or PID compensators
+        self.optimiser_button = ttk.Button(self.data_area, text="Optimise Compensator", width=25,
+                            command= lambda: OptimiserPanel(self, digital=True))
+        self.optimiser_button.pack(pady=5, padx=10)
+
+        # progress and cancellation of the analysis running in the background
+        self.status = AnalysisStatus(self.data_area, controller.runner, bg="wheat")
+        self.status.pack(pady=5)
+
         # return to home button
         self.home_button = ttk.Button(self.data_area, text="Return to Home", width=25,
                             command=lambda: controller.show_frame(HomePage))
@@ -387,8 +1373,7 @@ class ModernControl(tk.Frame):
         # create a canvas object and insert front page image
         self.canvas = tk.Canvas(self.diagram_area, width=700, height=300, bg="wheat")
         self.canvas.pack()
-        self.img_file = Image.open("digital_control_system.gif")
-        self.display_img = ImageTk.PhotoImage(self.img_file)
+        self.display_img = load_image("digital_control_system.gif")
         self.canvas.create_image(330, 150, image=self.display_img)
 
         # results area for displaying current gain and phase margin
@@ -401,155 +1386,248 @@ class ModernControl(tk.Frame):
         self.margin_text.pack(pady=5)
         self.current_margins.set("Input a function to display gain and phase margins")
 
+        # embedded plot area, redrawn by each analysis
+        self.plot_area = PlotArea(self.diagram_area, bg="wheat")
+        self.plot_area.pack(pady=5)
+
         # lower sig block
         self.signature = tk.Label(self, text="Created by B.D. Fraser", font=('arial', 8), fg="steel blue", bg="wheat")
         self.signature.pack(side='bottom')
 
-    def output_margins(self, sys_tf):
-        """ Outputs the system stability margins based on the passed transfer
-            function argument. Analysed parameters include the gain margin (dB),
-            phase margin (deg), gain crossover freq (rad/s) and phase crossover
-            freq (rad/s)
+    def output_margins(self, margins):
+        """ Outputs the system stability margins computed by the analysis engine.
+            Analysed parameters include the gain margin (dB), phase margin (deg),
+            gain crossover freq (rad/s) and phase crossover freq (rad/s)
         """
-        # gather open-loop gain and phase margins, and crossover freqs
-        gain_m, pm, wg, wp = control.margin(sys_tf)
-
-        # convert gain margin to dB
-        gm = 20*math.log10(gain_m) if gain_m else 0
-
         # update gain and phase margin indication on GUI
         self.current_margins.set("Gain margin: {0} dB\nPhase margin: {1} degrees\n"
                                     "Gain crossover freq: {2} rad/s\n"
-                                    "Phase crossover freq: {3} rad/s".format(gm, pm, wg, wp))
+                                    "Phase crossover freq: {3} rad/s".format(margins.gain_margin_db,
+                                    margins.phase_margin, margins.wcg, margins.wcp))
         return
 
-    def plot_bode(self, oltf, dig_compensator, sampling_time, closed_loop=False):
+    def plot_bode(self, oltf, dig_compensator, sampling_time, closed_loop=False, stored=None):
         """ Plot either the open-loop or closed loop gain, dependent on closed_loop arg. 
             The discrete-time digital compensator model and sampling time are also required
-            to make the associated calculations.
+            to make the associated calculations. The analysis runs in the background, and is
+            plotted on the page once complete.
         """
-        sys_tf = eval(oltf)
-
-        # basic definition for z-domain 'z' operator for digital freq analysis
-        z = control.tf([1,0],1,float(sampling_time))
-
-        discrete_sys_tf = control.sample_system(sys_tf, float(sampling_time), method='zoh')*eval(dig_compensator)
-
-        self.output_margins(sys_tf)
-
-        # if closed loop - determine cltf and set plot accordingly - else open loop
-        if closed_loop:
-            tf_cl = control.tf(discrete_sys_tf)
-            discrete_sys_tf = control.feedback(tf_cl, 1)
-            plt.figure(2)
-            plot_type = "Closed-Loop"
-        else:
-            plt.figure(1)
-            plot_type = "Open-Loop"
-
-        freq_vector=np.linspace(0, np.pi/float(sampling_time), 500)
-        control.bode_plot(discrete_sys_tf, omega=freq_vector, dB=True)
-        plt.figtext(0.3, 0.93, "Discrete-time {0} Bode Plot".format(plot_type), size="large", weight="bold")
-        plt.show()
+        def analyse(task):
+            sys_tf = engine.build_factored_system(oltf)
+            task.progress(0.2, "Computing stability margins")
+            margins = engine.cached_analysis(engine.stability_margins, sys_tf)
+            task.progress(0.4, "Discretising plant")
+            discrete_sys_tf = engine.build_discrete_system(oltf, dig_compensator, sampling_time)
+            task.progress(0.6, "Computing frequency response")
+            return margins, engine.cached_analysis(engine.discrete_bode_response, discrete_sys_tf,
+                                                   sampling_time=float(sampling_time), closed_loop=closed_loop)
+
+        def render(result):
+            margins, (mag, phase, omega) = result
+            self.output_margins(margins)
+
+            # set plot title according to closed loop or open loop
+            plot_type = "Closed-Loop" if closed_loop else "Open-Loop"
+
+            gain_plot, phase_plot = self.plot_area.layout("bode", rows=2)
+            self.plot_area.trace(gain_plot, "gain", omega, mag, 'b-', linewidth=1)
+            gain_plot.set_ylabel('Gain magnitude (dB)', weight="bold")
+            self.plot_area.rescale(gain_plot)
+            self.plot_area.trace(phase_plot, "phase", omega, phase, 'g-', linewidth=1)
+            phase_plot.set_ylabel('Phase (degrees)', weight="bold")
+            phase_plot.set_xlabel('Frequency (rad/s)', weight="bold")
+            self.plot_area.rescale(phase_plot)
+            self.plot_area.heading("Discrete-time {0} Bode Plot".format(plot_type), size="large", weight="bold")
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, dig_compensator=dig_compensator,
+                                    sampling_time=sampling_time, closed_loop=closed_loop), stored=stored)
         return
 
-    def plot_nyquist(self, oltf, dig_compensator, sampling_time):
+    def plot_nyquist(self, oltf, dig_compensator, sampling_time, stored=None):
         """ Form a Nyquist plot for the given discrete-time transfer function. Includes a plot of the
             unit circle to help aid stability assessment.
         """
-        sys_tf = eval(oltf)
-        z = control.tf([1,0],1,float(sampling_time))
-        discrete_sys_tf = control.sample_system(sys_tf, float(sampling_time), method='zoh')*eval(dig_compensator)
-
-        plt.figure(3)
-        control.nyquist_plot(discrete_sys_tf)
-        plt.axis([-2,2,-2,2])
-        plt.grid(1)
-        plt.title('Digital System Nyquist Plot')
-        plt.xlabel('Real')
-        plt.ylabel('Imaginary')
-
-        # plot the unit circle for reference
-        theta = np.linspace(0, np.pi*2, 100)
-        plt.plot(np.cos(theta),np.sin(theta),'g--') 
-
-        plt.show()
+        def analyse(task):
+            discrete_sys_tf = engine.build_discrete_system(oltf, dig_compensator, sampling_time)
+            task.progress(0.5, "Computing frequency response")
+            return (engine.cached_analysis(engine.nyquist_response, discrete_sys_tf),
+                    engine.cached_analysis(engine.closed_loop_stability, discrete_sys_tf))
+
+        def render(result):
+            (real, imag, _), stability = result
+            nyquist, = self.plot_area.layout("nyquist")
+            self.plot_area.trace(nyquist, "positive", real, imag, 'b-', kind="path")
+            self.plot_area.trace(nyquist, "negative", real, -imag, 'b--', kind="path")
+            self.plot_area.trace(nyquist, "critical point", [-1], [0], 'r+', kind="path")
+            nyquist.axis([-2,2,-2,2])
+            nyquist.grid(1)
+            nyquist.set_title('Digital System Nyquist Plot\n' + stability_summary(stability))
+            nyquist.set_xlabel('Real')
+            nyquist.set_ylabel('Imaginary')
+
+            # plot the unit circle for reference
+            theta = np.linspace(0, np.pi*2, 100)
+            self.plot_area.overlay(nyquist, "unit circle", [np.column_stack((np.cos(theta), np.sin(theta)))],
+                                   colors='g', linestyles='--')
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, dig_compensator=dig_compensator,
+                                    sampling_time=sampling_time), stored=stored)
         return
 
-    def time_domain_response(self, oltf, dig_compensator, sampling_time, ramp=False):
+    def time_domain_response(self, oltf, dig_compensator, sampling_time, ramp=False, stored=None):
         """ Plot the discrete time-domain step response of the given transfer function.
             The closed-loop form of the transfer function must be used for this, and the 
             z-domain digital compensator model and sampling time are used in making the 
             required calculations.
         """
-        sys_tf = eval(oltf)
-
-        # basic definition for z-domain 'z' operator for digital freq analysis
-        z = control.tf([1,0],1,float(sampling_time))
+        def analyse(task):
+            discrete_sys_tf = engine.build_discrete_system(oltf, dig_compensator, sampling_time)
+            task.progress(0.4, "Simulating closed-loop response")
+            time_response = engine.cached_analysis(engine.discrete_time_response, discrete_sys_tf,
+                                                   sampling_time=float(sampling_time), ramp=ramp)
+            task.progress(0.7, "Measuring performance")
+            return time_response, engine.cached_analysis(engine.performance_metrics, discrete_sys_tf)
+
+        def render(result):
+            [x,y], metrics = result
+
+            # if ramp selected, plot as ramp response, otherwise do step
+            title_txt = "Ramp" if ramp else "Step"
+            response, = self.plot_area.layout("time")
+            self.plot_area.note(response, "metrics", metrics_summary(metrics, ramp))
+            self.plot_area.trace(response, "response", np.arange(len(y)), y, kind="stem", color="C0")
+            response.set_title("Discrete Time Response to {0} input".format(title_txt))
+            response.set_xlabel("Sample number (sample period of {0}s)".format(sampling_time))
+            response.set_ylabel('Response')
+            response.grid(1)
+            self.plot_area.rescale(response)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, dig_compensator=dig_compensator,
+                                    sampling_time=sampling_time, ramp=ramp), stored=stored)
+        return
 
-        discrete_sys_tf = control.sample_system(sys_tf, float(sampling_time), method='zoh')*eval(dig_compensator)
-        closed_loop_tf = control.feedback(discrete_sys_tf, 1)
+    def compare_sampling(self, oltf, dig_compensator, sampling_times, stored=None):
+        """ Compare the digital design at each of a comma separated list of sampling
+            periods: the margins, closed-loop pole radius and step metrics are
+            tabulated in a separate window, and the Bode and step responses overlaid.
+        """
+        def analyse(task):
+            periods = [float(period) for period in sampling_times.split(",") if period.strip()]
+            return engine.compare_sampling_times(oltf, dig_compensator, periods)
+
+        def render(comparison):
+            if self.comparison_window is None or not self.comparison_window.winfo_exists():
+                self.comparison_window = ComparisonTable(self)
+            self.comparison_window.show(comparison)
+            self.comparison_window.lift()
+
+            gain_plot, phase_plot, step_plot = self.plot_area.layout("sampling comparison", rows=3, xscale="log")
+            if step_plot.get_xscale() != "linear":
+                step_plot.set_xscale("linear")
+            self.plot_area.heading("Comparison of Sampling Periods", size="large", weight="bold")
+            lines = []
+            for index, (period, bode, step) in enumerate(zip(comparison.sampling_times, comparison.bode,
+                                                             comparison.step)):
+                colour = "C{0}".format(index % 10)
+                self.plot_area.trace(gain_plot, ("gain", index), bode.omega, bode.mag_db, color=colour, linewidth=1)
+                self.plot_area.trace(phase_plot, ("phase", index), bode.omega, bode.phase_deg, color=colour,
+                                     linewidth=1)
+                lines.append(self.plot_area.trace(step_plot, ("step", index), step.time, step.response,
+                                                  color=colour, linewidth=1, drawstyle="steps-post"))
+            step_plot.legend(lines, ["Ts = {0:g} s".format(period) for period in comparison.sampling_times],
+                             fontsize="small")
+
+            gain_plot.grid(True, which='major', color='k', alpha=0.4)
+            gain_plot.set_ylabel('Gain (dB)', weight="bold")
+            phase_plot.grid(True, which='major', color='k', alpha=0.4)
+            phase_plot.set_ylabel('Phase (deg)', weight="bold")
+            phase_plot.set_xlabel('Frequency (rad/s)')
+            step_plot.grid(True, color='k', alpha=0.4)
+            step_plot.set_ylabel('Step response', weight="bold")
+            step_plot.set_xlabel('Time (s)')
+            for axes in (gain_plot, phase_plot, step_plot):
+                self.plot_area.rescale(axes)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Comparing sampling periods",
+                        record=dict(oltf=oltf, dig_compensator=dig_compensator,
+                                    sampling_times=sampling_times), stored=stored)
+        return
 
-        # if ramp selected, convert to ramp response, otherwise do step
-        if ramp:
-            title_txt = "Ramp"
-            plt.figure(5)
-            [time, _] = control.step_response(closed_loop_tf)
+    def live_tuning(self, oltf, dig_compensator, sampling_time):
+        """ Open a window with a slider for each number in the digital compensator,
+            against the plant discretised at the given sampling time.
+        """
+        def analyse(task):
+            template, values = engine.parameterise_expression(dig_compensator)
+            return engine.LoopTuner(oltf, template, values, sampling_time)
 
-            # determine output of cltf to ramp input (in terms of z)
-            ramp_output = closed_loop_tf*((float(sampling_time)*z))/((z-1)*(z-1))
-            [x,y] = control.step_response(ramp_output, time)
-            print(closed_loop_tf)
-            #plt.plot([0.0, max(x)], [0.0, max(x)], 'r--')
-        else:
-            [x,y] = control.step_response(closed_loop_tf)
-            fig = plt.figure(4)
-            title_txt = "Step"
-        plt.stem(y)
-        plt.title("Discrete Time Response to {0} input".format(title_txt))
-        plt.xlabel("Sample number (sample period of {0}s)".format(sampling_time))
-        plt.ylabel('Response')
-        plt.grid(1)
-        plt.show()
+        self.status.run(analyse, lambda tuner: TuningPanel(self, tuner), "Preparing live tuning")
         return
 
-    def root_locus_plot(self, oltf, dig_compensator, sampling_time):
+    def root_locus_plot(self, oltf, dig_compensator, sampling_time, stored=None):
         """ Plot the closed-loop root locus plot for the discrete-time system based on the open
             loop transfer function poles and zeros.  
         """
-        sys_tf = eval(oltf)
-        z = control.tf([1,0],1,float(sampling_time))
-        discrete_sys_tf = control.sample_system(sys_tf, float(sampling_time), method='zoh')*eval(dig_compensator)
-
-        control.rlocus(discrete_sys_tf)
-        theta=np.linspace(0, 2*np.pi, 100)
-        plt.plot(np.cos(theta),np.sin(theta),'m--')
-        damping=0.7
-        rtz=np.sqrt(1-damping**2)
-        plt.plot(np.real(np.exp(-theta*damping+1.0j*theta*rtz)),np.imag(np.exp(-theta*damping+1.0j*theta*rtz)),'g--')
-        plt.plot(np.real(np.exp(-theta*damping-1.0j*theta*rtz)),np.imag(np.exp(-theta*damping-1.0j*theta*rtz)),'g--')
-        plt.grid(1)
-        plt.title('Z-Domain Root-Locus Plot')
-        plt.xlabel('Real')
-        plt.ylabel('Imaginary')
-        plt.show()
+        def analyse(task):
+            discrete_sys_tf = engine.build_discrete_system(oltf, dig_compensator, sampling_time)
+            task.progress(0.3, "Tracing root locus")
+            return discrete_sys_tf.poles(), discrete_sys_tf.zeros(), engine.cached_analysis(engine.root_locus, discrete_sys_tf)
+
+        def render(result):
+            poles, zeros, (roots, _) = result
+            locus, = self.plot_area.layout("locus")
+            self.plot_area.branches(locus, "branches", [(branch.real, branch.imag) for branch in roots.T])
+            self.plot_area.trace(locus, "poles", poles.real, poles.imag, 'kx', kind="path")
+            self.plot_area.trace(locus, "zeros", zeros.real, zeros.imag, 'ko', kind="path", fillstyle='none')
+
+            # unit circle and 0.7 damping ratio contours, drawn once as one overlay
+            theta=np.linspace(0, 2*np.pi, 100)
+            damping=0.7
+            rtz=np.sqrt(1-damping**2)
+            upper = np.exp(-theta*damping+1.0j*theta*rtz)
+            lower = np.exp(-theta*damping-1.0j*theta*rtz)
+            self.plot_area.overlay(locus, "reference", [np.column_stack((np.cos(theta), np.sin(theta))),
+                                                        np.column_stack((upper.real, upper.imag)),
+                                                        np.column_stack((lower.real, lower.imag))],
+                                   scaled=True, colors=['m', 'g', 'g'], linestyles='--')
+            locus.grid(1)
+            locus.set_title('Z-Domain Root-Locus Plot')
+            locus.set_xlabel('Real')
+            locus.set_ylabel('Imaginary')
+            self.plot_area.rescale(locus)
+            self.plot_area.draw()
+
+        self.status.run(analyse, render, "Building system",
+                        record=dict(oltf=oltf, dig_compensator=dig_compensator,
+                                    sampling_time=sampling_time), stored=stored)
         return
 
 class PolesZerosPlots(tk.Frame):
-    """ A basic page to plot gain and phase bode plots from a set of system poles, zeros and gain """
+    """ A basic page to plot gain and phase bode plots from a set of system poles, zeros and gain,
+        typed in or loaded in bulk from a file, with the responses exportable to a binary file """
+
+    # most systems loaded from a file that are drawn; all are evaluated and exported
+    MAX_PLOTTED_SYSTEMS = 50
 
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         label = tk.Label(self, text="Open-Loop Bode plot (with poles, zeroes and gain data)", font=('Helvetica', 30, 'bold'))
         label.pack(pady=10,padx=10)
 
-        poles_label = tk.Label(self, text="Transfer function poles (seperate each by comma (,)):", font=('Helvetica', 15, 'bold'))
+        poles_label = tk.Label(self, text="Transfer function poles (separate each by comma (,), e.g. -1, -2+3j, -0.5±2j):", font=('Helvetica', 15, 'bold'))
         poles_label.pack()
         tf_poles = tk.Entry(self, bd = 5)
         tf_poles.insert("end", "")
         tf_poles.pack(pady=10)
 
-        zeros_label = tk.Label(self, text="Transfer function zeros (seperate each by comma (,):", font=('Helvetica', 15, 'bold'))
+        zeros_label = tk.Label(self, text="Transfer function zeros (separate each by comma (,)):", font=('Helvetica', 15, 'bold'))
         zeros_label.pack()
         tf_zeros = tk.Entry(self, bd = 5)
         tf_zeros.insert("end", "")
@@ -565,54 +1643,118 @@ class PolesZerosPlots(tk.Frame):
                             command= lambda: self.plot_bode(tf_poles.get(), tf_zeros.get(), tf_gain.get()))
         plot_button.pack()
 
+        # buttons for plotting many systems from a CSV, .npy or .npz file, and exporting the responses
+        load_button = ttk.Button(self, text="Load systems from file", command=lambda: self.load_systems())
+        load_button.pack()
+        export_button = ttk.Button(self, text="Export responses", command=self.export_responses)
+        export_button.pack()
+        self.responses = None
+
         home_button = ttk.Button(self, text="Return to Home",
                             command=lambda: controller.show_frame(HomePage))
         home_button.pack()
 
-    def plot_bode(self, poles, zeros, gain):
-        """ takes in given system poles, zeros and gain, and then parses and converts into
-            a scipy transfer function. The data gain and phase response data is then plotted """ 
+        # progress of the background analysis, and the embedded plot it is drawn into
+        self.status = AnalysisStatus(self, controller.runner, bg=self.cget("bg"))
+        self.status.pack(pady=5)
+        self.plot_area = PlotArea(self, bg=self.cget("bg"))
+        self.plot_area.pack(pady=5)
 
-        pole_strings, zero_strings = poles.split(","), zeros.split(",")
+    def plot_bode(self, poles, zeros, gain, stored=None):
+        """ takes in given system poles, zeros and gain, and then parses them and evaluates
+            the gain and phase response from the factored form. The response data is then
+            plotted once the background analysis completes """ 
 
-        if not poles:
-            formatted_poles = []
-        else:
-            formatted_poles = list(map(float, pole_strings))
-
-        if not zeros:
-            formatted_zeros = []
-        else:
-            formatted_zeros = list(map(float, zero_strings))
+        formatted_poles = engine.parse_roots(poles)
+        formatted_zeros = engine.parse_roots(zeros)
         formatted_gain = float(gain)
 
-        print("The poles, zeros and gain are: {0}, {1}, {2}".format(formatted_zeros, formatted_poles, formatted_gain))
+        print("The poles, zeros and gain are: {0}, {1}, {2}".format(formatted_poles.tolist(),
+                                                                    formatted_zeros.tolist(), formatted_gain))
 
-        zerosPolesGain = signal.ZerosPolesGain(formatted_zeros, formatted_poles, formatted_gain)
-        sys_tf = signal.TransferFunction(zerosPolesGain)
-        plt.figure(6)
+        def analyse(task):
+            return engine.poles_zeros_bode(formatted_poles, formatted_zeros, formatted_gain)
 
-        print("The transfer function is: {0}".format(sys_tf))
-        
-        w,mag,phase = signal.bode(sys_tf)
-        plt.figtext(0.3, 0.93, "Open-loop system response", size="large", weight="bold")
+        def render(result):
+            w,mag,phase = result
+            self.responses = (engine.BatchResponse(np.atleast_2d(mag), np.atleast_2d(phase), w), None)
+            self.draw_responses(w, [mag], [phase], "Open-loop system response")
+
+        self.status.run(analyse, render, "Computing frequency response",
+                        record=dict(poles=poles, zeros=zeros, gain=gain), stored=stored)
+        return
+
+    def load_systems(self, path=None, stored=None):
+        """ Evaluate the responses of every system in a file (chosen by the user
+            unless given) in one vectorised pass, and plot the first MAX_PLOTTED_SYSTEMS
+        """
+        if path is None:
+            from tkinter import filedialog
+            path = filedialog.askopenfilename(parent=self, filetypes=[("Pole/zero sets", "*.csv *.npy *.npz"),
+                                                                      ("All files", "*")])
+        if not path:
+            return
+
+        def analyse(task):
+            systems = engine.load_zpk_set(path)
+            task.progress(0.2, "Evaluating {0} systems".format(len(systems.gains)))
+            return systems, engine.zpk_set_response(systems)
+
+        def render(result):
+            systems, response = result
+            self.responses = (response, systems.names)
+            count = len(systems.gains)
+            shown = min(count, self.MAX_PLOTTED_SYSTEMS)
+            title = "Open-loop responses of {0} systems".format(count)
+            if shown < count:
+                title += " (first {0} shown)".format(shown)
+            self.draw_responses(response.omega, response.mag_db[:shown], response.phase_deg[:shown], title)
+
+        self.status.run(analyse, render, "Loading systems", record=dict(path=path), stored=stored)
+
+    def draw_responses(self, w, mags, phases, title):
+        """ Plot one or more gain and phase responses on a shared frequency grid """
+        gain_plot, phase_plot = self.plot_area.layout("bode", rows=2, xscale="log")
+        self.plot_area.heading(title, size="large", weight="bold")
+        single = len(mags) == 1
 
         # plot magnitude gain response sub-plot
-        plt.subplot(2,1,1)
-        plt.semilogx(w,mag,'k-',linewidth=2, color="r")
-        plt.grid(b=True, which='major', color='k', linestyle='-', alpha=0.4)
-        plt.grid(b=True, which='minor', color='k', linestyle='--', alpha=0.6)
-        plt.ylabel('Gain magnitude (dB)', weight="bold")
+        for index, mag in enumerate(mags):
+            self.plot_area.trace(gain_plot, "gain" if single else ("gain", index), w, mag, '-',
+                                 linewidth=2 if single else 1, color="r" if single else "C{0}".format(index % 10))
+        gain_plot.grid(True, which='major', color='k', linestyle='-', alpha=0.4)
+        gain_plot.grid(True, which='minor', color='k', linestyle='--', alpha=0.6)
+        gain_plot.set_ylabel('Gain magnitude (dB)', weight="bold")
+        self.plot_area.rescale(gain_plot)
 
         # plot phase response sub-plot
-        plt.subplot(2,1,2)
-        plt.semilogx(w,phase,'k-',linewidth=2, color="g")
-        plt.grid(b=True, which='major', color='k', linestyle='-', alpha=0.4)
-        plt.grid(b=True, which='minor', color='k', linestyle='--', alpha=0.6)
-        plt.ylabel('Phase (degrees)', weight="bold")
-        plt.xlabel('Frequency (rad/s)', weight="bold")
-        plt.show()
-        return
-
-app = ControlSystemApp()
-app.mainloop()
\ No newline at end of file
+        for index, phase in enumerate(phases):
+            self.plot_area.trace(phase_plot, "phase" if single else ("phase", index), w, phase, '-',
+                                 linewidth=2 if single else 1, color="g" if single else "C{0}".format(index % 10))
+        phase_plot.grid(True, which='major', color='k', linestyle='-', alpha=0.4)
+        phase_plot.grid(True, which='minor', color='k', linestyle='--', alpha=0.6)
+        phase_plot.set_ylabel('Phase (degrees)', weight="bold")
+        phase_plot.set_xlabel('Frequency (rad/s)', weight="bold")
+        self.plot_area.rescale(phase_plot)
+        self.plot_area.draw()
+
+    def export_responses(self):
+        """ Save the gain and phase arrays of the last plot (every system, for a
+            loaded file) to a compact .npz file
+        """
+        from tkinter import filedialog, messagebox
+        if self.responses is None:
+            messagebox.showinfo("Export responses", "Plot a system or load a file of systems first.", parent=self)
+            return
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".npz",
+                                            filetypes=[("NumPy arrays", "*.npz")])
+        if not path:
+            return
+        response, names = self.responses
+        self.status.run(lambda task: engine.export_response(path, response, names),
+                        lambda path: self.status.message.set("Responses saved to {0}".format(path)),
+                        "Exporting responses")
+
+if __name__ == "__main__":
+    app = ControlSystemApp()
+    app.mainloop()
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+    Shared set-up for the control_engine tests: the package is imported from
+    the repository, and the on-disk result cache and results store are kept in
+    a temporary directory so test runs never read or pollute the user's own.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="control_engine_tests-")
+os.environ["CONTROL_ENGINE_CACHE"] = os.path.join(_scratch, "cache")
+os.environ["CONTROL_ENGINE_RESULTS"] = os.path.join(_scratch, "results")
@@ -0,0 +1,88 @@
+"""
+    The headless analyses behind the app's pages, checked against
+    python-control.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANTS = ["1/(s*(s+1))", "10/((s+1)*(s+2)*(s+3))", "(s+2)/(s**2+0.4*s+4)"]
+
+
+def reference(plant, compensator="1"):
+    s = control.tf("s")
+    return eval(plant, {"s": s})*eval(compensator, {"s": s})
+
+
+def assert_phase_close(actual, expected, atol=1e-6):
+    """ Phases (deg) equal up to whole turns """
+    np.testing.assert_allclose(np.remainder(actual - expected + 180.0, 360.0) - 180.0, 0.0, atol=atol)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_build_system_matches_python_control(plant):
+    sys_tf = engine.build_system(plant, "(s+2)/(s+5)")
+    expected = reference(plant, "(s+2)/(s+5)")
+    np.testing.assert_allclose(np.sort_complex(sys_tf.poles()), np.sort_complex(expected.poles()), atol=1e-9)
+    omega = np.geomspace(0.01, 100, 30)
+    np.testing.assert_allclose(sys_tf(1j*omega), expected(1j*omega), rtol=1e-9)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+@pytest.mark.parametrize("build", ["build_system", "build_factored_system"])
+def test_stability_margins_match_margin(plant, build):
+    margins = engine.stability_margins(getattr(engine, build)(plant))
+    expected = control.margin(reference(plant))
+    np.testing.assert_allclose((margins.gain_margin, margins.phase_margin, margins.wcg, margins.wcp),
+                               expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+@pytest.mark.parametrize("closed_loop", [False, True])
+def test_bode_response_matches_frequency_response(plant, closed_loop):
+    mag_db, phase_deg, omega = engine.bode_response(engine.build_factored_system(plant), closed_loop=closed_loop)
+    expected = reference(plant)
+    if closed_loop:
+        expected = control.feedback(expected, 1)
+    response = expected(1j*omega)
+    np.testing.assert_allclose(mag_db, 20*np.log10(np.abs(response)), atol=1e-8)
+    assert_phase_close(phase_deg, np.degrees(np.angle(response)))
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_nyquist_response_matches_frequency_response(plant):
+    real, imag, omega = engine.nyquist_response(engine.build_factored_system(plant))
+    np.testing.assert_allclose(real + 1j*imag, reference(plant)(1j*omega), rtol=1e-9)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_step_response_matches_step_response(plant):
+    time, response = engine.time_response(engine.build_factored_system(plant))
+    _, expected = control.step_response(control.feedback(reference(plant), 1), time)
+    np.testing.assert_allclose(response, expected, atol=1e-6)
+
+
+def test_ramp_response_matches_forced_response():
+    time, response = engine.time_response(engine.build_factored_system("4/(s*(s+2))"), ramp=True)
+    _, expected = control.forced_response(control.feedback(reference("4/(s*(s+2))"), 1), time, time)
+    np.testing.assert_allclose(response, expected, atol=1e-6)
+
+
+def test_root_locus_branches_are_closed_loop_poles():
+    """ At every gain the branches are the roots of den + K*num """
+    sys_tf = engine.build_system("(s+2)/(s*(s+1)*(s+5))")
+    num, den = engine.tf_coefficients(sys_tf)
+    roots, gains = engine.root_locus(sys_tf)
+    for gain, row in list(zip(gains, roots))[::10]:
+        expected = np.roots(np.polyadd(den, gain*num))
+        np.testing.assert_allclose(np.sort_complex(row), np.sort_complex(expected), rtol=1e-6, atol=1e-8)
+
+
+def test_poles_zeros_bode_matches_zpk():
+    omega, mag_db, phase_deg = engine.poles_zeros_bode(np.array([-1.0, -2+3j, -2-3j]), np.array([-5.0]), 4.0)
+    expected = control.zpk([-5.0], [-1.0, -2+3j, -2-3j], 4.0)(1j*omega)
+    np.testing.assert_allclose(mag_db, 20*np.log10(np.abs(expected)), atol=1e-9)
+    assert_phase_close(phase_deg, np.degrees(np.angle(expected)))
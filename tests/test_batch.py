@@ -0,0 +1,64 @@
+"""
+    Batch runs over files of jobs.
+"""
+
+import io
+import json
+
+import pytest
+
+import control_engine as engine
+
+
+def write_lines(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def run(path, processes=1):
+    output = io.StringIO()
+    stats = engine.run_batch(engine.read_jobs(path), output, processes=processes)
+    return stats, dict((record["id"], record) for record in map(json.loads, output.getvalue().splitlines()))
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_malformed_csv_rows_do_not_stop_the_batch(tmp_path, processes):
+    """ Rows with no plant, unknown analyses or a bad sampling time are reported, the rest still run """
+    path = write_lines(tmp_path / "jobs.csv", [
+        "id,plant,compensator,Ts,analyses",
+        "good,1/(s*(s+1)),1,,margins",
+        "no-plant,,1,,margins",
+        "unknown,1/(s+1),1,,margins;spectrogram",
+        "bad-ts,1/(s+1),1,fast,margins",
+        "broken,1/(s+,1,,margins",
+        "digital,1/(s*(s+1)),1,0.1,step",
+    ])
+    stats, records = run(path, processes)
+    assert stats.jobs == 6 and stats.failed == 4
+    assert records["good"]["status"] == "ok" and records["digital"]["status"] == "ok"
+    assert "no plant" in records["no-plant"]["error"]
+    assert "spectrogram" in records["unknown"]["error"]
+    assert "sampling time" in records["bad-ts"]["error"]
+    assert records["broken"]["status"] == "error"
+
+
+def test_malformed_json_lines_do_not_stop_the_batch(tmp_path):
+    """ Unparseable lines and non-object records become error records numbered by line """
+    path = write_lines(tmp_path / "jobs.jsonl", [
+        json.dumps({"id": "first", "plant": "1/(s+1)", "analyses": ["margins"]}),
+        "{not json",
+        "[1, 2]",
+        json.dumps({"id": "last", "G": "10/((s+1)*(s+2))", "analyses": "margins,step"}),
+    ])
+    stats, records = run(path)
+    assert stats.jobs == 4 and stats.failed == 2
+    assert records["first"]["status"] == records["last"]["status"] == "ok"
+    assert records["2"]["status"] == records["3"]["status"] == "error"
+
+
+def test_batch_margins_match_stability_margins(tmp_path):
+    """ Results are the JSON form of the engine's own analyses """
+    path = write_lines(tmp_path / "jobs.csv", ["plant,compensator", "10/((s+1)*(s+2)*(s+3)),(s+2)/(s+5)"])
+    _, records = run(path)
+    margins = engine.stability_margins(engine.build_factored_system("10/((s+1)*(s+2)*(s+3))", "(s+2)/(s+5)"))
+    assert records["1"]["results"]["margins"] == pytest.approx(engine.batch.to_json(margins), nan_ok=True)
@@ -0,0 +1,94 @@
+"""
+    Side-by-side comparison of sampling periods, checked against each design
+    built and analysed separately with python-control.
+"""
+
+import math
+import warnings
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANT = "10/((s+1)*(s+2)*(s+3))"
+COMPENSATOR = "5*(z-0.5)/(z-0.1)"
+PERIODS = [0.01, 0.05, 0.2, 0.5, 1.5]
+
+
+@pytest.fixture(scope="module")
+def comparison():
+    return engine.compare_sampling_times(PLANT, COMPENSATOR, PERIODS)
+
+
+def reference_margins(loop):
+    """ Gain margin and phase crossover from every phase crossing python-control
+        finds, plus the one at the Nyquist frequency that it leaves out, chosen
+        as python-control does (closest to 0 dB); phase margin and gain
+        crossover from its default method, which stays accurate as the poles
+        crowd towards z = 1
+    """
+    gains, _, _, phase_crossings, _, _ = control.stability_margins(loop, returnall=True, method="poly")
+    nyquist = loop(-1.0)
+    if abs(nyquist.imag) <= 1e-9*abs(nyquist) and nyquist.real < 0:
+        gains = np.append(gains, 1/abs(nyquist))
+        phase_crossings = np.append(phase_crossings, math.pi/loop.dt)
+    best = np.argmin(np.abs(np.log(gains)))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        _, pm, _, _, wcp, _ = control.stability_margins(loop)
+    return gains[best], pm, phase_crossings[best], wcp
+
+
+def sorted_roots(values):
+    values = np.round(np.asarray(values, dtype=complex), 6)
+    return values[np.lexsort((values.imag, values.real))]
+
+
+@pytest.mark.parametrize("index", range(len(PERIODS)))
+def test_each_period_matches_a_separate_design(comparison, index):
+    loop = engine.build_discrete_system(PLANT, COMPENSATOR, PERIODS[index])
+    gm, pm, wcg, wcp = reference_margins(loop)
+    assert comparison.gain_margin_db[index] == pytest.approx(20*math.log10(gm), abs=1e-6)
+    assert comparison.phase_margin[index] == pytest.approx(pm, rel=1e-6, nan_ok=True)
+    assert comparison.wcg[index] == pytest.approx(wcg, rel=1e-6, nan_ok=True)
+    assert comparison.wcp[index] == pytest.approx(wcp, rel=1e-6, nan_ok=True)
+
+    closed = control.feedback(loop, 1)
+    np.testing.assert_allclose(sorted_roots(comparison.closed_loop_poles[index]), sorted_roots(closed.poles()),
+                               atol=1e-6)
+    stable = bool(np.abs(closed.poles()).max() < 1)
+    assert bool(comparison.stable[index]) == stable
+
+    step = comparison.step[index]
+    assert np.allclose(np.diff(step.time), PERIODS[index])
+    if stable:
+        _, expected = control.step_response(closed, step.time)
+        np.testing.assert_allclose(step.response, expected, atol=1e-8)
+        assert comparison.final_value[index] == pytest.approx(control.dcgain(closed), rel=1e-6)
+    else:
+        assert np.isnan(comparison.final_value[index])
+
+
+def test_stable_step_responses_share_one_span(comparison):
+    spans = [step.time[-1] for step, stable in zip(comparison.step, comparison.stable) if stable]
+    assert max(spans) - min(spans) <= max(PERIODS)
+
+
+def test_bode_responses_match_python_control(comparison):
+    for period, bode in zip(PERIODS, comparison.bode):
+        loop = engine.build_discrete_system(PLANT, COMPENSATOR, period)
+        assert bode.omega[-1] <= math.pi/period*(1 + 1e-12)
+        response = loop(np.exp(1j*bode.omega*period))
+        np.testing.assert_allclose(bode.mag_db, 20*np.log10(np.abs(response)), atol=1e-8)
+
+
+def test_table_has_a_row_per_period(comparison):
+    lines = engine.comparison_table(comparison).splitlines()
+    assert len(lines) == len(PERIODS) + 1 and lines[0].split()[0] == "Ts"
+
+
+def test_non_positive_periods_are_rejected():
+    with pytest.raises(ValueError):
+        engine.compare_sampling_times(PLANT, COMPENSATOR, [0.1, 0.0])
@@ -0,0 +1,55 @@
+"""
+    Trace decimation for display: the reduced traces must keep every extreme
+    and gap that would be visible at full resolution.
+"""
+
+import numpy as np
+import pytest
+
+from control_engine import decimate
+
+
+@pytest.mark.parametrize("log_x", [False, True])
+def test_each_bucket_keeps_its_extremes(log_x):
+    x = np.geomspace(1e-2, 1e3, 200001) if log_x else np.linspace(0, 50, 200001)
+    y = np.sin(7*np.log(x) if log_x else 7*x) + (np.arange(len(x)) == 123457)*5
+    buckets = 300
+    kept_x, kept_y = decimate.minmax_decimate(x, y, buckets, log_x=log_x)
+    assert len(kept_x) <= 4*buckets and np.all(np.diff(kept_x) > 0)
+    assert np.all(np.isin(kept_x, x))
+    np.testing.assert_array_equal(kept_y, y[np.searchsorted(x, kept_x)])
+
+    position = np.log10(x) if log_x else x
+    bucket = np.clip(np.floor((position - position[0])/(position[-1] - position[0])*buckets), 0, buckets - 1)
+    kept_bucket = bucket[np.searchsorted(x, kept_x)]
+    for index in range(0, buckets, 17):
+        assert kept_y[kept_bucket == index].max() == y[bucket == index].max()
+        assert kept_y[kept_bucket == index].min() == y[bucket == index].min()
+    assert kept_x[0] == x[0] and kept_x[-1] == x[-1] and kept_y.max() == y.max()
+
+
+def test_gaps_are_kept_and_short_traces_untouched():
+    x = np.linspace(0, 1, 10000)
+    y = np.cos(x)
+    y[[10, 5000, 5001]] = [np.nan, np.inf, np.nan]
+    kept_x, kept_y = decimate.minmax_decimate(x, y, 50)
+    assert np.count_nonzero(~np.isfinite(kept_y)) == 3
+    assert len(decimate.minmax_decimate(x[:100], y[:100], 50)[0]) == 100
+
+
+def test_thin_path_drops_only_points_hidden_between_neighbours():
+    angle = np.linspace(0, 2*np.pi, 100001)
+    x, y = np.cos(angle), np.sin(angle)
+    thin_x, thin_y = decimate.thin_path(x, y, 0.01, 0.01)
+    assert 100 < len(thin_x) < len(x)/10
+    assert (thin_x[0], thin_y[0], thin_x[-1], thin_y[-1]) == (x[0], y[0], x[-1], y[-1])
+    # every dropped point shares a pixel with a kept one
+    kept = set(zip(np.floor(thin_x/0.01), np.floor(thin_y/0.01)))
+    assert set(zip(np.floor(x/0.01), np.floor(y/0.01))) <= kept
+
+
+def test_visible_range_reaches_past_the_view():
+    x = np.arange(100.0)
+    part = decimate.visible_range(x, 10.5, 20.5)
+    assert x[part][0] < 10.5 and x[part][-1] > 20.5
+    assert decimate.visible_range(x, -5, 500) == slice(0, 100)
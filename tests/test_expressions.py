@@ -0,0 +1,79 @@
+"""
+    Safe compilation of transfer function expressions.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+EXPRESSIONS = ["1/(s*(s+1))", "10*(s+2)/((s+1)**2*(s+5))", "(s^2+2*s+5)/(s^3+4*s^2+6*s+4)",
+               "2*pi/(s+e)", "1/(s+1) + 2/(s+3)", "(s+1)/(s+2) - 1", "3*s/(0.5*s+1)**3"]
+
+
+def evaluated(expression, variable="s"):
+    """ The expression evaluated with python-control, as the app did before compiling """
+    return eval(expression.replace("^", "**"), {variable: control.tf(variable), "pi": np.pi, "e": np.e})
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_compile_expression_matches_python_control(expression):
+    num, den = engine.compile_expression(expression)
+    expected = evaluated(expression)
+    points = 1j*np.geomspace(0.01, 100, 25)
+    np.testing.assert_allclose(np.polyval(num, points)/np.polyval(den, points), expected(points), rtol=1e-10)
+    assert den[0] == 1.0
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_compile_factored_matches_compile_expression(expression):
+    zeros, poles, gain = engine.compile_factored(expression)
+    num, den = engine.compile_expression(expression)
+    points = 1j*np.geomspace(0.01, 100, 25)
+    np.testing.assert_allclose(engine.zpk_evaluate(zeros, poles, gain, points),
+                               np.polyval(num, points)/np.polyval(den, points), rtol=1e-9)
+
+
+def test_z_domain_and_parameters():
+    num, den = engine.compile_expression("K*(z-a)/(z-b)", variable="z", parameters={"K": 2, "a": 0.5, "b": 0.1})
+    np.testing.assert_allclose(num, [2.0, -1.0])
+    np.testing.assert_allclose(den, [1.0, -0.1])
+
+
+@pytest.mark.parametrize("expression", ["__import__('os').system('true')", "s.__class__", "open('x')",
+                                        "[s for s in ()]", "lambda: 1", "s if 1 else 2", "x/(s+1)",
+                                        "1/(s+1", "", "1/0*s", "s**0.5", "s**s"])
+def test_unsafe_or_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        engine.compile_expression(expression)
+
+
+def test_compiled_arrays_are_read_only():
+    num, _ = engine.compile_expression("(s+2)/(s+5)")
+    with pytest.raises(ValueError):
+        num[0] = 3.0
+
+
+def test_parameterise_and_substitute_round_trip():
+    template, values = engine.parameterise_expression("2.5*(s+2)/(s**2+0.4*s+4)")
+    assert template == "p1*(s+p2)/(s**2+p3*s+p4)"
+    assert values == {"p1": 2.5, "p2": 2.0, "p3": 0.4, "p4": 4.0}
+    assert engine.substitute_parameters(template, values) == "2.5*(s+2)/(s**2+0.4*s+4)"
+    assert engine.substitute_parameters("K*(s+a)", {"K": 1.0, "a": -3.0}) == "1*(s+(-3))"
+
+
+@pytest.mark.parametrize("compile_", [engine.compile_expression, engine.compile_factored])
+@pytest.mark.parametrize("expression", ["(((s+1)**64)**64)**64", "((s+1)**8)**64",
+                                        "(s+1)**64*(s+1)**64*(s+1)**64*(s+1)**64*(s+1)**2",
+                                        "1/((s+1)**64) + 1/((s+2)**64*(s+3)**64*(s+4)**64*(s+5)**2)"])
+def test_expansion_beyond_the_degree_limit_is_rejected(compile_, expression):
+    """ Each exponent is within MAX_EXPONENT, but the expanded result is not within MAX_DEGREE """
+    with pytest.raises(ValueError):
+        compile_(expression)
+
+
+@pytest.mark.parametrize("compile_", [engine.compile_expression, engine.compile_factored])
+def test_degree_limit_is_inclusive(compile_):
+    from control_engine.expressions import MAX_DEGREE
+    assert len(compile_("1/((s+1)**4)**{0}".format(MAX_DEGREE//4))[1]) in (MAX_DEGREE, MAX_DEGREE + 1)
@@ -0,0 +1,81 @@
+"""
+    Factored transfer functions and their stability margins, checked against
+    python-control.
+"""
+
+import math
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANTS = ["1/(s*(s+1))", "10/((s+1)*(s+2)*(s+3))", "(s+2)/(s*(s+1)*(s+5))", "100*(s+1)/(s**2*(s+10)**2)",
+          "2/(s-1)", "5*(s-1)/((s+1)*(s+2)*(s+3))", "-1/(s+1)"]
+
+
+def reference_tf(plant):
+    return engine.build_system(plant)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_margins_match_python_control(plant):
+    """ Gain margin, phase margin and both crossover frequencies agree with control.margin """
+    expected = control.margin(reference_tf(plant))
+    actual = engine.factored_margins(engine.build_factored_system(plant))
+    np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize("plant, gain_margin", [("2/(s-1)", 0.5), ("5*(s-1)/((s+1)*(s+2)*(s+3))", 1.2)])
+def test_phase_crossing_at_zero_frequency(plant, gain_margin):
+    """ A negative real DC gain is a phase crossing at zero frequency, as in control.margin """
+    margins = engine.stability_margins(engine.build_factored_system(plant))
+    assert margins.gain_margin == pytest.approx(gain_margin)
+    assert margins.gain_margin_db == pytest.approx(20*math.log10(gain_margin))
+    assert margins.wcg == 0.0
+
+
+def test_discrete_phase_crossing_at_zero_frequency():
+    """ The discretised plant keeps its zero frequency crossing, as control.margin's poly method finds """
+    discrete = engine.build_discrete_system("5*(s-1)/((s+1)*(s+2)*(s+3))", "1", "0.1")
+    gain_margins = control.stability_margins(discrete, returnall=True, method="poly")[0]
+    gain_margin, _, wcg, _ = engine.factored_margins(engine.FactoredTF.from_tf(discrete))
+    assert gain_margin == pytest.approx(min(gain_margins, key=lambda gm: abs(math.log(gm))))
+    assert wcg == 0.0
+
+
+def test_discrete_phase_crossing_at_nyquist_frequency():
+    """ 1/(z + 0.5) is -2 at the Nyquist frequency, so its gain margin is 0.5 there """
+    gain_margin, _, wcg, _ = engine.factored_margins(engine.FactoredTF([], [-0.5], 1.0, 0.1))
+    assert gain_margin == pytest.approx(0.5)
+    assert wcg == pytest.approx(math.pi/0.1)
+
+
+@pytest.mark.parametrize("plant", PLANTS[:4])
+def test_feedback_poles_match_python_control(plant):
+    """ Closed-loop poles from the balanced realisation agree with control.feedback """
+    closed = engine.build_factored_system(plant).feedback()
+    expected = control.feedback(reference_tf(plant), 1).poles()
+    np.testing.assert_allclose(np.sort_complex(closed.poles()), np.sort_complex(expected), rtol=1e-8, atol=1e-10)
+
+
+def test_high_order_series_keeps_roots():
+    """ Series connection gathers roots exactly, where coefficient products lose them """
+    section = engine.FactoredTF([-2.0], [-1.0, -3.0], 4.0)
+    loop = section
+    for _ in range(9):
+        loop = loop*section
+    np.testing.assert_array_equal(np.sort_complex(loop.poles()), np.sort_complex(np.tile([-1.0, -3.0], 10)))
+    assert loop.gain == pytest.approx(4.0**10)
+
+
+@pytest.mark.parametrize("plant", PLANTS[:4])
+def test_state_space_matches_frequency_response(plant):
+    """ The section cascade realisation has the same frequency response as the factors """
+    sys_tf = engine.build_factored_system(plant)
+    closed = sys_tf.feedback()
+    A, B, C, D = closed.state_space()
+    omega = np.geomspace(0.01, 100, 50)
+    realised = np.array([C.dot(np.linalg.solve(1j*w*np.eye(len(A)) - A, B)) + D for w in omega])
+    np.testing.assert_allclose(realised, closed.frequency_response(omega), rtol=1e-8)
@@ -0,0 +1,58 @@
+"""
+    Batched frequency response evaluation, checked against python-control.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+NUMS = [[1.0], [10.0, 20.0], [1.0, 2.0, 5.0]]
+DENS = [[1.0, 1.0, 0.0], [1.0, 6.0, 11.0, 6.0], [1.0, 4.0, 6.0, 4.0]]
+OMEGA = np.geomspace(0.01, 100, 200)
+
+
+def wrap(phase_deg):
+    return np.remainder(phase_deg + 180.0, 360.0) - 180.0
+
+
+@pytest.mark.parametrize("dt", [None, 0.1])
+def test_batch_frequency_response_matches_each_system(dt):
+    omega = OMEGA[OMEGA < np.pi/dt] if dt else OMEGA
+    mag_db, phase_deg, _ = engine.batch_frequency_response(NUMS, DENS, omega, dt)
+    for index, (num, den) in enumerate(zip(NUMS, DENS)):
+        sys_tf = control.tf(num, den, dt) if dt else control.tf(num, den)
+        response = sys_tf(engine.evaluation_points(omega, dt))
+        np.testing.assert_allclose(mag_db[index], 20*np.log10(np.abs(response)), atol=1e-9)
+        np.testing.assert_allclose(wrap(phase_deg[index] - np.degrees(np.angle(response))), 0.0, atol=1e-7)
+
+
+def test_batch_zpk_response_matches_coefficient_form():
+    zeros = [[], [-2.0], [-1+2j, -1-2j]]
+    poles = [[0.0, -1.0], [-1.0, -2.0, -3.0], [-2.0, -1+1j, -1-1j]]
+    gains = [1.0, 10.0, 1.0]
+    mag_db, phase_deg, _ = engine.batch_zpk_response(zeros, poles, gains, OMEGA)
+    expected_db, expected_phase, _ = engine.batch_frequency_response(NUMS, DENS, OMEGA)
+    np.testing.assert_allclose(mag_db, expected_db, atol=1e-9)
+    np.testing.assert_allclose(wrap(phase_deg - expected_phase), 0.0, atol=1e-7)
+
+
+def test_batch_zpk_response_stays_accurate_at_high_order():
+    """ A 40-pole system, which overflows as coefficients, matches the product of its factors """
+    poles = -np.linspace(1, 40, 40)
+    mag_db, phase_deg, _ = engine.batch_zpk_response([[]], [poles], [1.0], OMEGA)
+    points = 1j*OMEGA
+    expected_db = -20*np.sum(np.log10(np.abs(points[:, np.newaxis] - poles)), axis=1)
+    expected_phase = -np.degrees(np.sum(np.angle(points[:, np.newaxis] - poles), axis=1))
+    np.testing.assert_allclose(mag_db[0], expected_db, rtol=1e-12)
+    np.testing.assert_allclose(phase_deg[0], expected_phase, atol=1e-9)
+
+
+def test_padding_contributes_nothing():
+    padded = engine.pad_roots([[-1.0], [-1.0, -2.0, -3.0]])
+    assert padded.shape == (2, 3) and np.isnan(padded[0, 1:]).all()
+    alone = engine.batch_zpk_response([[]], [[-1.0]], [1.0], OMEGA)
+    together = engine.batch_zpk_response(engine.pad_roots([[], []]), padded, [1.0, 1.0], OMEGA)
+    np.testing.assert_allclose(together.mag_db[0], alone.mag_db[0])
+    np.testing.assert_allclose(engine.pad_coefficients([[1.0], [1.0, 2.0]]), [[0.0, 1.0], [1.0, 2.0]])
@@ -0,0 +1,49 @@
+"""
+    Adaptive frequency grids.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+# a lightly damped resonance at 10 rad/s between two real poles
+NUM = [100.0]
+DEN = np.polymul([1.0, 0.2, 100.0], [1.0, 1.0])
+
+
+def test_grid_response_is_exact_and_within_budget():
+    omega, response = engine.adaptive_frequency_grid(NUM, DEN, points=300)
+    assert len(omega) <= 300 and np.all(np.diff(omega) > 0)
+    np.testing.assert_allclose(response, control.tf(NUM, DEN)(1j*omega), rtol=1e-10)
+
+
+def test_grid_resolves_the_resonant_peak():
+    """ The peak found on the adaptive grid matches a very fine uniform grid """
+    omega, response = engine.adaptive_frequency_grid(NUM, DEN, points=300)
+    fine = np.geomspace(omega[0], omega[-1], 200000)
+    peak = np.abs(control.tf(NUM, DEN)(1j*fine)).max()
+    assert 20*np.log10(np.abs(response).max()) == pytest.approx(20*np.log10(peak), abs=0.05)
+
+
+def test_adjacent_points_meet_the_step_limits():
+    omega, response = engine.adaptive_frequency_grid(NUM, DEN, points=2000)
+    mag_db = 20*np.log10(np.abs(response))
+    phase_deg = np.degrees(np.unwrap(np.angle(response)))
+    assert np.abs(np.diff(mag_db)).max() <= 1.0 + 1e-9
+    assert np.abs(np.diff(phase_deg)).max() <= 5.0 + 1e-9
+
+
+def test_zpk_grid_matches_coefficient_grid():
+    zeros, poles = np.array([]), np.roots(DEN)
+    omega, response = engine.adaptive_zpk_grid(zeros, poles, 100.0, points=300)
+    np.testing.assert_allclose(response, control.tf(NUM, DEN)(1j*omega), rtol=1e-9)
+
+
+def test_discrete_grid_stops_at_nyquist_frequency():
+    lower, upper = engine.frequency_range([1.0], [1.0, -0.5], dt=0.1)
+    assert upper == pytest.approx(np.pi/0.1)
+    omega, response = engine.adaptive_frequency_grid([1.0], [1.0, -0.5], dt=0.1, points=200)
+    assert omega[-1] <= np.pi/0.1*(1 + 1e-12)
+    np.testing.assert_allclose(response, control.tf([1.0], [1.0, -0.5], 0.1)(np.exp(1j*omega*0.1)), rtol=1e-10)
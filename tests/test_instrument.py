@@ -0,0 +1,141 @@
+"""
+    Stage timing, counters, export and profiling of the instrumentation layer.
+"""
+
+import csv
+import json
+import os
+import threading
+
+import pytest
+
+import control_engine as engine
+from control_engine import instrument
+
+
+@pytest.fixture(autouse=True)
+def fresh():
+    instrument.reset()
+    yield
+    instrument.reset()
+    instrument.set_profiling(False)
+
+
+def test_nested_stages_record_their_parents():
+    with instrument.stage("outer", page="bode"):
+        with instrument.stage("inner"):
+            pass
+        with instrument.stage("inner", points=3):
+            pass
+    records = instrument.records()
+    assert [(record["stage"], record["parent"]) for record in records] == \
+        [("inner", "outer"), ("inner", "outer"), ("outer", None)]
+    assert records[1]["context"] == {"points": 3} and records[2]["context"] == {"page": "bode"}
+    assert records[2]["seconds"] >= records[0]["seconds"] + records[1]["seconds"]
+    assert all(record["thread"] == threading.current_thread().name for record in records)
+
+
+def test_stage_is_recorded_when_its_code_raises():
+    with pytest.raises(RuntimeError):
+        with instrument.stage("failing"):
+            raise RuntimeError("stopped")
+    assert [record["stage"] for record in instrument.records()] == ["failing"]
+    with instrument.stage("after"):
+        pass
+    assert instrument.records()[-1]["parent"] is None
+
+
+def test_stages_in_other_threads_have_their_own_parents():
+    def work():
+        with instrument.stage("worker"):
+            pass
+    with instrument.stage("main"):
+        thread = threading.Thread(target=work, name="analysis-thread")
+        thread.start()
+        thread.join()
+    worker = [record for record in instrument.records() if record["stage"] == "worker"][0]
+    assert worker["parent"] is None and worker["thread"] == "analysis-thread"
+
+
+def test_summary_and_counters():
+    for _ in range(3):
+        with instrument.stage("quick"):
+            pass
+    timed_slow = instrument.timed("slow")(lambda value: sum(range(value)))
+    assert timed_slow(200000) == sum(range(200000))
+    instrument.count("root solves")
+    instrument.count("root solves", 4)
+
+    stats = dict((item.name, item) for item in instrument.summary())
+    quick = stats["quick"]
+    assert quick.count == 3 and quick.min <= quick.mean <= quick.max
+    assert quick.total == pytest.approx(quick.mean*3)
+    assert stats["slow"].count == 1 and stats["slow"].last == stats["slow"].total
+    assert instrument.summary()[0].total >= instrument.summary()[-1].total
+    assert instrument.counters() == {"root solves": 5}
+
+
+def test_analyses_time_their_stages():
+    """ The plant is one no other test compiles, so it is parsed here rather than found in the cache """
+    engine.stability_margins(engine.build_system("7/((s+1.25)*(s+2.75)*(s+3.5))"))
+    names = set(item.name for item in instrument.summary())
+    assert {"parse", "margins"} <= names
+
+
+def test_export_json_lines_and_csv(tmp_path):
+    with instrument.stage("outer"):
+        with instrument.stage("inner", points=3):
+            pass
+    instrument.count("cache hits", 2)
+
+    json_path = str(tmp_path / "stages.jsonl")
+    instrument.export(json_path)
+    with open(json_path) as stream:
+        lines = [json.loads(line) for line in stream]
+    assert lines[:-1] == instrument.records()
+    assert lines[-1] == {"counters": {"cache hits": 2}}
+
+    csv_path = str(tmp_path / "stages.csv")
+    instrument.export(csv_path)
+    with open(csv_path, newline="") as stream:
+        rows = list(csv.DictReader(stream))
+    assert [row["stage"] for row in rows] == ["inner", "outer"]
+    assert rows[0]["parent"] == "outer" and rows[1]["parent"] == ""
+    assert json.loads(rows[0]["context"]) == {"points": 3}
+    assert float(rows[0]["seconds"]) == pytest.approx(instrument.records()[0]["seconds"])
+
+
+def test_reset_clears_everything():
+    instrument.set_profiling(True)
+    with instrument.stage("profiled"):
+        sum(range(1000))
+    instrument.count("solves")
+    assert instrument.records() and instrument.summary() and instrument.counters()
+    instrument.reset()
+    assert instrument.records() == [] and instrument.summary() == [] and instrument.counters() == {}
+    assert instrument.profile_stats() is None
+
+
+def test_profiles_of_outermost_stages(tmp_path):
+    with pytest.raises(ValueError):
+        instrument.dump_profile(str(tmp_path / "none.prof"))
+    instrument.set_profiling(True)
+    assert instrument.profiling_enabled()
+    with instrument.stage("outer"):
+        with instrument.stage("inner"):
+            sorted(range(1000), key=lambda value: -value)
+    stats = instrument.profile_stats()
+    if stats is None:
+        pytest.skip("another profiler was already active")
+    assert any(function == "<lambda>" for _, _, function in stats.stats)
+    path = str(tmp_path / "analysis.prof")
+    instrument.dump_profile(path)
+    assert os.path.getsize(path) > 0
+
+
+def test_records_are_bounded():
+    for _ in range(instrument.MAX_RECORDS + 5):
+        with instrument.stage("many"):
+            pass
+    assert len(instrument.records()) == instrument.MAX_RECORDS
+    assert dict((item.name, item.count) for item in instrument.summary())["many"] == instrument.MAX_RECORDS + 5
@@ -0,0 +1,67 @@
+"""
+    Time-domain performance metrics, checked against python-control and
+    closed-form results.
+"""
+
+import math
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+STABLE = ["10/((s+1)*(s+2)*(s+3))", "4/(s*(s+2))", "(s+2)/(s*(s+1)*(s+5))"]
+
+
+@pytest.mark.parametrize("plant", STABLE)
+def test_step_metrics_match_step_info(plant):
+    """ Overshoot, rise, peak and settling times agree with control.step_info """
+    closed = control.feedback(engine.build_system(plant), 1)
+    time = np.linspace(0, 30, 30001)
+    _, response = control.step_response(closed, time)
+    expected = control.step_info(response, time, SettlingTimeThreshold=engine.metrics.SETTLING_BAND)
+    actual = engine.performance_metrics(engine.build_factored_system(plant))
+    assert actual.overshoot == pytest.approx(expected["Overshoot"], abs=0.05)
+    assert actual.rise_time == pytest.approx(expected["RiseTime"], rel=0.01)
+    assert actual.peak_time == pytest.approx(expected["PeakTime"], rel=0.01)
+    assert actual.settling_time == pytest.approx(expected["SettlingTime"], rel=0.02)
+
+
+def test_error_constants_and_steady_state_errors():
+    """ Type 0 and type 1 loops give the textbook steady-state errors """
+    type_zero = engine.performance_metrics(engine.build_factored_system("10/((s+1)*(s+2)*(s+3))"))
+    assert type_zero.system_type == 0 and type_zero.kp == pytest.approx(10/6)
+    assert type_zero.steady_state_error == pytest.approx(1/(1 + 10/6))
+    type_one = engine.performance_metrics(engine.build_factored_system("4/(s*(s+2))"))
+    assert type_one.system_type == 1 and type_one.kv == pytest.approx(2.0)
+    assert type_one.steady_state_error == pytest.approx(0.0, abs=1e-12)
+    assert type_one.ramp_error == pytest.approx(0.5)
+
+
+def test_step_error_integrals_match_fine_simulation():
+    """ The exact ISE and the sampled IAE agree with integrating a finely sampled python-control step response """
+    metrics = engine.performance_metrics(engine.build_factored_system("4/(s*(s+2))"))
+    closed = control.feedback(engine.build_system("4/(s*(s+2))"), 1)
+    time = np.linspace(0, 40, 400001)
+    _, response = control.step_response(closed, time)
+    assert metrics.ise == pytest.approx(np.trapezoid((1 - response)**2, time), rel=1e-4)
+    assert metrics.iae == pytest.approx(np.trapezoid(np.abs(1 - response), time), rel=1e-3)
+
+
+def test_unstable_loop_has_unbounded_error_integrals():
+    """ A diverging closed loop gets infinite error integrals and no steady-state values """
+    metrics = engine.performance_metrics(engine.build_factored_system("100/((s+1)*(s+2)*(s+3))"))
+    assert math.isinf(metrics.iae) and math.isinf(metrics.ise) and math.isinf(metrics.itae)
+    assert math.isnan(metrics.final_value) and math.isnan(metrics.ramp_error)
+
+
+def test_batched_loops_match_one_at_a_time():
+    """ A list of loops is measured in one pass with the same results as each alone """
+    loops = [engine.build_factored_system(plant) for plant in STABLE + ["100/((s+1)*(s+2)*(s+3))"]]
+    batched = engine.loop_metrics(loops)
+    assert np.isinf(batched.step.iae[-1]) and np.isinf(batched.ramp.itae[-1])
+    for index, loop in enumerate(loops):
+        alone = engine.loop_metrics(loop)
+        assert batched.step.final_value[index] == pytest.approx(alone.step.final_value, nan_ok=True)
+        assert batched.constants.system_type[index] == alone.constants.system_type
@@ -0,0 +1,63 @@
+"""
+    Nyquist stability, checked against the closed-loop poles and
+    python-control's encirclement count.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+LOOPS = [control.tf([10.0], [1.0, 6.0, 11.0, 6.0]),
+         control.tf([100.0], [1.0, 6.0, 11.0, 6.0]),
+         control.tf([2.0], [1.0, -1.0]),
+         control.tf([0.5], [1.0, -1.0]),
+         control.tf([3.0, 3.0], [1.0, -1.0, 0.0]),
+         control.tf([1.0], [1.0, 1.0, 0.0]),
+         control.tf([5.0, -5.0], [1.0, 6.0, 11.0, 6.0]),
+         control.tf([1.0, 2.0], [1.0, 0.0, 4.0, 0.0])]
+
+
+def unstable_closed_loop_poles(loop):
+    poles = control.feedback(loop, 1).poles()
+    if loop.dt:
+        return int(np.count_nonzero(np.abs(poles) > 1 + 1e-9))
+    return int(np.count_nonzero(poles.real > 1e-9))
+
+
+def stability(loop):
+    return engine.nyquist_stability(loop.zeros(), loop.poles(), loop.num[0][0][0]/loop.den[0][0][0], loop.dt)
+
+
+@pytest.mark.parametrize("loop", LOOPS)
+def test_criterion_agrees_with_closed_loop_poles(loop):
+    result = stability(loop)
+    assert result.closed_loop_unstable == unstable_closed_loop_poles(loop)
+    assert result.stable == (unstable_closed_loop_poles(loop) == 0)
+    assert not result.marginal
+
+
+@pytest.mark.parametrize("loop", [loop for loop in LOOPS if not np.any(np.isclose(loop.poles().real, 0))])
+def test_encirclements_match_python_control(loop):
+    assert stability(loop).encirclements == control.nyquist_response(loop).count
+
+
+@pytest.mark.parametrize("gain", [0.2, 1.0, 3.0])
+def test_discrete_loops(gain):
+    loop = control.sample_system(control.tf([gain], [1.0, 3.0, 2.0, 0.0]), 0.5)
+    zeros, poles = loop.zeros(), loop.poles()
+    result = engine.nyquist_stability(zeros, poles, loop.num[0][0][0]/loop.den[0][0][0], loop.dt)
+    assert result.closed_loop_unstable == unstable_closed_loop_poles(loop)
+
+
+def test_loop_through_minus_one_is_marginal():
+    """ 6/(s(s+1)(s+2)) has closed-loop poles at +-j*sqrt(2) """
+    result = stability(control.tf([6.0], [1.0, 3.0, 2.0, 0.0]))
+    assert result.marginal and not result.stable
+
+
+def test_encirclements_of_circles():
+    angles = np.linspace(0, 2*np.pi, 100, endpoint=False)
+    circles = np.stack((-1 + 0.5*np.exp(-1j*angles), -1 + 0.5*np.exp(1j*angles), 2*np.exp(-2j*angles)))
+    np.testing.assert_array_equal(engine.nyquist.encirclements(circles), [1, -1, 2])
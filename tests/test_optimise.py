@@ -0,0 +1,50 @@
+"""
+    Compensator optimiser: design quality, degenerate designs and the worker pool.
+"""
+
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANT = "1/(s*(s+1)*(s+5))"
+
+
+@pytest.fixture(scope="module")
+def lead_designs():
+    return engine.optimise_compensator(PLANT, "lead", processes=1)
+
+
+def test_designs_report_their_exact_margins(lead_designs):
+    """ Each design's margins are those of its (printed, rounded) compensator applied to the plant """
+    assert lead_designs.designs
+    for design in lead_designs.designs[:5]:
+        margins = engine.stability_margins(engine.build_factored_system(PLANT, design.expression))
+        assert design.phase_margin == pytest.approx(margins.phase_margin, abs=0.01)
+        assert design.gain_margin_db == pytest.approx(margins.gain_margin_db, abs=0.01)
+
+
+def test_designs_are_stable_and_meet_targets(lead_designs):
+    for design in lead_designs.designs:
+        closed = engine.build_factored_system(PLANT, design.expression).feedback()
+        assert np.all(closed.poles().real < 0)
+        assert design.meets_targets
+        assert design.phase_margin >= engine.DEFAULT_TARGETS.phase_margin
+
+
+@pytest.mark.parametrize("structure", ["lead", "lag"])
+def test_no_design_cancels_its_own_zero(structure):
+    """ A lead or lag pole stays well separated from its zero, never reducing to a plain gain """
+    result = engine.optimise_compensator(PLANT, structure, processes=1, starts=2)
+    for design in result.designs:
+        ratio = design.parameters["b"]/design.parameters["a"]
+        separation = abs(np.log10(ratio))
+        assert separation >= engine.optimise.MIN_RATIO_DECADES - 1e-9
+        assert (ratio > 1) == (structure == "lead")
+
+
+def test_worker_pool_matches_serial_search():
+    """ Spawned worker processes give the same designs as searching in process """
+    serial = engine.optimise_compensator(PLANT, "pid", starts=2, processes=1)
+    pooled = engine.optimise_compensator(PLANT, "pid", starts=2, processes=2)
+    assert [design.expression for design in pooled.designs] == [design.expression for design in serial.designs]
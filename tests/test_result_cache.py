@@ -0,0 +1,83 @@
+"""
+    On-disk result cache: keys, round trips and eviction.
+"""
+
+import numpy as np
+import pytest
+
+import control_engine as engine
+from control_engine import result_cache, result_types
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return engine.ResultCache(str(tmp_path))
+
+
+def test_equivalent_systems_share_a_key(cache):
+    """ Scaling the numerator and denominator together leaves the key unchanged """
+    first = engine.build_system("1/(s*(s+1))")
+    second = engine.build_system("2/(2*s**2+2*s)")
+    assert cache.key("bode_response", first) == cache.key("bode_response", second)
+    assert cache.key("bode_response", first) != cache.key("bode_response", first, closed_loop=True)
+
+
+def test_key_includes_format_version(cache, monkeypatch):
+    """ Results stored by an earlier engine are not served once the version is bumped """
+    sys_tf = engine.build_system("1/(s+1)")
+    before = cache.key("stability_margins", sys_tf)
+    monkeypatch.setattr(result_cache, "FORMAT_VERSION", result_cache.FORMAT_VERSION + 1)
+    assert cache.key("stability_margins", sys_tf) != before
+
+
+def test_round_trip_restores_named_tuples(cache):
+    """ A cached result comes back as the same named tuple with equal arrays """
+    sys_tf = engine.build_factored_system("10/((s+1)*(s+2)*(s+3))")
+    computed = cache.fetch("bode_response", sys_tf, lambda: engine.bode_response(sys_tf))
+    loaded = cache.fetch("bode_response", sys_tf, lambda: pytest.fail("recomputed a cached result"))
+    assert type(loaded) is type(computed)
+    for expected, actual in zip(computed, loaded):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_eviction_keeps_within_budget(tmp_path):
+    """ The least recently used entries are removed once the budget is exceeded """
+    cache = engine.ResultCache(str(tmp_path), max_bytes=3*8*1000 + 2000)
+    sys_tf = engine.build_system("1/(s+1)")
+    for index in range(6):
+        cache.fetch("array", sys_tf, lambda: (np.zeros(1000),), index=index)
+    assert cache.info()["evictions"] > 0
+    assert cache.info()["bytes"] <= cache.max_bytes
+    assert cache.get(cache.key("array", sys_tf, index=5)) is not None
+    assert cache.get(cache.key("array", sys_tf, index=0)) is None
+
+
+def test_foreign_result_types_are_never_rebuilt(cache, tmp_path):
+    """ A file naming a type outside the engine's registry is a miss, and is deleted unread """
+    marker = tmp_path / "ran"
+    key = cache.key("stability_margins", engine.build_system("1/(s+1)"))
+    with open(cache._path(key), "wb") as stream:
+        np.savez(stream, __type__=np.array("subprocess:Popen"), args=np.array("touch " + str(marker)),
+                 shell=np.array(True))
+    assert cache.get(key) is None
+    assert not marker.exists() and not (tmp_path / (key + ".npz")).exists()
+    assert cache.info()["misses"] == 1
+
+
+def test_only_engine_result_types_are_cached(cache):
+    from collections import namedtuple
+    Foreign = namedtuple("Foreign", ["value"])
+    with pytest.raises(ValueError):
+        cache.put("foreign", Foreign(np.zeros(3)))
+
+
+def test_registry_names_real_result_types():
+    for module, names in result_types.RESULT_TYPES.items():
+        for name in names:
+            result_type = result_types.lookup("control_engine.{0}:{1}".format(module, name))
+            assert result_type.__name__ == name and hasattr(result_type, "_fields")
+            assert result_types.type_name(result_type) == "control_engine.{0}:{1}".format(module, name)
+    for name in ["os:system", "control_engine.analysis:build_system", "control_engine:Margins",
+                 "control_engine.analysis.x:Margins", "Margins"]:
+        with pytest.raises(ValueError):
+            result_types.lookup(name)
@@ -0,0 +1,87 @@
+"""
+    Results store: round trips, memory-mapped slicing and the run budgets.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+
+@pytest.fixture
+def sys_tf():
+    return engine.build_factored_system("10/((s+1)*(s+2)*(s+3))", "(s+2)/(s+5)")
+
+
+def test_round_trip_memory_maps_arrays(tmp_path, sys_tf):
+    """ A saved result comes back with its types, values and arrays memory-mapped """
+    store = engine.ResultsStore(str(tmp_path))
+    result = engine.stability_margins(sys_tf), engine.bode_response(sys_tf), [engine.root_locus(sys_tf)]
+    loaded = store.load(store.save(result, view="test")["id"])
+    assert type(loaded[0]) is type(result[0])
+    np.testing.assert_equal(tuple(loaded[0]), tuple(result[0]))
+    assert type(loaded[1]) is type(result[1]) and isinstance(loaded[1].mag_db, np.memmap)
+    for expected, actual in zip(result[1] + result[2][0], loaded[1] + loaded[2][0]):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_select_band_slices_every_system(tmp_path):
+    """ One frequency band across many stored responses matches slicing in memory """
+    store = engine.ResultsStore(str(tmp_path))
+    omega = np.geomspace(0.01, 100, 400)
+    response = engine.BatchResponse(np.random.default_rng(0).normal(size=(50, 400)), np.zeros((50, 400)), omega)
+    band = engine.select_band(store.load(store.save(response)["id"]), 1.0, 10.0)
+    inside = (omega >= 1.0) & (omega <= 10.0)
+    np.testing.assert_array_equal(band.omega, omega[inside])
+    np.testing.assert_array_equal(band.mag_db, response.mag_db[:, inside])
+
+
+def test_same_metadata_replaces_earlier_run(tmp_path):
+    """ Saving the same analysis with the same arguments keeps only the newest run """
+    store = engine.ResultsStore(str(tmp_path))
+    first = store.save((np.zeros(10),), view="bode", arguments={"oltf": "1/s"})
+    second = store.save((np.ones(10),), view="bode", arguments={"oltf": "1/s"})
+    store.save((np.ones(10),), view="bode", arguments={"oltf": "2/s"})
+    assert [run["id"] for run in store.runs(view="bode")][0] == second["id"]
+    assert len(store.runs()) == 2
+    with pytest.raises(ValueError):
+        store.load(first["id"])
+
+
+def test_oldest_runs_are_evicted(tmp_path):
+    """ The store stays within its run and byte budgets, removing the oldest runs first """
+    store = engine.ResultsStore(str(tmp_path), max_bytes=3*8000, max_runs=5)
+    saved = [store.save((np.zeros(1000),), index=index)["id"] for index in range(6)]
+    assert [run["id"] for run in store.runs()] == saved[-3:]
+    store.max_bytes = 10**9
+    saved += [store.save((np.zeros(10),), index=index)["id"] for index in range(6, 10)]
+    assert [run["id"] for run in store.runs()] == saved[-5:]
+    assert sorted(entry.name for entry in tmp_path.iterdir() if entry.is_dir()) == sorted(saved[-5:])
+
+
+def test_result_over_budget_is_refused(tmp_path):
+    store = engine.ResultsStore(str(tmp_path), max_bytes=1000)
+    with pytest.raises(ValueError):
+        store.save((np.zeros(1000),))
+    assert store.runs() == [] and [entry.name for entry in tmp_path.iterdir()] == []
+
+
+def test_foreign_result_types_are_refused(tmp_path):
+    """ An index naming a type outside the engine's registry is not imported or called """
+    store = engine.ResultsStore(str(tmp_path))
+    record = store.save(engine.TimeResponse(np.arange(3.0), np.zeros(3)))
+    marker = tmp_path / "ran"
+    forged = dict(record, structure={"type": "subprocess:Popen", "fields": {
+        "args": {"value": "touch " + str(marker)}, "shell": {"value": True}}})
+    with open(store.index_path, "w") as index:
+        index.write(json.dumps(forged) + "\n")
+    with pytest.raises(ValueError):
+        store.load(record["id"])
+    assert not marker.exists()
+
+    from collections import namedtuple
+    with pytest.raises(ValueError):
+        store.save(namedtuple("Foreign", ["value"])(np.zeros(3)))
+    assert len(store.runs()) == 1
@@ -0,0 +1,78 @@
+"""
+    Root-locus continuation, checked against full polynomial solves,
+    python-control and the classical construction rules.
+"""
+
+import math
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+LOOPS = [([1.0], [1.0, 3.0, 2.0, 0.0]),
+         ([1.0, 3.0], [1.0, 3.0, 4.0, 2.0, 0.0]),
+         ([1.0, 2.0], [1.0, 0.4, 4.0]),
+         ([1.0, -1.0], [1.0, 6.0, 11.0, 6.0])]
+
+
+def sorted_roots(values):
+    values = np.round(np.asarray(values), 9)
+    return values[np.lexsort((values.imag, values.real))]
+
+
+@pytest.mark.parametrize("num, den", LOOPS)
+def test_traced_roots_solve_the_characteristic_polynomial(num, den):
+    trace = engine.trace_root_locus(num, den)
+    assert trace.root_solves < len(trace.gains)
+    padded = np.concatenate((np.zeros(len(den) - len(num)), num))
+    for gain, roots in zip(trace.gains[::7], trace.roots[::7]):
+        expected = np.roots(np.asarray(den) + gain*padded)
+        np.testing.assert_allclose(sorted_roots(roots), sorted_roots(expected),
+                                   atol=1e-6*max(1.0, np.abs(expected).max()))
+
+
+@pytest.mark.parametrize("num, den", LOOPS)
+def test_fixed_gain_locus_matches_python_control(num, den):
+    gains = np.array([0.0, 0.1, 1.0, 5.0, 30.0])
+    loci = control.root_locus_map(control.tf(num, den), gains).loci
+    for roots, expected in zip(engine.fixed_gain_locus(num, den, gains), loci):
+        np.testing.assert_allclose(sorted_roots(roots), sorted_roots(expected), atol=1e-8)
+
+
+def test_construction_rules_of_a_third_order_loop():
+    """ 1/(s(s+1)(s+2)): centroid -1, crossing at K = 6 and s = j*sqrt(2),
+        breakaway at s = -1 + 1/sqrt(3)
+    """
+    num, den = LOOPS[0]
+    centroid, angles = engine.asymptotes(num, den)
+    assert centroid == pytest.approx(-1.0)
+    np.testing.assert_allclose(angles, [math.pi/3, math.pi, 5*math.pi/3])
+
+    gains, points = engine.stability_crossings(num, den)
+    np.testing.assert_allclose(gains, [6.0])
+    np.testing.assert_allclose(points, [1j*math.sqrt(2)], atol=1e-9)
+    assert gains[0] == pytest.approx(control.margin(control.tf(num, den))[0])
+
+    gains, points = engine.breakaway_points(num, den)
+    point = -1 + 1/math.sqrt(3)
+    np.testing.assert_allclose(points, [point], atol=1e-9)
+    np.testing.assert_allclose(gains, [-point*(point + 1)*(point + 2)])
+
+
+def test_trace_lands_on_its_landmarks():
+    trace = engine.trace_root_locus(*LOOPS[0])
+    for gain in np.concatenate((trace.crossing_gains, trace.breakaway_gains)):
+        assert np.any(np.isclose(trace.gains, gain, rtol=1e-12))
+
+
+def test_discrete_crossings_lie_on_the_unit_circle_at_the_gain_margin():
+    discrete = control.sample_system(control.tf(*LOOPS[0]), 0.1)
+    num, den = discrete.num[0][0], discrete.den[0][0]
+    gains, points = engine.stability_crossings(num, den, dt=0.1)
+    assert len(gains) >= 1
+    np.testing.assert_allclose(np.abs(points), 1.0, atol=1e-9)
+    assert gains[0] == pytest.approx(control.stability_margins(discrete, method="poly")[0], rel=1e-6)
+    closed = np.roots(np.polyadd(den, gains[0]*np.asarray(num)))
+    assert np.abs(closed).max() == pytest.approx(1.0, abs=1e-6)
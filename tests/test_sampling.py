@@ -0,0 +1,64 @@
+"""
+    Zero-order hold discretisation and the discrete analyses, checked against
+    python-control.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANTS = ["1/(s*(s+1))", "10/((s+1)*(s+2)*(s+3))", "(s+2)/(s**2+0.4*s+4)"]
+PERIODS = [0.01, 0.1, 0.5]
+
+
+def assert_same_tf(actual, expected):
+    np.testing.assert_allclose(actual.poles(), expected.poles(), rtol=1e-7, atol=1e-10)
+    omega = np.geomspace(0.01, np.pi/expected.dt, 40)
+    points = np.exp(1j*omega*expected.dt)
+    np.testing.assert_allclose(actual(points), expected(points), rtol=1e-7)
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_discretize_matches_sample_system(plant):
+    sys_tf = engine.build_system(plant)
+    for period in PERIODS:
+        assert_same_tf(engine.discretize(sys_tf, period), control.sample_system(sys_tf, period, "zoh"))
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_discretize_many_matches_one_at_a_time(plant):
+    sys_tf = engine.build_system(plant)
+    for period, discrete in zip(PERIODS, engine.discretize_many(sys_tf, PERIODS)):
+        assert discrete.dt == period
+        assert_same_tf(discrete, control.sample_system(sys_tf, period, "zoh"))
+
+
+@pytest.mark.parametrize("plant", PLANTS)
+def test_discretize_factored_matches_sample_system(plant):
+    factored = engine.build_factored_system(plant)
+    for period, discrete in zip(PERIODS, engine.discretize_factored(factored, PERIODS)):
+        expected = control.sample_system(engine.build_system(plant), period, "zoh")
+        omega = np.geomspace(0.01, np.pi/period, 40)
+        np.testing.assert_allclose(discrete.frequency_response(omega),
+                                   expected(np.exp(1j*omega*period)), rtol=1e-6)
+
+
+def test_discrete_step_response_matches_python_control():
+    discrete = engine.build_discrete_system("1/(s*(s+1))", "(z-0.5)/(z-0.1)", "0.1")
+    time, response = engine.discrete_time_response(discrete, "0.1", steps=200)
+    _, expected = control.step_response(control.feedback(discrete, 1), time)
+    np.testing.assert_allclose(response, expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("analysis", ["discrete_time_response", "discrete_bode_response"])
+def test_sampling_time_must_match_the_system(analysis):
+    """ A sampling time that disagrees with the system's own period is refused """
+    discrete = engine.build_discrete_system("1/(s*(s+1))", "1", "0.1")
+    function = getattr(engine, analysis)
+    function(discrete, 0.1)
+    with pytest.raises(ValueError):
+        function(discrete, 0.2)
+    with pytest.raises(ValueError):
+        function(engine.build_system("1/(s*(s+1))"), 0.1)
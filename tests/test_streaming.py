@@ -0,0 +1,34 @@
+"""
+    Chunked streaming simulation over long horizons.
+"""
+
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANTS = ["10/((s+1)*(s+2)*(s+3))", "(s+2)/(s**2+0.4*s+4)"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 250, 5000])
+def test_chunks_match_one_shot_simulation(chunk_size):
+    systems = [engine.build_factored_system(plant).feedback() for plant in PLANTS]
+    simulator = engine.LTISimulator(systems, dt=0.01)
+    time = simulator.time(3000)
+    signals = np.stack((np.sin(0.7*time), np.sign(np.sin(0.1*time))))
+    whole = simulator.simulate(signals)
+    streamed = np.concatenate(list(engine.simulate_chunks(simulator, engine.iter_chunks(signals, chunk_size))),
+                              axis=-1)
+    np.testing.assert_allclose(streamed, whole, rtol=0, atol=1e-12)
+
+
+def test_memory_mapped_input_streams_without_copying(tmp_path):
+    """ Chunks of a memory-mapped recording are views into it """
+    recording = np.lib.format.open_memmap(str(tmp_path / "input.npy"), mode="w+", dtype=float, shape=(10000,))
+    recording[:] = np.cos(np.arange(10000)*0.01)
+    chunks = list(engine.iter_chunks(recording, 1024))
+    assert len(chunks) == 10 and all(np.shares_memory(chunk, recording) for chunk in chunks)
+    system = engine.build_factored_system(PLANTS[0]).feedback()
+    streamed = np.concatenate(list(engine.simulate_chunks(system, iter(chunks), dt=0.01)))
+    np.testing.assert_allclose(streamed, engine.LTISimulator(system, dt=0.01).simulate(np.asarray(recording)),
+                               atol=1e-12)
@@ -0,0 +1,35 @@
+"""
+    Parameter-sweep margin surfaces.
+"""
+
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANT = "1/(s*(s+1)*(s+5))"
+TEMPLATE = "K*(s+a)/(s+10*a)"
+GRID = {"K": [5.0, 30.0, 200.0], "a": [0.2, 1.0]}
+
+
+@pytest.fixture(scope="module")
+def surface():
+    return engine.margin_sweep(PLANT, TEMPLATE, GRID, processes=1)
+
+
+def test_each_point_matches_stability_margins(surface):
+    assert surface.names == ("K", "a") and surface.phase_margin.shape == (3, 2)
+    for i, gain in enumerate(GRID["K"]):
+        for j, corner in enumerate(GRID["a"]):
+            compensator = "{0}*(s+{1})/(s+{2})".format(gain, corner, 10*corner)
+            margins = engine.stability_margins(engine.build_system(PLANT, compensator))
+            np.testing.assert_allclose((surface.gain_margin_db[i, j], surface.phase_margin[i, j]),
+                                       (margins.gain_margin_db, margins.phase_margin), rtol=1e-6)
+            poles = engine.build_system(PLANT, compensator).feedback().poles()
+            assert surface.stable[i, j] == bool(np.all(poles.real < 0))
+
+
+def test_pool_matches_serial(surface):
+    pooled = engine.margin_sweep(PLANT, TEMPLATE, GRID, processes=2)
+    for expected, actual in zip(surface[2:], pooled[2:]):
+        np.testing.assert_array_equal(actual, expected)
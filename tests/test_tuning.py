@@ -0,0 +1,68 @@
+"""
+    Live compensator tuning, checked against the loop rebuilt from scratch
+    and analysed by python-control.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+
+PLANT = "10/((s+1)*(s+2)*(s+3))"
+
+
+def sorted_roots(values):
+    values = np.round(np.asarray(values, dtype=complex), 7)
+    return values[np.lexsort((values.imag, values.real))]
+
+
+def reference(plant, compensator, sampling_time=None):
+    if sampling_time:
+        loop = engine.build_discrete_system(plant, compensator, sampling_time)
+    else:
+        loop = engine.build_system("({0})*({1})".format(plant, compensator))
+    return loop, control.stability_margins(loop, method="poly")
+
+
+@pytest.mark.parametrize("values", [dict(K=1.0, a=0.5, b=5.0), dict(K=3.0, a=2.0, b=20.0),
+                                    dict(K=20.0, a=0.2, b=1.0)])
+def test_updates_match_the_rebuilt_loop(values):
+    tuner = engine.LoopTuner(PLANT, "K*(s+a)/(s+b)", dict(K=1.0, a=1.0, b=10.0))
+    result = tuner.update(**values)
+    loop, (gm, pm, _, wcg, wcp, _) = reference(PLANT, "{K}*(s+{a})/(s+{b})".format(**values))
+    margins = result.margins
+    assert margins.gain_margin == pytest.approx(gm, rel=1e-6, nan_ok=True)
+    assert margins.phase_margin == pytest.approx(pm, rel=1e-6, abs=1e-6, nan_ok=True)
+    assert margins.wcg == pytest.approx(wcg, rel=1e-6, nan_ok=True)
+    assert margins.wcp == pytest.approx(wcp, rel=1e-6, nan_ok=True)
+    np.testing.assert_allclose(sorted_roots(result.poles), sorted_roots(control.feedback(loop, 1).poles()),
+                               atol=1e-6)
+    _, expected = control.step_response(control.feedback(loop, 1), result.step.time)
+    np.testing.assert_allclose(result.step.response, expected, atol=1e-8)
+    assert result.parameters == dict(values)
+
+
+def test_discrete_updates_match_the_rebuilt_loop():
+    tuner = engine.LoopTuner(PLANT, "K*(z-a)/(z-b)", dict(K=1.0, a=0.5, b=0.1), sampling_time=0.1)
+    result = tuner.update(K=2.0, a=0.8)
+    loop, (gm, pm, _, wcg, wcp, _) = reference(PLANT, "2*(z-0.8)/(z-0.1)", 0.1)
+    assert result.margins.gain_margin == pytest.approx(gm, rel=1e-6, nan_ok=True)
+    assert result.margins.phase_margin == pytest.approx(pm, rel=1e-6, nan_ok=True)
+    _, expected = control.step_response(control.feedback(loop, 1), result.step.time)
+    np.testing.assert_allclose(result.step.response, expected, atol=1e-8)
+
+
+def test_bode_response_matches_python_control():
+    tuner = engine.LoopTuner(PLANT, "K*(s+a)/(s+b)", dict(K=2.0, a=1.0, b=10.0))
+    bode = tuner.update().bode
+    loop, _ = reference(PLANT, "2*(s+1)/(s+10)")
+    response = loop(1j*bode.omega)
+    np.testing.assert_allclose(bode.mag_db, 20*np.log10(np.abs(response)), atol=1e-9)
+    np.testing.assert_allclose(np.exp(1j*np.radians(bode.phase_deg)), response/np.abs(response), atol=1e-9)
+
+
+def test_unknown_parameter_is_rejected():
+    tuner = engine.LoopTuner(PLANT, "K*(s+a)/(s+b)", dict(K=1.0, a=1.0, b=10.0))
+    with pytest.raises(ValueError):
+        tuner.update(c=1.0)
@@ -0,0 +1,115 @@
+"""
+    Sets of systems in pole-zero-gain form: reading, writing and block-wise
+    frequency responses, checked against python-control.
+"""
+
+import control
+import numpy as np
+import pytest
+
+import control_engine as engine
+from control_engine import zpk_sets
+
+ZEROS = [[-1.0], [], [-0.5 + 2j, -0.5 - 2j]]
+POLES = [[-2.0, -3.0 + 1j, -3.0 - 1j], [-0.1, -10.0], [-1.0, -2.0, -4.0, -8.0]]
+GAINS = [5.0, 0.5, 12.0]
+
+
+def test_parse_roots():
+    np.testing.assert_array_equal(zpk_sets.parse_roots("-1, -2+3j; -0.5-1i"), [-1, -2 + 3j, -0.5 - 1j])
+    np.testing.assert_array_equal(zpk_sets.parse_roots("-1±2j, -3+-4i, +/-5j"),
+                                  [-1 + 2j, -1 - 2j, -3 + 4j, -3 - 4j, 5j, -5j])
+    assert zpk_sets.parse_roots(" , ").size == 0
+    with pytest.raises(ValueError):
+        zpk_sets.parse_roots("-1, two")
+
+
+def test_mismatched_sets_are_rejected():
+    with pytest.raises(ValueError):
+        zpk_sets.zpk_set(ZEROS, POLES[:2], GAINS)
+
+
+@pytest.mark.parametrize("extension", [".csv", ".npy", ".npz"])
+def test_files_round_trip(tmp_path, extension):
+    systems = zpk_sets.zpk_set(ZEROS, POLES, GAINS, ["a", "b", "c"])
+    path = str(tmp_path / ("systems" + extension))
+    if extension == ".csv":
+        with open(path, "w") as stream:
+            stream.write("name,zeros,poles,gain\n")
+            stream.write('a,-1,"-2, -3±1j",5\nb,,"-0.1,-10",0.5\nc,-0.5±2i,"-1,-2,-4,-8",12\n')
+    elif extension == ".npy":
+        zpk_sets.save_zpk_set(path, systems)
+    else:
+        np.savez(path, name=systems.names, zeros=systems.zeros, poles=systems.poles, gain=systems.gains)
+    loaded = zpk_sets.load_zpk_set(path)
+    np.testing.assert_array_equal(loaded.names, ["a", "b", "c"])
+    np.testing.assert_array_equal(loaded.gains, GAINS)
+    np.testing.assert_array_equal(loaded.zeros, systems.zeros)
+    np.testing.assert_array_equal(loaded.poles, systems.poles)
+
+
+def test_csv_row_without_gain_is_rejected(tmp_path):
+    path = tmp_path / "systems.csv"
+    path.write_text("zeros,poles,gain\n,-1,\n")
+    with pytest.raises(ValueError):
+        zpk_sets.load_zpk_set(str(path))
+
+
+@pytest.mark.parametrize("dt", [None, 0.05])
+def test_response_matches_python_control(dt):
+    """ With a sampling period the roots are taken to be z-plane roots """
+    systems = zpk_sets.zpk_set(ZEROS, POLES, GAINS)
+    response = zpk_sets.zpk_set_response(systems, dt=dt, points=300)
+    for index, (zeros, poles, gain) in enumerate(zip(ZEROS, POLES, GAINS)):
+        sys_tf = control.zpk(zeros, poles, gain, dt)
+        expected = sys_tf(np.exp(1j*response.omega*dt) if dt else 1j*response.omega)
+        np.testing.assert_allclose(response.mag_db[index], 20*np.log10(np.abs(expected)), atol=1e-9)
+        np.testing.assert_allclose(np.exp(1j*np.radians(response.phase_deg[index])), expected/np.abs(expected),
+                                   atol=1e-9)
+
+
+def test_blocks_match_one_pass(monkeypatch):
+    rng = np.random.default_rng(3)
+    poles = [-rng.uniform(0.1, 100, 6) for _ in range(50)]
+    zeros = [-rng.uniform(0.1, 100, 2) for _ in range(50)]
+    gains = rng.uniform(1, 10, 50)
+    systems = zpk_sets.zpk_set(zeros, poles, gains)
+    omega = np.geomspace(1e-2, 1e3, 200)
+    whole = engine.batch_zpk_response(systems.zeros, systems.poles, systems.gains, omega)
+    monkeypatch.setattr(zpk_sets, "RESPONSE_ELEMENTS", 6*200*7)
+    blocked = zpk_sets.zpk_set_response(systems, omega)
+    np.testing.assert_array_equal(blocked.mag_db, whole.mag_db)
+    np.testing.assert_array_equal(blocked.phase_deg, whole.phase_deg)
+
+
+def test_export_loads_with_numpy_alone(tmp_path):
+    systems = zpk_sets.zpk_set(ZEROS, POLES, GAINS, ["a", "b", "c"])
+    response = zpk_sets.zpk_set_response(systems, points=100)
+    path = zpk_sets.export_response(str(tmp_path / "bode"), response, systems.names)
+    assert path.endswith(".npz")
+    with np.load(path) as data:
+        assert data["mag_db"].dtype == np.float32 and data["mag_db"].shape == (3, 100)
+        np.testing.assert_array_equal(data["omega"], response.omega)
+        np.testing.assert_allclose(data["phase_deg"], response.phase_deg, rtol=1e-6)
+        np.testing.assert_array_equal(data["names"], ["a", "b", "c"])
+
+
+def test_structured_npy_sets_stay_memory_mapped(tmp_path):
+    """ Complex root fields are used in place, as read-only views of the mapped file """
+    path = str(tmp_path / "systems.npy")
+    zpk_sets.save_zpk_set(path, zpk_sets.zpk_set(ZEROS, POLES, GAINS))
+    loaded = zpk_sets.load_zpk_set(path)
+    for array in (loaded.zeros, loaded.poles, loaded.gains):
+        assert not array.flags.owndata and not array.flags.writeable
+    np.testing.assert_array_equal(zpk_sets.zpk_set_response(loaded, points=50).mag_db,
+                                  zpk_sets.zpk_set_response(zpk_sets.zpk_set(ZEROS, POLES, GAINS), points=50).mag_db)
+
+
+def test_npy_sets_with_real_roots_are_converted(tmp_path):
+    path = str(tmp_path / "systems.npy")
+    data = np.zeros(2, dtype=[("gain", float), ("zeros", float, (1,)), ("poles", float, (2,))])
+    data["gain"], data["zeros"], data["poles"] = [1.0, 2.0], [[-1.0], [np.nan]], [[-2.0, -3.0], [-4.0, np.nan]]
+    np.save(path, data)
+    loaded = zpk_sets.load_zpk_set(path)
+    assert loaded.poles.dtype == complex
+    np.testing.assert_array_equal(loaded.poles, data["poles"])